@@ -0,0 +1,249 @@
+"""
+Benchmark harness for the planner's hot paths.
+
+Seeds a throwaway test database with synthetic data (planner.synthetic),
+then drives the views through Django's test client: the dashboard page and
+its occurrences API for every filter combination, the calendar, recommendation, nearby and map APIs,
+create_event, view_event, and the populate_planner / import paths. For
+each case it records SQL query counts and p50/p95 latency in a JSON report;
+pass --compare with an earlier report to see the change between commits.
+
+    python benchmarks/bench_planner.py --events 2000 --occurrences-per-event 10 --output bench_report.json
+    python benchmarks/bench_planner.py --compare bench_report.json
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sas_app.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from planner import synthetic
+from planner.models import Event
+
+FILTER_VALUES = {
+    'search_name': [None, 'jazz'],
+    'budget': [None, 'LOW'],
+    'kind': [None, 'SOCIAL'],
+    'min_attendees': [None, '50'],
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(fn, iterations, cold_cache=True):
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        if cold_cache:
+            caches['default'].clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            status = fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+    return {
+        'iterations': iterations,
+        'status': status,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def filter_combinations():
+    names = list(FILTER_VALUES)
+    for values in itertools.product(*(FILTER_VALUES[name] for name in names)):
+        params = {name: value for name, value in zip(names, values) if value is not None}
+        label = ",".join(f"{k}={v}" for k, v in params.items()) or "no filters"
+        yield label, params
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_cases(client, args):
+    results = {}
+    now = timezone.now()
+    month = {'start': now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat(),
+             'end': (now.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()}
+
+    results['dashboard page'] = measure(
+        lambda: client.get(reverse('planner:dashboard')).status_code, args.iterations)
+
+    for label, params in filter_combinations():
+        query = dict(params, **month)
+        results[f"api_occurrences [{label}]"] = measure(
+            lambda: client.get(reverse('planner:api_occurrences'), query).status_code, args.iterations)
+
+    results['api_calendar_month'] = measure(
+        lambda: client.get(reverse('planner:api_calendar_month'), {'month': now.strftime('%Y-%m')}).status_code,
+        args.iterations)
+    results['api_calendar_day'] = measure(
+        lambda: client.get(reverse('planner:api_calendar_day'), {'date': now.date().isoformat()}).status_code,
+        args.iterations)
+
+    recommendations_url = reverse('planner:api_recommendations')
+    results['api_recommendations (size only)'] = measure(
+        lambda: client.get(recommendations_url, {'group_size': 12}).status_code, args.iterations)
+    results['api_recommendations (all preferences)'] = measure(
+        lambda: client.get(recommendations_url, {
+            'group_size': 12, 'budget': 'MEDIUM', 'days': 'FRI,SAT', 'occasion': 'BIRTHDAY',
+            'lat': '55.8642', 'lng': '-4.2518', 'radius_km': 5,
+        }).status_code, args.iterations)
+
+    results['api_nearby (5 km)'] = measure(
+        lambda: client.get(reverse('planner:api_nearby_events'),
+                           dict(month, lat='55.8642', lng='-4.2518', radius_km=5)).status_code, args.iterations)
+
+    map_url = reverse('planner:api_map_events')
+    results['api_map clusters (zoom 10)'] = measure(
+        lambda: client.get(map_url, dict(month, bbox='55.7,-4.5,56.0,-4.0', zoom=10)).status_code, args.iterations)
+    results['api_map points (zoom 16)'] = measure(
+        lambda: client.get(map_url, dict(month, bbox='55.855,-4.27,55.875,-4.23', zoom=16)).status_code, args.iterations)
+
+    slugs = list(Event.objects.order_by('?').values_list('slug', flat=True)[:args.iterations])
+    slug_iter = itertools.cycle(slugs)
+    results['view_event'] = measure(
+        lambda: client.get(reverse('planner:view_event', args=[next(slug_iter)])).status_code, args.iterations)
+
+    counter = itertools.count()
+
+    def create():
+        # A new day each time, so the location conflict check passes and the event is created.
+        n = next(counter)
+        day = (now + timedelta(days=3 + n)).date()
+        return client.post(reverse('planner:create_event'), {
+            'eventName': f"Benchmark created event {n}",
+            'eventDescription': "Created by the benchmark harness.",
+            'eventKind': 'SOCIAL',
+            'eventBudget': 'MEDIUM',
+            'eventTags': 'benchmark, social',
+            'selected_date': day.isoformat(),
+            'eventTime': '19:00',
+            'eventDuration': '2.0',
+            'eventAttendees': '10',
+            'selectedLat': '55.864200',
+            'selectedLng': '-4.251800',
+            'locationName': 'Glasgow City Centre',
+        }).status_code
+    results['create_event'] = measure(create, args.iterations, cold_cache=False)
+
+    import_size = args.import_rows
+
+    def import_rows():
+        importer = synthetic.populate(events=max(import_size // 10, 1), occurrences_per_event=10,
+                                      seed=int(time.time() * 1000))
+        return 'ok' if importer.errors == 0 else 'errors'
+
+    results[f'import_events ({import_size} rows)'] = measure(import_rows, max(args.iterations // 10, 1), cold_cache=False)
+
+    import populate_planner
+
+    def populate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            populate_planner.populate()
+        return 'ok'
+    results['populate_planner.populate'] = measure(populate, max(args.iterations // 10, 1), cold_cache=False)
+
+    return results
+
+
+def print_report(report, previous=None):
+    previous_results = (previous or {}).get('results', {})
+    print(f"{'case':<80} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'status':>7}" + ("   p50 change" if previous else ""))
+    for name, result in report['results'].items():
+        line = f"{name:<80} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['queries']:>8} {str(result['status']):>7}"
+        before = previous_results.get(name)
+        if before and before['p50_ms']:
+            line += f"   {(result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--occurrences-per-event', type=int, default=10)
+    parser.add_argument('--tags', type=int, default=20)
+    parser.add_argument('--spread-km', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--import-rows', type=int, default=1000)
+    parser.add_argument('--output', default='bench_report.json')
+    parser.add_argument('--compare', help="Earlier report to compare p50 latency against")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        started = time.perf_counter()
+        importer = synthetic.populate(events=args.events, occurrences_per_event=args.occurrences_per_event,
+                                      tags=args.tags, spread_km=args.spread_km, seed=args.seed)
+        seed_seconds = time.perf_counter() - started
+
+        user = User.objects.create_user('benchmark', password='benchmark')
+        client = Client()
+        client.force_login(user)
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'events': importer.events_created,
+                'occurrences': importer.occurrences_created,
+                'seed_rows_per_sec': round(importer.rows / seed_seconds, 1) if seed_seconds else None,
+            },
+            'results': run_cases(client, args),
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Microbenchmark for the dashboard occurrence serialization.
+
+Compares the original path (hydrate EventOccurrence + Event instances, then
+float() their Decimals into dicts) with planner.serialization (values_list
+columns converted in one pass) at 1k, 10k and 100k rows. Runs against a
+throwaway test database, so the development db.sqlite3 is left alone.
+
+    python benchmarks/bench_serialization.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sas_app.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.utils import timezone
+
+from planner.models import Event, EventOccurrence
+from planner.serialization import iter_occurrence_json, occurrence_rows
+
+
+def legacy_payload(queryset):
+    # The dashboard's serialization before planner.serialization existed.
+    event_data_list = []
+    for occurrence in queryset.select_related('event'):
+        event = occurrence.event
+        event_data_list.append({
+            'id': occurrence.pk,
+            'name': event.title,
+            'date_ms': int(occurrence.start_datetime.timestamp() * 1000),
+            'time': occurrence.start_datetime.strftime('%H:%M'),
+            'duration': float(occurrence.duration_hours),
+            'category': event.category,
+            'attendees': occurrence.actual_attendees,
+            'description': event.description,
+            'budget': event.budget,
+            'slug': event.slug,
+            'location': {
+                'lat': float(event.latitude) if event.latitude else 0.0,
+                'lng': float(event.longitude) if event.longitude else 0.0,
+                'address': event.location_name,
+            }
+        })
+    return json.dumps(event_data_list)
+
+
+def columnar_payload(queryset):
+    return "".join(iter_occurrence_json(occurrence_rows(queryset)))
+
+
+def seed(total):
+    events = Event.assign_slugs([
+        Event(title=f"Benchmark event {i}", description="Synthetic row for benchmarking.",
+              kind='SOCIAL', budget='MEDIUM', latitude=Decimal('55.864200'),
+              longitude=Decimal('-4.251800'), location_name="Glasgow City Centre")
+        for i in range(max(total // 10, 1))
+    ])
+    Event.objects.bulk_create(events)
+    event_ids = list(Event.objects.values_list('pk', flat=True))
+    start = timezone.now()
+    occurrences = [
+        EventOccurrence(event_id=event_ids[i % len(event_ids)], start_datetime=start + timedelta(minutes=i),
+                        duration_hours=Decimal('2.50'), actual_attendees=i % 300)
+        for i in range(total)
+    ]
+    for occurrence in occurrences:
+        occurrence.compute_derived_fields()
+    EventOccurrence.objects.bulk_create(occurrences)
+
+
+def best_of(repeats, fn, *args):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed(max(args.sizes))
+        print(f"{'rows':>8} {'legacy us/row':>14} {'columnar us/row':>16} {'speedup':>8}")
+        for size in sorted(args.sizes):
+            queryset = EventOccurrence.objects.order_by('start_datetime', 'pk')[:size]
+            legacy = best_of(args.repeats, legacy_payload, queryset)
+            columnar = best_of(args.repeats, columnar_payload, queryset)
+            print(f"{size:>8} {legacy / size * 1e6:>14.2f} {columnar / size * 1e6:>16.2f} {legacy / columnar:>7.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Throughput load test for the production serving profile.
+
+Starts gunicorn (gunicorn.conf.py, sas_app.settings_production) once per
+worker count, logs in, and drives the planner's read APIs from concurrent
+client threads for a fixed time, reporting requests per second and
+latency percentiles for each worker count:
+
+    python benchmarks/load_test.py --workers 1,2,4 --concurrency 16 --duration 15
+
+Point it at an already running server with --base-url instead (worker
+counts are then not managed). The login user is created if it does not
+exist. Use the same database the server uses; seed it first with e.g.
+`manage.py generate_synthetic`, and run `manage.py collectstatic` with the
+production settings so pages can resolve their hashed asset names.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = [
+    '/planner/api/occurrences/',
+    '/planner/api/occurrences/?kind=SOCIAL',
+    '/planner/api/calendar/',
+    '/planner/api/map/?bbox=55.80,-4.40,55.92,-4.10&zoom=12',
+    '/planner/events/missing/',
+]
+
+
+def server_env():
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'sas_app.settings_production')
+    env.setdefault('DJANGO_SECRET_KEY', 'load-test-only')
+    env.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1')
+    # The test talks plain HTTP.
+    env.setdefault('DJANGO_SECURE_COOKIES', '0')
+    return env
+
+
+def ensure_user(username, password):
+    os.environ.update({key: value for key, value in server_env().items() if key not in os.environ})
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+    from django.contrib.auth.models import User
+
+    if not User.objects.filter(username=username).exists():
+        User.objects.create_user(username, password=password)
+
+
+def login(base_url, username, password):
+    """Returns the Cookie header of a logged-in session."""
+    jar = CookieJar()
+    opener = build_opener(HTTPCookieProcessor(jar))
+    opener.open(f"{base_url}/planner/login/", timeout=10).read()
+    csrf = next(cookie.value for cookie in jar if cookie.name == 'csrftoken')
+    data = urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': csrf}).encode()
+    opener.open(Request(f"{base_url}/planner/login/", data=data, headers={'Referer': f"{base_url}/planner/login/"}),
+                timeout=10).read()
+    cookies = {cookie.name: cookie.value for cookie in jar}
+    if 'sessionid' not in cookies:
+        raise SystemExit(f"Could not log in as {username!r}")
+    return "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+
+def wait_for_server(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        try:
+            build_opener().open(f"{base_url}/planner/login/", timeout=2).read()
+            return
+        except (URLError, ConnectionError):
+            time.sleep(0.2)
+    raise SystemExit("gunicorn did not start in time")
+
+
+def run_load(base_url, cookie, paths, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        opener = build_opener()
+        local_latencies = []
+        local_errors = 0
+        i = offset
+        while time.monotonic() < deadline:
+            request = Request(base_url + paths[i % len(paths)], headers={'Cookie': cookie})
+            i += 1
+            started = time.perf_counter()
+            try:
+                opener.open(request, timeout=30).read()
+            except HTTPError as e:
+                # 404s are expected for the missing-event probe; anything else counts as an error.
+                if e.code != 404:
+                    local_errors += 1
+            except (URLError, ConnectionError):
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help="Comma-separated gunicorn worker counts to compare")
+    parser.add_argument('--base-url', help="Test a running server instead of starting gunicorn")
+    parser.add_argument('--bind', default='127.0.0.1:8765')
+    parser.add_argument('--concurrency', type=int, default=16, help="Client threads")
+    parser.add_argument('--duration', type=float, default=15.0, help="Seconds per run")
+    parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable)")
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='load-test-password')
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    ensure_user(args.username, args.password)
+    results = {}
+    runs = [None] if args.base_url else [int(n) for n in args.workers.split(',')]
+    for workers in runs:
+        process = None
+        base_url = args.base_url
+        if base_url is None:
+            base_url = f"http://{args.bind}"
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+                 '--bind', args.bind, '--access-logfile', '/dev/null', 'sas_app.wsgi'],
+                cwd=BASE_DIR, env=server_env(),
+            )
+        try:
+            if process:
+                wait_for_server(base_url, process)
+            cookie = login(base_url, args.username, args.password)
+            # Warm the caches and connections before measuring.
+            run_load(base_url, cookie, paths, args.concurrency, min(2.0, args.duration))
+            result = run_load(base_url, cookie, paths, args.concurrency, args.duration)
+        finally:
+            if process:
+                process.terminate()
+                process.wait(timeout=30)
+        label = f"{workers} workers" if workers else base_url
+        results[label] = result
+        print(f"{label:>12}: {result['requests_per_second']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+              f"p95 {result['p95_ms']:7.2f} ms  errors {result['errors']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'concurrency': args.concurrency, 'duration': args.duration, 'paths': paths,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Gunicorn launch configuration for the production profile.
+
+    export DJANGO_SECRET_KEY=...
+    python manage.py migrate --settings=sas_app.settings_production
+    python manage.py collectstatic --settings=sas_app.settings_production
+    gunicorn -c gunicorn.conf.py sas_app.wsgi
+
+Every worker is its own process with its own persistent database
+connection (CONN_MAX_AGE) and shares the file-based cache. The defaults
+suit a small single-host deployment; override them with the GUNICORN_*
+variables below or on the command line (e.g. --workers 4).
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sas_app.settings_production')
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+
+# The usual 2 x cores + 1 sync workers; the planner views are short and mostly database bound.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so a slow leak cannot grow without bound.
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
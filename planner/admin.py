@@ -5,3 +5,9 @@ from planner.models import *
 admin.site.register(Tag)
 admin.site.register(Venue)
 admin.site.register(Event)
+admin.site.register(RecurrenceRule)
+admin.site.register(RecurrenceException)
+admin.site.register(GeocodeJob)
+admin.site.register(PlaceCache)
+# Deleting a feed revokes its subscription URL.
+admin.site.register(CalendarFeed)
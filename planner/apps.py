@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class NightOutAppConfig(AppConfig):
     name = 'planner'
+
+    def ready(self):
+        from . import signals  # noqa: F401 -- connects the receivers
+        from .db import configure_connection
+
+        connection_created.connect(configure_connection, dispatch_uid='planner.db.configure_connection')
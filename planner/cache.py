@@ -0,0 +1,113 @@
+"""
+Response cache for the dashboard JSON endpoints.
+
+Payloads are stored under a hash of the normalized filter tuple plus a
+global generation. Any write to events, occurrences or tags starts a new
+generation (see planner.signals), which orphans every cached payload at
+once; this only needs plain get/set, so it works the same on the
+local-memory and file-based backends. Use a shared backend (file, memcached)
+when running several worker processes so they all see the same
+generation.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Choices
+from .nearby import parse_near
+from .tags import normalize_tag_name
+
+GENERATION_KEY = "planner:generation"
+
+
+def get_cache():
+    return caches[getattr(settings, 'PLANNER_CACHE_ALIAS', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'PLANNER_CACHE_TIMEOUT', 300)
+
+
+def current_generation():
+    generation = get_cache().get(GENERATION_KEY)
+    if generation is None:
+        generation = bump_generation()
+    return generation
+
+
+def bump_generation():
+    generation = {'version': uuid.uuid4().hex, 'modified': time.time()}
+    # Never expires on its own; payload keys expire via cache_timeout().
+    get_cache().set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def normalize_filters(params):
+    """The dashboard filters reduced to a canonical tuple, so equivalent queries share a key."""
+    search_name = " ".join((params.get('search_name') or "").lower().split())
+    budget = params.get('budget') or ""
+    if budget not in [choice[0] for choice in Choices.get_budget_band()]:
+        budget = ""
+    kind = params.get('kind') or ""
+    if kind not in [choice[0] for choice in Choices.get_event_kind()]:
+        kind = ""
+    tag = normalize_tag_name(params.get('tag') or "")
+    try:
+        min_attendees = str(int(params.get('min_attendees')))
+    except (TypeError, ValueError):
+        min_attendees = ""
+    near = parse_near(params) or ""
+    return (search_name, budget, kind, tag, min_attendees, params.get('start') or "", params.get('end') or "", near)
+
+
+def cache_key(namespace, filters, generation):
+    digest = hashlib.sha1(repr(filters).encode('utf-8')).hexdigest()
+    return f"planner:{namespace}:{generation['version']}:{digest}"
+
+
+def generation_validators(namespace, filters):
+    """
+    (ETag, Last-Modified timestamp) for a response that depends only on
+    these filters and the data, for views that stream instead of caching.
+    """
+    generation = current_generation()
+    key = cache_key(namespace, filters, generation)
+    return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest(), int(generation['modified'])
+
+
+def cached_json_response(request, namespace, filters, build_body):
+    """
+    Returns the JSON body produced by build_body() for these filters, served
+    from the cache when possible, with ETag/Last-Modified validators so a
+    repeat request gets a 304 until the data changes.
+    """
+    generation = current_generation()
+    key = cache_key(namespace, filters, generation)
+    cache = get_cache()
+
+    entry = cache.get(key)
+    if entry is None:
+        body = build_body()
+        entry = {
+            'body': body,
+            'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+            'last_modified': int(generation['modified']),
+        }
+        cache.set(key, entry, cache_timeout())
+
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'],
+    )
+    if response is None:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Dashboard data sits behind login, so only the browser may keep it and it must revalidate.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
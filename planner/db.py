@@ -0,0 +1,21 @@
+"""
+Per-connection database tuning, applied from the connection_created signal.
+
+On SQLite the PRAGMAs in PLANNER_SQLITE_PRAGMAS are run on every new
+connection. The production profile uses WAL journaling (readers no longer
+wait for a writer), a busy_timeout (a writer waits for the lock instead of
+failing with "database is locked") and synchronous=NORMAL, which is safe
+under WAL and avoids an fsync per transaction.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'PLANNER_SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
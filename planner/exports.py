@@ -0,0 +1,127 @@
+"""
+Streaming iCalendar and CSV renderings of occurrence listings.
+
+Both take rows in serialization.LISTING_COLUMNS order (stored listing rows
+or generated recurrence rows) from any iterable and yield the document a
+piece at a time, so the views can hand them to StreamingHttpResponse over
+a queryset.iterator(): an export of any size holds only one database chunk
+in memory.
+"""
+import csv
+from datetime import timedelta
+
+from django.utils import timezone
+
+# Rows fetched from the database per round trip while streaming.
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_HEADER = (
+    'id', 'title', 'start', 'end', 'duration_hours', 'kind', 'budget', 'attendees',
+    'location', 'latitude', 'longitude', 'url',
+)
+
+# Rendered rows are sent in pieces of about this many characters rather than one write per row.
+EXPORT_BUFFER_CHARS = 16 * 1024
+
+# RFC 5545 limits content lines to 75 octets.
+ICS_LINE_OCTETS = 75
+
+
+class _Echo:
+    """File-like object whose write() returns the text instead of buffering it, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def buffered(pieces, size=EXPORT_BUFFER_CHARS):
+    """Joins the small pieces of a stream into fewer, larger ones."""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_csv(rows, event_url):
+    """Yields a CSV document line by line; event_url(slug) gives each event's absolute URL."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for (pk, start, duration, attendees, title, kind, description,
+         budget, slug, lat, lng, location_name) in rows:
+        start = timezone.localtime(start)
+        yield writer.writerow((
+            pk, title, start.isoformat(), (start + timedelta(hours=float(duration))).isoformat(),
+            duration, kind, budget, attendees, location_name,
+            '' if lat is None else lat, '' if lng is None else lng, event_url(slug),
+        ))
+
+
+def _ics_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_time(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _fold(line):
+    # Continuation lines start with a space, which counts towards their 75 octets.
+    encoded = line.encode('utf-8')
+    if len(encoded) <= ICS_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    limit = ICS_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte character.
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = ICS_LINE_OCTETS - 1
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_ics(rows, event_url, calendar_name, domain):
+    """
+    Yields a VCALENDAR with one VEVENT per row. UIDs combine the occurrence
+    id with domain, so a subscribed calendar updates events in place.
+    """
+    stamp = _ics_time(timezone.now())
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//SAS Planner//Events//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_ics_text(calendar_name)}',
+    ))
+    for (pk, start, duration, attendees, title, kind, description,
+         budget, slug, lat, lng, location_name) in rows:
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:occurrence-{pk}@{domain}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_ics_time(start)}',
+            f'DTEND:{_ics_time(start + timedelta(hours=float(duration)))}',
+            f'SUMMARY:{_ics_text(title)}',
+            f'CATEGORIES:{_ics_text(kind)}',
+            f'URL:{event_url(slug)}',
+        ]
+        if description:
+            lines.append(f'DESCRIPTION:{_ics_text(description)}')
+        if location_name:
+            lines.append(f'LOCATION:{_ics_text(location_name)}')
+        if lat is not None and lng is not None:
+            lines.append(f'GEO:{lat};{lng}')
+        lines.append('END:VEVENT')
+        yield ''.join(_fold(line) for line in lines)
+    yield 'END:VCALENDAR\r\n'
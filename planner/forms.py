@@ -2,7 +2,7 @@ from decimal import Decimal
 from django import forms
 from django.contrib.auth.models import User
 
-from .models import Event, EventOccurrence, Venue, Choices 
+from .models import Event, EventOccurrence, Venue, Choices, RecurrenceRule
 from django.core.validators import MinValueValidator
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
@@ -84,13 +84,29 @@ class EventCreationForm(forms.Form):
     )
     eventAttendees = forms.IntegerField(min_value=1, required=False, label="Expected Attendees")
 
+    # RECURRENCE FIELDS (expanded lazily, see planner.recurrence)
+    eventRepeat = forms.ChoiceField(
+        choices=(("NONE", "Does not repeat"),) + RecurrenceRule.FREQUENCY_CHOICES,
+        required=False,
+        initial="NONE",
+        label="Repeats",
+    )
+    eventRepeatUntil = forms.DateField(required=False, label="Repeat Until")
+    eventRepeatCount = forms.IntegerField(min_value=1, required=False, label="Number of Occurrences")
+
     # LOCATION FIELDS
     selectedLat = forms.DecimalField(max_digits=9, decimal_places=6, required=True, widget=forms.HiddenInput())
     selectedLng = forms.DecimalField(max_digits=9, decimal_places=6, required=True, widget=forms.HiddenInput())
     locationName = forms.CharField(max_length=255, required=False, widget=forms.HiddenInput())
+    # Set by the user after being shown what is already booked at the place (planner.scheduling).
+    allowOverlap = forms.BooleanField(required=False, label="Create anyway")
     
     def clean(self):
         cleaned_data = super().clean()
         if not cleaned_data.get('eventDuration'):
             pass
+        until = cleaned_data.get('eventRepeatUntil')
+        date = cleaned_data.get('selected_date')
+        if until and date and until < date:
+            self.add_error('eventRepeatUntil', "The repeat end date must be on or after the event date.")
         return cleaned_data
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Small spatial helpers for the planner: geohash encoding and the cell
+ranges used to turn a map bounding box into indexed range lookups.
+"""
+import math
+
+from django.db.models import Q
+
+try:
+    import numpy
+except ImportError:  # Optional: distances fall back to a plain loop.
+    numpy = None
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+# Sorts after every character in GEOHASH_ALPHABET, so [prefix, prefix + END)
+# covers exactly the geohashes starting with prefix.
+GEOHASH_RANGE_END = "~"
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(geohash)
+
+
+def geohash_cell_size(precision):
+    """Returns (lat_degrees, lng_degrees) covered by one cell at this precision."""
+    total_bits = precision * 5
+    lng_bits = math.ceil(total_bits / 2)
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def covering_cells(south, west, north, east, precision):
+    """All geohash prefixes of the given precision that intersect the box."""
+    lat_step, lng_step = geohash_cell_size(precision)
+    cells = set()
+
+    lat = south
+    while True:
+        lng = west
+        while True:
+            cells.add(geohash_encode(min(lat, north), min(lng, east), precision))
+            if lng >= east:
+                break
+            lng = min(lng + lng_step, east)
+        if lat >= north:
+            break
+        lat = min(lat + lat_step, north)
+    return sorted(cells)
+
+
+def covering_precision(south, west, north, east, max_cells=32):
+    """Finest precision whose cover of the box stays within max_cells cells."""
+    precision = 1
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lng_step = geohash_cell_size(candidate)
+        rows = math.ceil((north - south) / lat_step) + 1
+        cols = math.ceil((east - west) / lng_step) + 1
+        if rows * cols > max_cells:
+            break
+        precision = candidate
+    return precision
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lng1, lat2, lng2 = (math.radians(float(value)) for value in (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_many(latitude, longitude, latitudes, longitudes):
+    """
+    Distances in kilometres from one point to many, as a list. Uses numpy
+    array operations when it is installed.
+    """
+    if numpy is not None and len(latitudes):
+        lat1 = math.radians(float(latitude))
+        lat2 = numpy.radians(numpy.asarray(latitudes, dtype=float))
+        d_lat = lat2 - lat1
+        d_lng = numpy.radians(numpy.asarray(longitudes, dtype=float) - float(longitude))
+        a = numpy.sin(d_lat / 2) ** 2 + math.cos(lat1) * numpy.cos(lat2) * numpy.sin(d_lng / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(a))).tolist()
+    return [haversine_km(latitude, longitude, lat, lng) for lat, lng in zip(latitudes, longitudes)]
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """(south, west, north, east) of a box containing the circle, clamped to valid coordinates."""
+    latitude = float(latitude)
+    longitude = float(longitude)
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0),
+    )
+
+
+def bbox_cell_filter(south, west, north, east, field='grid_cell'):
+    """
+    Q object matching rows whose geohash column falls in the cells covering
+    the box, as index range scans. Rows just outside the box edges can
+    match, so callers still compare latitude/longitude exactly.
+    """
+    cell_filter = Q()
+    for cell in covering_cells(south, west, north, east, covering_precision(south, west, north, east)):
+        cell_filter |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + GEOHASH_RANGE_END})
+    return cell_filter
+
+
+# WGS84 -> OSGB36 Helmert parameters and the National Grid projection, as
+# published by Ordnance Survey ("A guide to coordinate systems in Great Britain").
+_WGS84 = (6378137.000, 6356752.3141)
+_AIRY1830 = (6377563.396, 6356256.909)
+_HELMERT = {
+    'tx': -446.448, 'ty': 125.157, 'tz': -542.060,
+    's': 20.4894e-6,
+    'rx': math.radians(-0.1502 / 3600), 'ry': math.radians(-0.2470 / 3600), 'rz': math.radians(-0.8421 / 3600),
+}
+_NATIONAL_GRID = {'F0': 0.9996012717, 'lat0': math.radians(49), 'lng0': math.radians(-2), 'E0': 400000, 'N0': -100000}
+
+
+def _to_cartesian(lat, lng, ellipsoid):
+    a, b = ellipsoid
+    e2 = 1 - (b * b) / (a * a)
+    nu = a / math.sqrt(1 - e2 * math.sin(lat) ** 2)
+    return (nu * math.cos(lat) * math.cos(lng), nu * math.cos(lat) * math.sin(lng), (1 - e2) * nu * math.sin(lat))
+
+
+def _from_cartesian(x, y, z, ellipsoid):
+    a, b = ellipsoid
+    e2 = 1 - (b * b) / (a * a)
+    p = math.sqrt(x * x + y * y)
+    lat = math.atan2(z, p * (1 - e2))
+    for _ in range(10):
+        nu = a / math.sqrt(1 - e2 * math.sin(lat) ** 2)
+        previous, lat = lat, math.atan2(z + e2 * nu * math.sin(lat), p)
+        if abs(lat - previous) < 1e-12:
+            break
+    return lat, math.atan2(y, x)
+
+
+def osgb_grid(latitude, longitude):
+    """
+    WGS84 latitude/longitude to Ordnance Survey National Grid (eastings,
+    northings) in whole metres, the same system Venue stores from
+    postcodes.io. Accurate to a few metres across Great Britain.
+    """
+    x, y, z = _to_cartesian(math.radians(float(latitude)), math.radians(float(longitude)), _WGS84)
+    h = _HELMERT
+    scale = 1 + h['s']
+    x, y, z = (
+        h['tx'] + scale * x - h['rz'] * y + h['ry'] * z,
+        h['ty'] + h['rz'] * x + scale * y - h['rx'] * z,
+        h['tz'] - h['ry'] * x + h['rx'] * y + scale * z,
+    )
+    lat, lng = _from_cartesian(x, y, z, _AIRY1830)
+
+    a, b = _AIRY1830
+    g = _NATIONAL_GRID
+    F0, lat0, lng0 = g['F0'], g['lat0'], g['lng0']
+    e2 = 1 - (b * b) / (a * a)
+    n = (a - b) / (a + b)
+    sin_lat, cos_lat, tan_lat = math.sin(lat), math.cos(lat), math.tan(lat)
+    nu = a * F0 / math.sqrt(1 - e2 * sin_lat ** 2)
+    rho = a * F0 * (1 - e2) / (1 - e2 * sin_lat ** 2) ** 1.5
+    eta2 = nu / rho - 1
+
+    d_lat, s_lat = lat - lat0, lat + lat0
+    meridional = b * F0 * (
+        (1 + n + 5 / 4 * n ** 2 + 5 / 4 * n ** 3) * d_lat
+        - (3 * n + 3 * n ** 2 + 21 / 8 * n ** 3) * math.sin(d_lat) * math.cos(s_lat)
+        + (15 / 8 * n ** 2 + 15 / 8 * n ** 3) * math.sin(2 * d_lat) * math.cos(2 * s_lat)
+        - 35 / 24 * n ** 3 * math.sin(3 * d_lat) * math.cos(3 * s_lat)
+    )
+
+    I = meridional + g['N0']
+    II = nu / 2 * sin_lat * cos_lat
+    III = nu / 24 * sin_lat * cos_lat ** 3 * (5 - tan_lat ** 2 + 9 * eta2)
+    IIIA = nu / 720 * sin_lat * cos_lat ** 5 * (61 - 58 * tan_lat ** 2 + tan_lat ** 4)
+    IV = nu * cos_lat
+    V = nu / 6 * cos_lat ** 3 * (nu / rho - tan_lat ** 2)
+    VI = nu / 120 * cos_lat ** 5 * (5 - 18 * tan_lat ** 2 + tan_lat ** 4 + 14 * eta2 - 58 * tan_lat ** 2 * eta2)
+
+    d_lng = lng - lng0
+    northing = I + II * d_lng ** 2 + III * d_lng ** 4 + IIIA * d_lng ** 6
+    easting = g['E0'] + IV * d_lng + V * d_lng ** 3 + VI * d_lng ** 5
+    return int(round(easting)), int(round(northing))
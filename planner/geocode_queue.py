@@ -0,0 +1,211 @@
+"""
+The GeocodeJob queue behind `manage.py geocode_worker`.
+
+Each round claims a batch of due jobs with a single UPDATE (so several
+workers can share the queue), resolves venue postcodes through the bulk
+postcode resolver and event locations through the place backend
+concurrently (on an asyncio loop with a pooled upstream.AsyncJSONClient
+when the backend has search_async, otherwise on a bounded thread pool),
+all behind one rate limiter, and writes coordinates and job states back
+with bulk updates. Only the main thread touches the database.
+"""
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import geocoding, upstream
+from .models import Event, GeocodeJob, Venue
+from .signals import events_bulk_written
+
+# A RUNNING job not finished within this long is assumed abandoned by a dead worker.
+STALE_AFTER = timedelta(minutes=10)
+RETRY_BASE_SECONDS = 30
+
+
+class RateLimitedBackend:
+    """Wraps a postcode backend so each bulk request waits for the limiter."""
+
+    def __init__(self, backend, limiter):
+        self.backend = backend
+        self.limiter = limiter
+
+    def lookup_many(self, postcodes):
+        self.limiter.wait()
+        return self.backend.lookup_many(postcodes)
+
+
+def release_stale_jobs():
+    return GeocodeJob.objects.filter(
+        status=GeocodeJob.RUNNING, updated_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=GeocodeJob.PENDING, locked_by="")
+
+
+def claim_jobs(limit):
+    """Marks up to `limit` due jobs as running under a fresh token and returns them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = GeocodeJob.objects.filter(
+        status=GeocodeJob.PENDING, available_at__lte=now,
+    ).order_by('available_at', 'pk').values_list('pk', flat=True)[:limit]
+    GeocodeJob.objects.filter(pk__in=list(due), status=GeocodeJob.PENDING).update(
+        status=GeocodeJob.RUNNING, locked_by=token, updated_at=now,
+    )
+    return token, list(GeocodeJob.objects.filter(locked_by=token, status=GeocodeJob.RUNNING))
+
+
+class GeocodeWorker:
+
+    def __init__(self, backend=None, place_backend=None, workers=None, rate=None, max_attempts=None):
+        self.limiter = geocoding.RateLimiter(rate if rate is not None else geocoding.geocoder_setting('RATE_LIMIT'))
+        self.backend = RateLimitedBackend(backend or geocoding.get_backend(), self.limiter)
+        self.place_backend = place_backend or geocoding.get_place_backend()
+        self.workers = workers or geocoding.geocoder_setting('WORKERS')
+        self.max_attempts = max_attempts or geocoding.geocoder_setting('MAX_ATTEMPTS')
+        self.done = 0
+        self.failed = 0
+        self.retried = 0
+
+    def run_once(self, batch_size=100):
+        """Processes one batch; returns the number of jobs claimed."""
+        release_stale_jobs()
+        token, jobs = claim_jobs(batch_size)
+        if not jobs:
+            return 0
+
+        venue_jobs = [job for job in jobs if job.target_type == GeocodeJob.VENUE]
+        event_jobs = [job for job in jobs if job.target_type == GeocodeJob.EVENT]
+        outcomes = {}  # job pk -> (coords or None, error or None)
+        outcomes.update(self._resolve_venues(venue_jobs))
+        outcomes.update(self._resolve_events(event_jobs))
+
+        with transaction.atomic():
+            self._write_venues(token, venue_jobs, outcomes)
+            self._write_events(token, event_jobs, outcomes)
+            self._finish(token, jobs, outcomes)
+        return len(jobs)
+
+    def _resolve_venues(self, jobs):
+        if not jobs:
+            return {}
+        try:
+            results = geocoding.resolve_postcodes([job.query for job in jobs], backend=self.backend)
+        except Exception as e:
+            return {job.pk: (None, str(e) or e.__class__.__name__) for job in jobs}
+        return {job.pk: (results.get(geocoding.normalize_postcode(job.query)), None) for job in jobs}
+
+    def _search(self, query):
+        self.limiter.wait()
+        try:
+            matches = self.place_backend.search(query, limit=1)
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__
+        return self._first_match(matches)
+
+    async def _search_async(self, client, query):
+        await self.limiter.wait_async()
+        try:
+            matches = await self.place_backend.search_async(query, client, limit=1)
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__
+        return self._first_match(matches)
+
+    async def _search_all(self, queries):
+        client = upstream.AsyncJSONClient(geocoding.geocoder_setting('TIMEOUT'), max_connections=self.workers)
+        async with client:
+            return await asyncio.gather(*(self._search_async(client, query) for query in queries))
+
+    def _first_match(self, matches):
+        if not matches:
+            return None, None
+        return (matches[0]['latitude'], matches[0]['longitude']), None
+
+    def _resolve_events(self, jobs):
+        if not jobs:
+            return {}
+        queries = sorted({job.query for job in jobs})
+        if hasattr(self.place_backend, 'search_async'):
+            results = dict(zip(queries, asyncio.run(self._search_all(queries))))
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = dict(zip(queries, pool.map(self._search, queries)))
+        return {job.pk: results[job.query] for job in jobs}
+
+    def _found(self, token, jobs, outcomes):
+        """
+        {target_id: coords} for the resolved jobs still held under `token`.
+        A job re-enqueued while it ran (say for a changed postcode) has lost
+        the token or its query, and its stale result is dropped.
+        """
+        resolved = {job.pk: job for job in jobs if outcomes[job.pk][0]}
+        held = set(
+            GeocodeJob.objects.select_for_update()
+            .filter(pk__in=list(resolved), locked_by=token).values_list('pk', 'query')
+        )
+        return {
+            job.target_id: outcomes[job.pk][0]
+            for job in resolved.values() if (job.pk, job.query) in held
+        }
+
+    def _write_venues(self, token, jobs, outcomes):
+        found = self._found(token, jobs, outcomes)
+        # Coordinates set by other means since the job was queued are left alone.
+        venues = list(
+            Venue.objects.select_for_update()
+            .filter(pk__in=list(found), latitude__isnull=True).only('pk')
+        )
+        for venue in venues:
+            venue.eastings, venue.northings, venue.latitude, venue.longitude = found[venue.pk]
+        Venue.objects.bulk_update(venues, ['eastings', 'northings', 'latitude', 'longitude'], batch_size=500)
+
+    def _write_events(self, token, jobs, outcomes):
+        found = self._found(token, jobs, outcomes)
+        events = list(
+            Event.objects.select_for_update()
+            .filter(pk__in=list(found), latitude__isnull=True).only('pk', 'latitude', 'longitude')
+        )
+        for event in events:
+            event.latitude, event.longitude = found[event.pk]
+            event.compute_spatial_fields()
+        Event.objects.bulk_update(
+            events, ['latitude', 'longitude', 'grid_cell', 'eastings', 'northings'], batch_size=500,
+        )
+        if events:
+            # bulk_update sends no post_save, so tell the derived indexes what changed.
+            events_bulk_written.send(sender=GeocodeJob, event_ids=[event.pk for event in events])
+
+    def _finish(self, token, jobs, outcomes):
+        now = timezone.now()
+        done, not_found, retry = [], [], {}
+        for job in jobs:
+            coords, error = outcomes[job.pk]
+            if error is None:
+                (done if coords else not_found).append(job.pk)
+            else:
+                retry.setdefault((job.attempts + 1, error), []).append(job.pk)
+
+        # Filtering on the token leaves alone jobs re-enqueued while they ran.
+        claimed = GeocodeJob.objects.filter(locked_by=token)
+        claimed.filter(pk__in=done).update(status=GeocodeJob.DONE, locked_by="", last_error="", updated_at=now)
+        claimed.filter(pk__in=not_found).update(
+            status=GeocodeJob.FAILED, locked_by="", last_error="Not found", updated_at=now,
+        )
+        self.done += len(done)
+        self.failed += len(not_found)
+
+        for (attempts, error), pks in retry.items():
+            if attempts >= self.max_attempts:
+                claimed.filter(pk__in=pks).update(
+                    status=GeocodeJob.FAILED, attempts=attempts, locked_by="", last_error=error, updated_at=now,
+                )
+                self.failed += len(pks)
+            else:
+                # Exponential backoff: 30s, 60s, 120s, ...
+                claimed.filter(pk__in=pks).update(
+                    status=GeocodeJob.PENDING, attempts=attempts, locked_by="", last_error=error, updated_at=now,
+                    available_at=now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1)),
+                )
+                self.retried += len(pks)
@@ -0,0 +1,294 @@
+"""
+Geocoding for venue postcodes and event locations.
+
+Postcode lookups go through a pluggable backend (postcodes.io by default,
+or the offline LocalBackend) and are persisted in the GeocodeCache table.
+Free-text place searches use a separate place backend (Nominatim, or the
+offline LocalPlaceBackend); planner.places caches them for the event
+creation map. Model saves only ever read the cache or queue
+a GeocodeJob; the network is only used by resolve_postcodes() and the
+geocode worker.
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+GEOCODER_DEFAULTS = {
+    'BACKEND': 'planner.geocoding.PostcodesIOBackend',
+    'TIMEOUT': 5,
+    'BATCH_SIZE': 100,
+    'TTL_DAYS': 90,
+    # Postcodes the backend could not resolve are remembered for less time.
+    'NEGATIVE_TTL_DAYS': 7,
+    'MAX_ENTRIES': 50000,
+    'LOCAL_POSTCODES': {},
+    'PLACE_BACKEND': 'planner.geocoding.NominatimBackend',
+    'USER_AGENT': 'SAS_app event planner',
+    # Backend requests per second across all worker threads (Nominatim allows 1).
+    'RATE_LIMIT': 1.0,
+    'WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'LOCAL_PLACES': {},
+    # Nominatim results are biased towards this (west, north, east, south) box.
+    'PLACE_VIEWBOX': (-4.45, 55.95, -4.05, 55.78),
+    'PLACE_COUNTRY_CODES': 'gb',
+    # Place searches kept in each process's memory ahead of the PlaceCache table.
+    'PLACE_LRU_SIZE': 1024,
+    # Lookups made while serving a request (planner.upstream): a shorter timeout
+    # and at most this many at once per process. They never wait for RATE_LIMIT;
+    # one that finds its slot taken fails at once (see planner.places).
+    'REQUEST_TIMEOUT': 3,
+    'REQUEST_CONCURRENCY': 4,
+    # Consecutive failures that stop request-path lookups, and for how many seconds.
+    'BREAKER_FAILURES': 5,
+    'BREAKER_COOLDOWN': 30,
+}
+
+
+def geocoder_setting(name):
+    return getattr(settings, 'PLANNER_GEOCODER', {}).get(name, GEOCODER_DEFAULTS[name])
+
+
+def normalize_postcode(postcode):
+    # "g1 1aa", "G11AA " and "G1  1AA" all share one cache entry.
+    compact = "".join((postcode or "").split()).upper()
+    if len(compact) > 3:
+        return f"{compact[:-3]} {compact[-3:]}"
+    return compact
+
+
+class PostcodesIOBackend:
+    url = "https://api.postcodes.io/postcodes"
+    max_batch = 100  # postcodes.io bulk lookup limit
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or geocoder_setting('TIMEOUT')
+
+    def lookup_many(self, postcodes):
+        """Returns {postcode: (eastings, northings, latitude, longitude)} for the ones found."""
+        found = {}
+        postcodes = list(postcodes)
+        for i in range(0, len(postcodes), self.max_batch):
+            chunk = postcodes[i:i + self.max_batch]
+            request = Request(
+                self.url,
+                data=json.dumps({'postcodes': chunk}).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+            )
+            with urlopen(request, timeout=self.timeout) as response:
+                data = json.load(response)
+            for item in data.get('result') or []:
+                result = item.get('result')
+                if result:
+                    found[normalize_postcode(item['query'])] = (
+                        result.get('eastings'),
+                        result.get('northings'),
+                        Decimal(str(result.get('latitude'))),
+                        Decimal(str(result.get('longitude'))),
+                    )
+        return found
+
+
+class LocalBackend:
+    """
+    Offline stand-in that answers from PLANNER_GEOCODER['LOCAL_POSTCODES']
+    ({postcode: (eastings, northings, latitude, longitude)}) and never
+    touches the network.
+    """
+
+    def __init__(self, postcodes=None):
+        table = postcodes if postcodes is not None else geocoder_setting('LOCAL_POSTCODES')
+        self.postcodes = {normalize_postcode(k): v for k, v in table.items()}
+
+    def lookup_many(self, postcodes):
+        found = {}
+        for postcode in postcodes:
+            coords = self.postcodes.get(normalize_postcode(postcode))
+            if coords:
+                eastings, northings, latitude, longitude = coords
+                found[normalize_postcode(postcode)] = (
+                    eastings, northings, Decimal(str(latitude)), Decimal(str(longitude)),
+                )
+        return found
+
+
+class NominatimBackend:
+    url = "https://nominatim.openstreetmap.org/search"
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or geocoder_setting('TIMEOUT')
+
+    def search(self, query, limit=5):
+        """Returns up to `limit` [{'name', 'latitude', 'longitude'}] matches, best first."""
+        request = Request(f"{self.url}?{urlencode(self._params(query, limit))}", headers=self._headers())
+        with urlopen(request, timeout=self.timeout) as response:
+            data = json.load(response)
+        return self._matches(data, query)
+
+    async def search_async(self, query, client, limit=5):
+        """As search(), through an upstream.AsyncJSONClient."""
+        data = await client.get_json(self.url, params=self._params(query, limit), headers=self._headers())
+        return self._matches(data, query)
+
+    def _params(self, query, limit):
+        params = {'q': query, 'format': 'json', 'limit': limit}
+        if geocoder_setting('PLACE_VIEWBOX'):
+            params['viewbox'] = ",".join(str(value) for value in geocoder_setting('PLACE_VIEWBOX'))
+        if geocoder_setting('PLACE_COUNTRY_CODES'):
+            params['countrycodes'] = geocoder_setting('PLACE_COUNTRY_CODES')
+        return params
+
+    def _headers(self):
+        return {'User-Agent': geocoder_setting('USER_AGENT')}
+
+    def _matches(self, data, query):
+        return [
+            {
+                'name': item.get('display_name', query),
+                'latitude': Decimal(str(item['lat'])).quantize(Decimal('0.000001')),
+                'longitude': Decimal(str(item['lon'])).quantize(Decimal('0.000001')),
+            }
+            for item in data
+        ]
+
+
+class LocalPlaceBackend:
+    """
+    Offline place search over PLANNER_GEOCODER['LOCAL_PLACES']
+    ({name: (latitude, longitude)}): case-insensitive substring match.
+    """
+
+    def __init__(self, places=None, timeout=None):
+        # timeout is accepted like the network backends' and ignored.
+        self.places = places if places is not None else geocoder_setting('LOCAL_PLACES')
+
+    def search(self, query, limit=5):
+        query = (query or "").lower()
+        return [
+            {'name': name, 'latitude': Decimal(str(lat)), 'longitude': Decimal(str(lng))}
+            for name, (lat, lng) in self.places.items() if query and query in name.lower()
+        ][:limit]
+
+
+def get_backend(path=None):
+    return import_string(path or geocoder_setting('BACKEND'))()
+
+
+def get_place_backend(path=None, **kwargs):
+    return import_string(path or geocoder_setting('PLACE_BACKEND'))(**kwargs)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        return slot - now
+
+
+def _fresh_entries(postcodes):
+    from .models import GeocodeCache
+
+    now = timezone.now()
+    entries = {}
+    for entry in GeocodeCache.objects.filter(postcode__in=postcodes):
+        ttl = geocoder_setting('TTL_DAYS') if entry.found else geocoder_setting('NEGATIVE_TTL_DAYS')
+        if entry.fetched_at >= now - timedelta(days=ttl):
+            entries[entry.postcode] = entry
+    return entries
+
+
+def cached_coordinates(postcode):
+    """
+    Cache-only lookup used from Venue.save. Returns the coordinates tuple,
+    or None when the postcode has not been resolved yet (or not found).
+    """
+    postcode = normalize_postcode(postcode)
+    if not postcode:
+        return None
+    entry = _fresh_entries([postcode]).get(postcode)
+    if entry is None or not entry.found:
+        return None
+    return entry.as_coordinates()
+
+
+def resolve_postcodes(postcodes, backend=None):
+    """
+    Bulk resolver: answers from the cache where possible and sends the
+    misses to the backend in batches, recording results (including
+    not-found postcodes) in the cache. Returns {postcode: coords or None}.
+    """
+    from .models import GeocodeCache
+
+    postcodes = {normalize_postcode(p) for p in postcodes if p}
+    postcodes.discard("")
+    entries = _fresh_entries(postcodes)
+    results = {p: entry.as_coordinates() if entry.found else None for p, entry in entries.items()}
+
+    missing = sorted(postcodes - set(entries))
+    if missing:
+        backend = backend or get_backend()
+        batch_size = geocoder_setting('BATCH_SIZE')
+        for i in range(0, len(missing), batch_size):
+            chunk = missing[i:i + batch_size]
+            found = backend.lookup_many(chunk)
+            now = timezone.now()
+            GeocodeCache.objects.filter(postcode__in=chunk).delete()
+            GeocodeCache.objects.bulk_create([
+                GeocodeCache.from_coordinates(postcode, found.get(postcode), now)
+                for postcode in chunk
+            ])
+            for postcode in chunk:
+                results[postcode] = found.get(postcode)
+        prune_cache()
+
+    return results
+
+
+def prune_cache(max_entries=None):
+    """Drops expired entries, then the oldest ones beyond MAX_ENTRIES."""
+    from .models import GeocodeCache
+
+    now = timezone.now()
+    GeocodeCache.objects.filter(
+        found=True, fetched_at__lt=now - timedelta(days=geocoder_setting('TTL_DAYS'))
+    ).delete()
+    GeocodeCache.objects.filter(
+        found=False, fetched_at__lt=now - timedelta(days=geocoder_setting('NEGATIVE_TTL_DAYS'))
+    ).delete()
+
+    max_entries = max_entries or geocoder_setting('MAX_ENTRIES')
+    cutoff = (
+        GeocodeCache.objects.order_by('-fetched_at')
+        .values_list('fetched_at', flat=True)[max_entries:max_entries + 1]
+    )
+    cutoff = list(cutoff)
+    if cutoff:
+        GeocodeCache.objects.filter(fetched_at__lte=cutoff[0]).delete()
@@ -0,0 +1,263 @@
+"""
+Batched event/occurrence loader used by `manage.py import_events`.
+
+Each input row describes one occurrence plus the event it belongs to.
+Events are matched on (title, location_name, kind), the same key
+populate_planner.py uses with get_or_create.
+"""
+import csv
+import json
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+
+import pytz
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import rollups
+from .models import Event, EventOccurrence, GeocodeJob
+from .signals import events_bulk_written
+from .tags import normalize_tag_name, resolve_tags
+
+EVENT_KINDS = {choice[0] for choice in Event._meta.get_field('kind').choices}
+BUDGET_BANDS = {choice[0] for choice in Event._meta.get_field('budget').choices}
+
+# Bounds of the columns the values are written to, so one bad row cannot fail a whole batch.
+# EventOccurrence.duration_hours: 4 digits, 2 decimal places.
+MIN_DURATION_HOURS, MAX_DURATION_HOURS = Decimal('0.01'), Decimal('99.99')
+MAX_POSITIVE_INT = 2 ** 31 - 1  # PositiveIntegerField
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        # Decoded by parse_row, so a malformed line is skipped like any other bad row.
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def _decimal(value, default=None):
+    if value in (None, ""):
+        return default
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ImportRowError(f"Invalid number: {value!r}")
+    if not number.is_finite():
+        raise ImportRowError(f"Invalid number: {value!r}")
+    return number
+
+
+def _int(value, default=None, minimum=0, maximum=MAX_POSITIVE_INT):
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid integer: {value!r}")
+    if not minimum <= number <= maximum:
+        raise ImportRowError(f"Integer out of range: {value!r}")
+    return number
+
+
+def parse_row(row):
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise ImportRowError(f"Invalid JSON: {e}")
+    if not isinstance(row, dict):
+        raise ImportRowError(f"Expected an object, got {type(row).__name__}")
+    title = str(row.get('title') or "").strip()
+    if not title:
+        raise ImportRowError("Missing title")
+
+    try:
+        # parse_datetime raises for well-formed but impossible values such as month 13,
+        # and make_aware for local times a DST change skips or repeats.
+        start_datetime = parse_datetime(str(row.get('start_datetime') or ""))
+        if start_datetime is not None and timezone.is_naive(start_datetime):
+            start_datetime = timezone.make_aware(start_datetime)
+    except (ValueError, pytz.InvalidTimeError):
+        start_datetime = None
+    if start_datetime is None:
+        raise ImportRowError(f"Invalid start_datetime: {row.get('start_datetime')!r}")
+
+    kind = str(row.get('kind') or 'OTHER').upper()
+    if kind not in EVENT_KINDS:
+        kind = 'OTHER'
+    budget = str(row.get('budget') or 'MEDIUM').upper()
+    if budget not in BUDGET_BANDS:
+        raise ImportRowError(f"Invalid budget: {budget!r}")
+
+    tags = row.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    if not isinstance(tags, list):
+        raise ImportRowError(f"Invalid tags: {tags!r}")
+    tags = sorted({normalize_tag_name(name) for name in tags if name and str(name).strip()})
+
+    latitude, longitude = _decimal(row.get('latitude')), _decimal(row.get('longitude'))
+    if (latitude is not None and abs(latitude) > 90) or (longitude is not None and abs(longitude) > 180):
+        raise ImportRowError(f"Coordinates out of range: {latitude}, {longitude}")
+    duration_hours = _decimal(row.get('duration_hours'), Decimal('2.0'))
+    if not MIN_DURATION_HOURS <= duration_hours <= MAX_DURATION_HOURS:
+        raise ImportRowError(f"duration_hours out of range: {duration_hours}")
+    # Truncated to the column's two places, which keeps it inside the range just checked.
+    duration_hours = duration_hours.quantize(MIN_DURATION_HOURS, rounding=ROUND_DOWN)
+    min_group_size = _int(row.get('min_group_size'), 2, minimum=1)
+    max_group_size = _int(row.get('max_group_size'), minimum=1)
+    actual_attendees = _int(row.get('actual_attendees'), 0)
+
+    return {
+        'title': title,
+        'description': str(row.get('description') or ""),
+        'kind': kind,
+        'budget': budget,
+        'latitude': latitude,
+        'longitude': longitude,
+        'location_name': str(row.get('location_name') or "").strip(),
+        'min_group_size': min_group_size,
+        'max_group_size': max_group_size,
+        'tags': tags,
+        'start_datetime': start_datetime,
+        'duration_hours': duration_hours,
+        'actual_attendees': actual_attendees,
+    }
+
+
+def event_key(values):
+    return (values['title'], values['location_name'], values['kind'])
+
+
+class EventImporter:
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.rows = 0
+        self.errors = 0
+        self.events_created = 0
+        self.occurrences_created = 0
+
+    def run(self, rows, on_batch=None):
+        # Each batch's rollup days are re-aggregated once, after the last batch.
+        with rollups.deferred():
+            self._run(rows, on_batch)
+
+    def _run(self, rows, on_batch):
+        batch = []
+        for line_number, row in enumerate(rows, start=1):
+            try:
+                batch.append(parse_row(row))
+            except ImportRowError as e:
+                self.errors += 1
+                if on_batch:
+                    on_batch(self, error=f"row {line_number}: {e}")
+                continue
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+                if on_batch:
+                    on_batch(self)
+        if batch:
+            self.import_batch(batch)
+            if on_batch:
+                on_batch(self)
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        tags = resolve_tags(sorted({name for values in batch for name in values['tags']}))
+        events = self._resolve_events(batch)
+
+        through = Event.tags.through
+        links = {
+            (events[event_key(values)].pk, tags[name].pk)
+            for values in batch for name in values['tags']
+        }
+        through.objects.bulk_create(
+            [through(event_id=event_id, tag_id=tag_id) for event_id, tag_id in links],
+            ignore_conflicts=True,
+        )
+
+        occurrences = {}
+        for values in batch:
+            event = events[event_key(values)]
+            occurrence = EventOccurrence(
+                event=event,
+                start_datetime=values['start_datetime'],
+                duration_hours=values['duration_hours'],
+                actual_attendees=values['actual_attendees'],
+            )
+            occurrence.compute_derived_fields()
+            occurrences[(event.pk, values['start_datetime'])] = occurrence
+        existing = set(EventOccurrence.objects.filter(
+            event_id__in={event_id for event_id, _ in occurrences},
+            start_datetime__in={start for _, start in occurrences},
+        ).values_list('event_id', 'start_datetime'))
+        new_occurrences = [occ for key, occ in occurrences.items() if key not in existing]
+        EventOccurrence.objects.bulk_create(new_occurrences, ignore_conflicts=True)
+        self.occurrences_created += len(new_occurrences)
+        self.rows += len(batch)
+
+        # bulk_create sends no post_save, so tell the derived indexes what changed.
+        events_bulk_written.send(
+            sender=self.__class__,
+            event_ids=sorted({event.pk for event in events.values()}),
+            occurrence_days={rollups.local_date(occurrence.start_datetime) for occurrence in new_occurrences},
+        )
+
+    def _resolve_events(self, batch):
+        wanted = {}
+        for values in batch:
+            wanted.setdefault(event_key(values), values)
+
+        titles = {key[0] for key in wanted}
+        events = {
+            (event.title, event.location_name, event.kind): event
+            for event in Event.objects.filter(title__in=titles)
+        }
+
+        new_events = []
+        for key, values in wanted.items():
+            if key in events:
+                continue
+            event = Event(
+                title=values['title'],
+                description=values['description'],
+                kind=values['kind'],
+                budget=values['budget'],
+                latitude=values['latitude'],
+                longitude=values['longitude'],
+                location_name=values['location_name'],
+                min_group_size=values['min_group_size'],
+                max_group_size=values['max_group_size'],
+            )
+            # bulk_create skips save(), so apply what save() would have done.
+            if event.max_group_size and event.max_group_size < event.min_group_size:
+                event.max_group_size = event.min_group_size
+            event.compute_spatial_fields()
+            new_events.append(event)
+
+        if new_events:
+            Event.assign_slugs(new_events)
+            Event.objects.bulk_create(new_events)
+            # Not every backend returns primary keys from a bulk insert, so look them up by slug.
+            created = Event.objects.filter(slug__in=[event.slug for event in new_events])
+            for event in created:
+                events[(event.title, event.location_name, event.kind)] = event
+            self.events_created += len(new_events)
+            # Rows without coordinates are geocoded from location_name by the worker.
+            GeocodeJob.enqueue(GeocodeJob.EVENT, {
+                event.pk: event.location_name for event in created if event.latitude is None
+            })
+
+        return events
@@ -0,0 +1,82 @@
+"""
+The OccurrenceListing read model behind the dashboard listings.
+
+Each stored EventOccurrence has one OccurrenceListing row carrying the
+event columns the listings filter on (kind, budget), sort by and
+serialize. Listing queries therefore never join to Event, and each filter
+combination is a range scan over a composite (filter..., start_datetime,
+id) index. The receivers in planner.signals keep the rows current;
+`manage.py rebuild_listings` regenerates the whole table.
+"""
+from django.db import connection
+
+# Event columns copied onto every listing row.
+EVENT_FIELDS = (
+    'title', 'kind', 'budget', 'description', 'slug', 'latitude', 'longitude', 'location_name', 'grid_cell',
+)
+
+SOURCE_COLUMNS = (
+    'pk', 'event_id', 'start_datetime', 'end_datetime', 'duration_hours', 'actual_attendees',
+) + tuple(f'event__{field}' for field in EVENT_FIELDS)
+LISTING_FIELDS = (
+    'occurrence_id', 'event_id', 'start_datetime', 'end_datetime', 'duration_hours', 'actual_attendees',
+) + EVENT_FIELDS
+
+# Event ids re-listed per statement.
+BATCH_SIZE = 500
+
+
+def _create_from(occurrences):
+    """
+    Copies the occurrences (an EventOccurrence queryset) into the listing
+    table with one INSERT ... SELECT, so the rows never pass through Python.
+    """
+    from .models import OccurrenceListing
+
+    select, params = occurrences.order_by().values_list(*SOURCE_COLUMNS).query.sql_with_params()
+    meta = OccurrenceListing._meta
+    columns = ", ".join(connection.ops.quote_name(meta.get_field(name).column) for name in LISTING_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columns}) {select}", params)
+        return cursor.rowcount
+
+
+def sync_occurrences(occurrence_ids):
+    """Rewrites the listing rows of the given occurrences; missing ids are dropped."""
+    from .models import EventOccurrence, OccurrenceListing
+
+    occurrence_ids = list(occurrence_ids)
+    if not occurrence_ids:
+        return
+    OccurrenceListing.objects.filter(occurrence_id__in=occurrence_ids).delete()
+    _create_from(EventOccurrence.objects.filter(pk__in=occurrence_ids))
+
+
+def sync_events(event_ids):
+    """Rewrites the listing rows of every occurrence of the given events."""
+    from .models import EventOccurrence, OccurrenceListing
+
+    event_ids = sorted(set(event_ids))
+    created = 0
+    for i in range(0, len(event_ids), BATCH_SIZE):
+        chunk = event_ids[i:i + BATCH_SIZE]
+        OccurrenceListing.objects.filter(event_id__in=chunk).delete()
+        created += _create_from(EventOccurrence.objects.filter(event_id__in=chunk))
+    return created
+
+
+def update_event(event):
+    """Copies a saved event's columns onto its listing rows in one UPDATE."""
+    from .models import OccurrenceListing
+
+    OccurrenceListing.objects.filter(event_id=event.pk).update(
+        **{field: getattr(event, field) for field in EVENT_FIELDS}
+    )
+
+
+def rebuild():
+    """Regenerates every listing row; returns how many were written."""
+    from .models import Event, OccurrenceListing
+
+    OccurrenceListing.objects.all().delete()
+    return sync_events(Event.objects.values_list('pk', flat=True))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from planner import synthetic
+
+
+class Command(BaseCommand):
+    help = "Generates synthetic events and occurrences around Glasgow for load and benchmark testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1000)
+        parser.add_argument('--occurrences-per-event', type=int, default=10)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--spread-km', type=float, default=10.0, help="Radius around Glasgow city centre")
+        parser.add_argument('--days', type=int, default=180, help="How far ahead occurrences are spread")
+        parser.add_argument('--seed', type=int, help="Make the data reproducible")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = synthetic.populate(
+            batch_size=options['batch_size'],
+            events=options['events'],
+            occurrences_per_event=options['occurrences_per_event'],
+            tags=options['tags'],
+            spread_km=options['spread_km'],
+            days=options['days'],
+            seed=options['seed'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {importer.events_created} events and {importer.occurrences_created} occurrences "
+            f"in {elapsed:.2f}s ({importer.rows / elapsed if elapsed else 0:.0f} rows/sec)."
+        ))
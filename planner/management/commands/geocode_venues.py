@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from planner.models import GeocodeJob, Venue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues a geocode job for every venue with a postcode but no coordinates, "
+        "e.g. venues saved before the queue existed. `manage.py geocode_worker` resolves them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Venues queued per statement")
+
+    def handle(self, *args, **options):
+        venues = dict(
+            Venue.objects.exclude(postcode="").filter(latitude__isnull=True)
+            .order_by('pk').values_list('pk', 'postcode')
+        )
+        if not venues:
+            self.stdout.write("No venues need geocoding.")
+            return
+
+        pks = list(venues)
+        for i in range(0, len(pks), options['batch_size']):
+            # Jobs already waiting for the same postcode are left alone; finished ones are retried.
+            GeocodeJob.enqueue(GeocodeJob.VENUE, {pk: venues[pk] for pk in pks[i:i + options['batch_size']]})
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued {len(venues)} venues; run `manage.py geocode_worker` to resolve them."
+        ))
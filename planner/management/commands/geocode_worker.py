@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from planner import geocoding
+from planner.geocode_queue import GeocodeWorker
+
+
+class Command(BaseCommand):
+    help = "Drains the geocode job queue, writing coordinates back to venues and events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty instead of polling")
+        parser.add_argument('--batch-size', type=int, default=100, help="Jobs claimed per round")
+        parser.add_argument('--workers', type=int, help="Concurrent place searches (default: PLANNER_GEOCODER['WORKERS'])")
+        parser.add_argument('--rate', type=float, help="Backend requests per second (default: PLANNER_GEOCODER['RATE_LIMIT'])")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--backend', help="Dotted path of the postcode backend, e.g. planner.geocoding.LocalBackend")
+        parser.add_argument('--place-backend', help="Dotted path of the place backend, e.g. planner.geocoding.LocalPlaceBackend")
+
+    def handle(self, *args, **options):
+        worker = GeocodeWorker(
+            backend=geocoding.get_backend(options['backend']) if options['backend'] else None,
+            place_backend=geocoding.get_place_backend(options['place_backend']) if options['place_backend'] else None,
+            workers=options['workers'],
+            rate=options['rate'],
+        )
+        try:
+            while True:
+                claimed = worker.run_once(batch_size=options['batch_size'])
+                if claimed:
+                    self.stdout.write(
+                        f"Processed {claimed} jobs ({worker.done} done, {worker.failed} failed, "
+                        f"{worker.retried} retrying so far)"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocode worker stopped: {worker.done} done, {worker.failed} failed, {worker.retried} retrying."
+        ))
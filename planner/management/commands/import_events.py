@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner.importing import EventImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams events/occurrences from a CSV or JSONL file (or '-' for stdin) "
+        "and inserts them in batched transactions with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' to read from stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            extension = os.path.splitext(path)[1].lower().lstrip('.')
+            if extension not in ('csv', 'jsonl'):
+                raise CommandError("Cannot infer the format; pass --format csv or --format jsonl")
+            fmt = extension
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        importer = EventImporter(batch_size=options['batch_size'])
+        started = time.monotonic()
+
+        def report(importer, error=None):
+            if error:
+                self.stderr.write(f"Skipped {error}")
+            elif options['verbosity'] > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{importer.rows} rows ({importer.rows / elapsed:.0f} rows/sec)")
+
+        if path == '-':
+            importer.run(read_rows(sys.stdin, fmt), on_batch=report)
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    importer.run(read_rows(stream, fmt), on_batch=report)
+            except FileNotFoundError:
+                raise CommandError(f"No such file: {path}")
+
+        elapsed = time.monotonic() - started
+        rate = importer.rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec): "
+            f"{importer.events_created} new events, {importer.occurrences_created} new occurrences, "
+            f"{importer.errors} rows skipped."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from planner import listings
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the denormalized OccurrenceListing table used by the dashboard listings."
+
+    def handle(self, *args, **options):
+        count = listings.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} occurrence listings."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from planner import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the AttendanceRollup table used by the attendance analytics."
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} attendance rollups."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from planner import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the event full-text search index from scratch."
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        backend = "FTS5" if search.uses_fts5() else "SearchTerm"
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} events ({backend})."))
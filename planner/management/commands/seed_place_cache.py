@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from planner import places
+
+
+class Command(BaseCommand):
+    help = "Seeds the place search cache with GLASGOW_LOCATIONS and the named locations events already use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-events', action='store_true', help="Only seed GLASGOW_LOCATIONS")
+
+    def handle(self, *args, **options):
+        known = list(places.GLASGOW_LOCATIONS)
+        if not options['no_events']:
+            known += places.event_locations()
+        seeded = places.seed_cache(known)
+        places.prune_cache()
+        self.stdout.write(self.style.SUCCESS(f"Seeded {seeded} place queries from {len(known)} locations."))
@@ -0,0 +1,258 @@
+"""
+Per-view timing and SQL instrumentation.
+
+Every measured request records wall time, the number of SQL queries and
+their total time, how many were exact repeats (same SQL and parameters)
+and the response size. Queries are observed through connection execute
+wrappers, so this works with DEBUG off and costs a couple of clock reads
+per query. Results go out as a Server-Timing header and into an
+in-process ring buffer plus cumulative totals, which the /planner/_metrics
+endpoint renders in the Prometheus text format.
+
+Enable with PLANNER_METRICS['ENABLED'], then either add
+'planner.metrics.MetricsMiddleware' to MIDDLEWARE to measure every view
+or rely on the views decorated with @instrument_view. Both are no-ops
+while disabled.
+"""
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+METRICS_DEFAULTS = {
+    'ENABLED': False,
+    # Requests kept for the quantiles on /planner/_metrics.
+    'BUFFER_SIZE': 2048,
+    'SERVER_TIMING': True,
+    # Requests repeating at least this many queries are logged.
+    'DUPLICATE_WARNING': 5,
+    # Lets a scraper read /planner/_metrics with "Authorization: Bearer <token>".
+    'TOKEN': '',
+}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# The view label of requests that match no URL pattern. Using the path instead
+# would give every 404 probe its own label and let the totals grow without bound.
+UNRESOLVED_VIEW = "<unresolved>"
+
+Sample = namedtuple('Sample', [
+    'view', 'method', 'status', 'seconds', 'queries', 'sql_seconds', 'duplicates', 'response_bytes',
+])
+
+
+def metrics_setting(name):
+    return getattr(settings, 'PLANNER_METRICS', {}).get(name, METRICS_DEFAULTS[name])
+
+
+class QueryTimer:
+    """Execute wrapper that counts and times queries and spots exact repeats."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.duplicates = 0
+        self.seen = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+            if not many:
+                key = (sql, repr(params))
+                if key in self.seen:
+                    self.duplicates += 1
+                    self.seen[key] += 1
+                else:
+                    self.seen[key] = 1
+
+    def most_repeated(self):
+        (sql, _), count = max(self.seen.items(), key=lambda item: item[1])
+        return sql, count
+
+
+class MetricsStore:
+    """Ring buffer of recent samples plus per-view totals since the process started."""
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def add(self, sample):
+        with self.lock:
+            self.samples.append(sample)
+            totals = self.totals.setdefault((sample.view, sample.method, sample.status), [0, 0.0, 0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += sample.seconds
+            totals[2] += sample.queries
+            totals[3] += sample.sql_seconds
+            totals[4] += sample.duplicates
+            totals[5] += sample.response_bytes
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.samples), {key: list(values) for key, values in self.totals.items()}
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MetricsStore(metrics_setting('BUFFER_SIZE'))
+        return _store
+
+
+def _view_name(request, default):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else None) or default
+
+
+def _response_bytes(response):
+    if response.streaming:
+        # The body is produced after the view returns; only a declared length is known.
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+@contextmanager
+def measure():
+    """Times the block and every query run on any connection inside it."""
+    timer = QueryTimer()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        yield timer
+    timer.elapsed = time.perf_counter() - started
+
+
+def record(request, response, timer, default_view):
+    """Stores the sample and adds the Server-Timing header."""
+    sample = Sample(
+        view=_view_name(request, default_view),
+        method=request.method,
+        status=response.status_code,
+        seconds=timer.elapsed,
+        queries=timer.queries,
+        sql_seconds=timer.seconds,
+        duplicates=timer.duplicates,
+        response_bytes=_response_bytes(response),
+    )
+    get_store().add(sample)
+
+    if timer.duplicates >= metrics_setting('DUPLICATE_WARNING'):
+        sql, count = timer.most_repeated()
+        logger.warning("%s ran %d duplicate queries; most repeated (%dx): %s",
+                       sample.view, timer.duplicates, count, sql[:300])
+
+    if metrics_setting('SERVER_TIMING'):
+        response['Server-Timing'] = (
+            f'app;dur={sample.seconds * 1000:.1f}, '
+            f'sql;dur={sample.sql_seconds * 1000:.1f};desc="{sample.queries} queries, {sample.duplicates} duplicate"'
+        )
+    return sample
+
+
+class MetricsMiddleware:
+    """Measures every request; removes itself unless PLANNER_METRICS['ENABLED']."""
+
+    def __init__(self, get_response):
+        if not metrics_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._planner_metrics = True
+        with measure() as timer:
+            response = self.get_response(request)
+        record(request, response, timer, default_view=UNRESOLVED_VIEW)
+        return response
+
+
+def instrument_view(view):
+    """Measures one view when metrics are enabled and the middleware is not already doing so."""
+    default_view = f"{view.__module__}.{view.__name__}"
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not metrics_setting('ENABLED') or getattr(request, '_planner_metrics', False):
+            return view(request, *args, **kwargs)
+        request._planner_metrics = True
+        with measure() as timer:
+            response = view(request, *args, **kwargs)
+        record(request, response, timer, default_view)
+        return response
+    return wrapper
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _quantile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def prometheus_text():
+    """The recorded metrics in the Prometheus text exposition format."""
+    samples, totals = get_store().snapshot()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    counters = (
+        ('planner_requests_total', "Requests measured, by view, method and status.", 0),
+        ('planner_request_seconds_total', "Wall time spent in views.", 1),
+        ('planner_sql_queries_total', "SQL queries run by views.", 2),
+        ('planner_sql_seconds_total', "Time spent executing SQL in views.", 3),
+        ('planner_duplicate_queries_total', "Queries that exactly repeated an earlier one in the same request.", 4),
+        ('planner_response_bytes_total', "Response bytes produced by views (declared length for streams).", 5),
+    )
+    for name, help_text, index in counters:
+        family(name, 'counter', help_text)
+        for (view, method, status), values in sorted(totals.items()):
+            lines.append(f"{name}{_labels(view=view, method=method, status=status)} {values[index]}")
+
+    by_view = {}
+    for sample in samples:
+        by_view.setdefault(sample.view, []).append(sample)
+    gauges = (
+        ('planner_request_seconds', "Recent request wall time quantiles.", 'seconds'),
+        ('planner_request_sql_queries', "Recent per-request SQL query count quantiles.", 'queries'),
+        ('planner_request_sql_seconds', "Recent per-request SQL time quantiles.", 'sql_seconds'),
+    )
+    for name, help_text, field in gauges:
+        family(name, 'gauge', help_text)
+        for view, view_samples in sorted(by_view.items()):
+            values = [getattr(sample, field) for sample in view_samples]
+            for fraction in QUANTILES:
+                lines.append(f"{name}{_labels(view=view, quantile=fraction)} {_quantile(values, fraction)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,22 @@
+# Generated by Django 2.2 on 2026-10-17 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='budget',
+            field=models.CharField(choices=[('LOW', '£'), ('MEDIUM', '££'), ('HIGH', '£££')], default='MEDIUM', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='eventoccurrence',
+            index=models.Index(fields=['start_datetime', 'id'], name='planner_eve_start_d_de6418_idx'),
+        ),
+    ]
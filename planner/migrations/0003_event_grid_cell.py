@@ -0,0 +1,29 @@
+# Generated by Django 2.2 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+from planner.geo import geohash_encode
+
+
+def backfill_grid_cells(apps, schema_editor):
+    Event = apps.get_model('planner', 'Event')
+    events = list(Event.objects.exclude(latitude=None).exclude(longitude=None))
+    for event in events:
+        event.grid_cell = geohash_encode(event.latitude, event.longitude)
+    Event.objects.bulk_update(events, ['grid_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0002_occurrence_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='grid_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
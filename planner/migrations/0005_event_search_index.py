@@ -0,0 +1,50 @@
+# Generated by Django 2.2 on 2026-10-17 01:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from planner import search
+
+
+def create_fts_index(apps, schema_editor):
+    search.create_fts_table(schema_editor)
+    if not search.uses_fts5(schema_editor.connection):
+        # The SearchTerm fallback is filled by `manage.py rebuild_search_index`.
+        return
+    Event = apps.get_model('planner', 'Event')
+    rows = []
+    for event in Event.objects.prefetch_related('tags'):
+        tags = " ".join(tag.name for tag in event.tags.all())
+        rows.append((event.pk, event.title, event.description, event.location_name, tags))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {search.FTS_TABLE}(rowid, title, description, location_name, tags) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    search.drop_fts_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0004_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=50)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='planner.Event')),
+            ],
+            options={
+                'unique_together': {('term', 'event')},
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
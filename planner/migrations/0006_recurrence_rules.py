@@ -0,0 +1,46 @@
+# Generated by Django 2.2 on 2026-10-17 01:09
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import multiselectfield.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0005_event_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurrenceRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], default='WEEKLY', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('weekdays', multiselectfield.db.fields.MultiSelectField(blank=True, choices=[('MON', 'Monday'), ('TUE', 'Tuesday'), ('WED', 'Wednesday'), ('THU', 'Thursday'), ('FRI', 'Friday'), ('SAT', 'Saturday'), ('SUN', 'Sunday')], help_text='Weekly rules only; defaults to the weekday of the first occurrence.', max_length=27)),
+                ('dtstart', models.DateTimeField(help_text='Start of the first occurrence.')),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Total number of occurrences.', null=True)),
+                ('duration_hours', models.DecimalField(decimal_places=2, default=2.0, max_digits=4)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence_rules', to='planner.Event')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurrenceException',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField()),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='planner.RecurrenceRule')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recurrencerule',
+            index=models.Index(fields=['dtstart', 'until'], name='planner_rec_dtstart_acbfff_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recurrenceexception',
+            unique_together={('rule', 'original_start')},
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2 on 2026-10-17 01:13
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_weekdays(apps, schema_editor):
+    EventOccurrence = apps.get_model('planner', 'EventOccurrence')
+    occurrences = list(EventOccurrence.objects.only('pk', 'start_datetime'))
+    for occurrence in occurrences:
+        occurrence.weekday = timezone.localtime(occurrence.start_datetime).weekday()
+    EventOccurrence.objects.bulk_update(occurrences, ['weekday'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0006_recurrence_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='weekday',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_weekdays, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['budget', 'min_group_size'], name='planner_eve_budget_dc845a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoccurrence',
+            index=models.Index(fields=['weekday', 'start_datetime'], name='planner_eve_weekday_c292b7_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2 on 2026-10-17 01:25
+
+from django.db import migrations, models
+
+from planner.geo import osgb_grid
+
+
+def backfill_grid_coordinates(apps, schema_editor):
+    Event = apps.get_model('planner', 'Event')
+    events = list(Event.objects.exclude(latitude=None).exclude(longitude=None))
+    for event in events:
+        event.eastings, event.northings = osgb_grid(event.latitude, event.longitude)
+    Event.objects.bulk_update(events, ['eastings', 'northings'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0007_occurrence_weekday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='eastings',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='northings',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['eastings', 'northings'], name='planner_eve_easting_7c7436_idx'),
+        ),
+        migrations.RunPython(backfill_grid_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2 on 2026-10-17 01:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0008_event_grid_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('VENUE', 'Venue postcode'), ('EVENT', 'Event location')], max_length=10)),
+                ('target_id', models.PositiveIntegerField()),
+                ('query', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_by', models.CharField(blank=True, max_length=32)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='geocodejob',
+            index=models.Index(fields=['status', 'available_at'], name='planner_geo_status_9a58d9_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='geocodejob',
+            unique_together={('target_type', 'target_id')},
+        ),
+    ]
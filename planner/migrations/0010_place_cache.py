@@ -0,0 +1,23 @@
+# Generated by Django 2.2 on 2026-10-17 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0009_geocode_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceCache',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('results', models.TextField(default='[]')),
+                ('seeded', models.BooleanField(default=False)),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2 on 2026-10-17 01:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The listing columns as of this migration; later ones add their own.
+EVENT_FIELDS = ('title', 'kind', 'budget', 'description', 'slug', 'latitude', 'longitude', 'location_name')
+SOURCE_COLUMNS = (
+    'pk', 'event_id', 'start_datetime', 'duration_hours', 'actual_attendees',
+) + tuple(f'event__{field}' for field in EVENT_FIELDS)
+LISTING_FIELDS = ('occurrence_id', 'event_id', 'start_datetime', 'duration_hours', 'actual_attendees') + EVENT_FIELDS
+
+
+def backfill_listings(apps, schema_editor):
+    EventOccurrence = apps.get_model('planner', 'EventOccurrence')
+    OccurrenceListing = apps.get_model('planner', 'OccurrenceListing')
+    rows = EventOccurrence.objects.order_by().values_list(*SOURCE_COLUMNS)
+    OccurrenceListing.objects.bulk_create(
+        OccurrenceListing(**dict(zip(LISTING_FIELDS, row))) for row in rows.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0010_place_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccurrenceListing',
+            fields=[
+                ('occurrence', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='planner.EventOccurrence')),
+                ('start_datetime', models.DateTimeField()),
+                ('duration_hours', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('actual_attendees', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('kind', models.CharField(max_length=20)),
+                ('budget', models.CharField(max_length=10)),
+                ('description', models.TextField(blank=True)),
+                ('slug', models.SlugField(db_index=False)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('location_name', models.CharField(blank=True, max_length=255)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='planner.Event')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='occurrencelisting',
+            index=models.Index(fields=['start_datetime', 'occurrence'], name='planner_occ_start_d_2ff23a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrencelisting',
+            index=models.Index(fields=['kind', 'start_datetime', 'occurrence'], name='planner_occ_kind_79adae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrencelisting',
+            index=models.Index(fields=['budget', 'start_datetime', 'occurrence'], name='planner_occ_budget_71b94e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrencelisting',
+            index=models.Index(fields=['kind', 'budget', 'start_datetime', 'occurrence'], name='planner_occ_kind_9f3d8f_idx'),
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2 on 2026-10-17 01:42
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_end_datetimes(apps, schema_editor):
+    EventOccurrence = apps.get_model('planner', 'EventOccurrence')
+    Event = apps.get_model('planner', 'Event')
+    OccurrenceListing = apps.get_model('planner', 'OccurrenceListing')
+
+    occurrences = list(EventOccurrence.objects.only('pk', 'start_datetime', 'duration_hours'))
+    for occurrence in occurrences:
+        occurrence.end_datetime = occurrence.start_datetime + timedelta(hours=float(occurrence.duration_hours))
+    EventOccurrence.objects.bulk_update(occurrences, ['end_datetime'], batch_size=500)
+
+    OccurrenceListing.objects.update(
+        end_datetime=Subquery(EventOccurrence.objects.filter(pk=OuterRef('occurrence_id')).values('end_datetime')[:1]),
+        grid_cell=Subquery(Event.objects.filter(pk=OuterRef('event_id')).values('grid_cell')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0011_occurrence_listing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrence',
+            name='end_datetime',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='occurrencelisting',
+            name='end_datetime',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='occurrencelisting',
+            name='grid_cell',
+            field=models.CharField(blank=True, max_length=12),
+        ),
+        migrations.RunPython(backfill_end_datetimes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='eventoccurrence',
+            name='end_datetime',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='occurrencelisting',
+            name='end_datetime',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='eventoccurrence',
+            index=models.Index(fields=['start_datetime', 'end_datetime'], name='planner_eve_start_d_a58656_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurrencelisting',
+            index=models.Index(fields=['grid_cell', 'start_datetime', 'end_datetime'], name='planner_occ_grid_ce_f979ad_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2 on 2026-10-17 02:05
+
+from django.db import migrations
+
+
+def normalize_tag_name(name):
+    # As planner.tags.normalize_tag_name at the time of this migration.
+    return " ".join(str(name).split()).lower()[:50].strip()
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Folds tags differing only in case or spacing into the oldest one and normalizes every name."""
+    Tag = apps.get_model('planner', 'Tag')
+    Event = apps.get_model('planner', 'Event')
+    Venue = apps.get_model('planner', 'Venue')
+
+    groups = {}
+    for tag in Tag.objects.order_by('pk'):
+        groups.setdefault(normalize_tag_name(tag.name), []).append(tag)
+
+    for name, (keeper, *duplicates) in groups.items():
+        if duplicates:
+            duplicate_ids = [tag.pk for tag in duplicates]
+            # Move event and venue links over first; deleting the duplicates drops theirs.
+            for through, owner in ((Event.tags.through, 'event_id'), (Venue.tags.through, 'venue_id')):
+                owner_ids = set(through.objects.filter(tag_id__in=duplicate_ids).values_list(owner, flat=True))
+                through.objects.bulk_create(
+                    [through(**{owner: owner_id, 'tag_id': keeper.pk}) for owner_id in owner_ids],
+                    ignore_conflicts=True,
+                )
+            Tag.objects.filter(pk__in=duplicate_ids).delete()
+        if keeper.name != name:
+            Tag.objects.filter(pk=keeper.pk).update(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0013_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2 on 2026-10-17 02:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # As planner.rollups.rebuild() at the time of this migration.
+    AttendanceRollup = apps.get_model('planner', 'AttendanceRollup')
+    EventOccurrence = apps.get_model('planner', 'EventOccurrence')
+
+    groups = (
+        EventOccurrence.objects.order_by()
+        .annotate(day=TruncDate('start_datetime'))
+        .values_list('day', 'event__kind', 'event__budget')
+        .annotate(
+            occurrences=Count('pk'),
+            reported=Count('pk', filter=Q(actual_attendees__gt=0)),
+            attendees=Sum('actual_attendees'),
+        )
+    )
+    AttendanceRollup.objects.bulk_create([
+        AttendanceRollup(day=day, weekday=day.weekday(), kind=kind, budget=budget,
+                         occurrences=count, reported=reported, attendees=attendees or 0)
+        for day, kind, budget, count, reported, attendees in groups
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0014_merge_duplicate_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('kind', models.CharField(max_length=20)),
+                ('budget', models.CharField(max_length=10)),
+                ('occurrences', models.PositiveIntegerField(default=0)),
+                ('reported', models.PositiveIntegerField(default=0)),
+                ('attendees', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'kind', 'budget')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
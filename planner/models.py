@@ -1,13 +1,16 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.db.models import BooleanField, Case, Exists, OuterRef, Prefetch, Q, Value, When
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.template.defaultfilters import slugify
-import secrets, string
-from urllib.parse import quote
-from urllib.request import urlopen
-import json
+import itertools, json, secrets, string, time
+from datetime import timedelta
 from multiselectfield import MultiSelectField
 from decimal import Decimal # Import Decimal for DecimalField
+from .geo import geohash_encode, osgb_grid
+from . import geocoding, rollups
+from .tags import TAG_NAME_MAX_LENGTH, normalize_tag_name
 
 class Choices:
     def get_event_kind():
@@ -39,8 +42,58 @@ class Choices:
                 ("CELEBRATION", "Big Win / Celebration"), ("WELCOME", "Welcome / Onboarding"),
                 ("OTHER", "Other"))
 
+# Ordered like ASCII so slugs sort by creation time.
+SLUG_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+SLUG_LENGTH = 16
+
+
+def generate_slug():
+    """
+    16-character base62 id: a 42-bit millisecond timestamp followed by 53
+    random bits. Collisions are vanishingly unlikely, so no existence query
+    is made; the unique constraint is the final arbiter (see SlugMixin).
+    """
+    value = (int(time.time() * 1000) << 53) | secrets.randbits(53)
+    chars = []
+    for _ in range(SLUG_LENGTH):
+        value, remainder = divmod(value, 62)
+        chars.append(SLUG_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+class SlugMixin:
+    SLUG_SAVE_ATTEMPTS = 5
+
+    @classmethod
+    def assign_slugs(cls, instances):
+        """Gives every unsaved instance without a slug one, e.g. before bulk_create."""
+        for instance in instances:
+            if not instance.slug:
+                instance.slug = generate_slug()
+        return instances
+
+    def generate_unique_slug(self):
+        return generate_slug()
+
+    def save_with_slug(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        self.slug = generate_slug()
+        for attempt in range(self.SLUG_SAVE_ATTEMPTS):
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only retry when the generated slug is what clashed.
+                if attempt == self.SLUG_SAVE_ATTEMPTS - 1 or not type(self)._default_manager.filter(slug=self.slug).exists():
+                    raise
+                self.slug = generate_slug()
+
+
 class Tag(models.Model):
-    name = models.CharField(max_length=50, unique=True)
+    # Always stored normalized (see planner.tags), so spelling variants share one row.
+    name = models.CharField(max_length=TAG_NAME_MAX_LENGTH, unique=True)
 
     class Meta:
         ordering = ["name"]
@@ -48,8 +101,12 @@ class Tag(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name = normalize_tag_name(self.name)
+        super().save(*args, **kwargs)
+
 
-class Venue(models.Model):
+class Venue(SlugMixin, models.Model):
     # This model is kept but is no longer related to Event/EventOccurrence.
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -77,14 +134,17 @@ class Venue(models.Model):
         ordering = ["name"]
         unique_together = [("name", "postcode")]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored postcode so save() can tell if it changed without re-fetching the row.
+        instance._loaded_postcode = instance.__dict__.get('postcode')
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.generate_unique_slug()
-            
         needs_geocoding = False
         if self.pk:
-            old = Venue.objects.get(pk=self.pk)
-            if old.postcode != self.postcode or (self.latitude is None or self.longitude is None):
+            if getattr(self, '_loaded_postcode', None) != self.postcode or (self.latitude is None or self.longitude is None):
                 needs_geocoding = True
         elif self.postcode:
             needs_geocoding = True
@@ -92,43 +152,197 @@ class Venue(models.Model):
         if needs_geocoding:
             self.eastings, self.northings, self.latitude, self.longitude = self.get_coordinates(self.postcode)
             
-        super().save(*args, **kwargs)
+        self.save_with_slug(*args, **kwargs)
+        self._loaded_postcode = self.postcode
 
-    def generate_unique_slug(self):
-        alphabet = string.ascii_letters + string.digits
-        while True:
-            random_slug = ''.join(secrets.choice(alphabet) for i in range(16))
-            if not Venue.objects.filter(slug=random_slug).exists():
-                return random_slug
+        if needs_geocoding and self.postcode and self.latitude is None:
+            # Not in the cache yet: `manage.py geocode_worker` fills the coordinates in later.
+            GeocodeJob.enqueue(GeocodeJob.VENUE, {self.pk: self.postcode})
 
     def get_coordinates(self, postcode):
+        # Cache-only: postcodes that have not been resolved yet come back empty; save()
+        # queues a GeocodeJob for them and `manage.py geocode_worker` fills them in.
         default_coords = (None, None, None, None) 
         if not postcode:
             return default_coords
-            
-        try:
-            postcode_encoded = quote(postcode)
-            url = f"https://api.postcodes.io/postcodes/{postcode_encoded}"
-            
-            with urlopen(url) as response:
-                data = json.load(response)
-                
-            result = data.get('result')
-            if result:
-                return (result.get('eastings'), 
-                        result.get('northings'), 
-                        Decimal(str(result.get('latitude'))), 
-                        Decimal(str(result.get('longitude'))))
-                        
-        except Exception:
-            pass
-            
-        return default_coords
+        return geocoding.cached_coordinates(postcode) or default_coords
 
     def __str__(self):
         return self.name
 
-class Event(models.Model):
+class GeocodeCache(models.Model):
+    """Persistent postcode lookups; see planner.geocoding for TTL and eviction."""
+    postcode = models.CharField(max_length=12, unique=True)
+    found = models.BooleanField(default=True)
+    eastings = models.IntegerField(null=True, blank=True)
+    northings = models.IntegerField(null=True, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.postcode
+
+    @classmethod
+    def from_coordinates(cls, postcode, coords, fetched_at):
+        if coords is None:
+            return cls(postcode=postcode, found=False, fetched_at=fetched_at)
+        eastings, northings, latitude, longitude = coords
+        return cls(postcode=postcode, eastings=eastings, northings=northings,
+                   latitude=latitude, longitude=longitude, fetched_at=fetched_at)
+
+    def as_coordinates(self):
+        return (self.eastings, self.northings, self.latitude, self.longitude)
+
+
+class PlaceCache(models.Model):
+    """Persistent place-search results behind /planner/api/geocode/; see planner.places."""
+    query = models.CharField(max_length=255, unique=True)
+    # JSON list of {"name", "lat", "lng"}; empty when the backend found nothing.
+    results = models.TextField(default="[]")
+    # Seeded entries come from known locations and never expire.
+    seeded = models.BooleanField(default=False)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.query
+
+    def get_results(self):
+        return json.loads(self.results)
+
+
+class GeocodeJob(models.Model):
+    """
+    Queued lookup of a venue postcode or an event's location_name. Saves
+    only enqueue; `manage.py geocode_worker` drains the queue and writes
+    the coordinates back (see planner.geocode_queue).
+    """
+    VENUE = "VENUE"
+    EVENT = "EVENT"
+    TARGET_CHOICES = ((VENUE, "Venue postcode"), (EVENT, "Event location"))
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = ((PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed"))
+
+    target_type = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    target_id = models.PositiveIntegerField()
+    query = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Claim token of the worker running the job.
+    locked_by = models.CharField(max_length=32, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [("target_type", "target_id")]
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.target_type} {self.target_id}: {self.query} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, target_type, queries):
+        """
+        Queues {target_id: query} lookups, resetting any finished job for
+        the same target (or one with a different query) to pending.
+        """
+        queries = {pk: query for pk, query in queries.items() if query}
+        if not queries:
+            return
+        now = timezone.now()
+        existing = list(cls.objects.filter(target_type=target_type, target_id__in=list(queries)))
+        seen = {job.target_id for job in existing}
+        # Jobs already waiting for the same lookup are left alone.
+        reset = [job for job in existing
+                 if job.query != queries[job.target_id] or job.status not in (cls.PENDING, cls.RUNNING)]
+        for job in reset:
+            job.query = queries[job.target_id]
+            job.status = cls.PENDING
+            job.attempts = 0
+            job.last_error = ""
+            job.locked_by = ""
+            job.available_at = job.updated_at = now
+        cls.objects.bulk_update(
+            reset, ['query', 'status', 'attempts', 'last_error', 'locked_by', 'available_at', 'updated_at'],
+        )
+        cls.objects.bulk_create([
+            cls(target_type=target_type, target_id=pk, query=query, available_at=now, updated_at=now)
+            for pk, query in queries.items() if pk not in seen
+        ], ignore_conflicts=True)
+
+
+# How far ahead an event page looks for the generated dates of its rules.
+UPCOMING_DATES_HORIZON_DAYS = 366
+
+
+class EventQuerySet(models.QuerySet):
+    """Shared loading strategies, so pages that show events never query per event."""
+
+    def delete(self):
+        # The cascaded occurrences' rollup days are re-aggregated once, not once per row.
+        with rollups.deferred():
+            return super().delete()
+
+    def with_upcoming(self):
+        # Sets is_upcoming on each event from correlated EXISTS checks rather than queries per
+        # event: an upcoming stored occurrence, or a recurrence rule that has not ended.
+        now = timezone.now()
+        upcoming = EventOccurrence.objects.filter(event=OuterRef('pk'), start_datetime__gte=now)
+        rules = RecurrenceRule.objects.active(now).filter(event=OuterRef('pk'))
+        return self.annotate(
+            has_upcoming_occurrence=Exists(upcoming), has_active_rule=Exists(rules),
+        ).annotate(is_upcoming=Case(
+            When(Q(has_upcoming_occurrence=True) | Q(has_active_rule=True), then=Value(True)),
+            default=Value(False), output_field=BooleanField(),
+        ))
+
+    def with_listing_data(self):
+        """For lists of events: tag names prefetched in one query and is_upcoming annotated."""
+        return self.with_upcoming().prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('pk', 'name')),
+        )
+
+    def with_detail_data(self):
+        """
+        For an event page: the listing data plus its upcoming occurrences as
+        upcoming_occurrences and its running rules (with their exceptions) as
+        active_rules, which is what upcoming_dates() reads.
+        """
+        now = timezone.now()
+        upcoming = EventOccurrence.objects.filter(start_datetime__gte=now).order_by('start_datetime')
+        rules = RecurrenceRule.objects.active(now).prefetch_related('exceptions')
+        return self.with_listing_data().prefetch_related(
+            Prefetch('occurrences', queryset=upcoming, to_attr='upcoming_occurrences'),
+            Prefetch('recurrence_rules', queryset=rules, to_attr='active_rules'),
+        )
+
+
+class EventOccurrenceQuerySet(models.QuerySet):
+
+    def delete(self):
+        # Each deleted occurrence's rollup day is re-aggregated once, not once per row.
+        with rollups.deferred():
+            return super().delete()
+
+    def with_listing_data(self):
+        """Occurrences with their event joined in, for lists that show event columns."""
+        return self.select_related('event')
+
+    def with_detail_data(self):
+        """As with_listing_data(), plus each event's tag names prefetched in one query."""
+        return self.with_listing_data().prefetch_related(
+            Prefetch('event__tags', queryset=Tag.objects.only('pk', 'name')),
+        )
+
+
+class Event(SlugMixin, models.Model):
     # REMOVED: venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name="events")
     
     title = models.CharField(max_length=200)
@@ -139,6 +353,11 @@ class Event(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     location_name = models.CharField(max_length=255, blank=True, help_text="A descriptive name or address for the location.")
+    # Precomputed from latitude/longitude so map bounding-box queries can use an index range scan.
+    grid_cell = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    # National Grid metres (as on Venue), so radius searches are integer range checks.
+    eastings = models.IntegerField(null=True, blank=True, editable=False)
+    northings = models.IntegerField(null=True, blank=True, editable=False)
 
     budget = models.CharField(max_length=10, choices=Choices.get_budget_band(), default="MEDIUM")
 
@@ -151,10 +370,16 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     slug = models.SlugField(unique=True, blank=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=["budget"]),
             models.Index(fields=["is_active"]),
+            # Group-size range checks in planner.recommendations.
+            models.Index(fields=["budget", "min_group_size"]),
+            # Bounding-box prefilter for nearest-event queries (planner.nearby).
+            models.Index(fields=["eastings", "northings"]),
         ]
         ordering = ["title"]
 
@@ -164,7 +389,35 @@ class Event(models.Model):
 
     @property
     def is_upcoming(self) -> bool:
-        return self.occurrences.filter(start_datetime__gte=timezone.now()).exists()
+        # Events loaded through EventQuerySet.with_upcoming() already carry the answer.
+        if '_is_upcoming' not in self.__dict__:
+            now = timezone.now()
+            self._is_upcoming = (
+                self.occurrences.filter(start_datetime__gte=now).exists()
+                or RecurrenceRule.objects.active(now).filter(event=self).exists()
+            )
+        return self._is_upcoming
+
+    @is_upcoming.setter
+    def is_upcoming(self, value):
+        self._is_upcoming = value
+
+    def upcoming_dates(self, limit=5):
+        """
+        The next `limit` start times, stored and generated by the event's
+        rules, in order. Expects an event loaded with with_detail_data().
+        """
+        from .recurrence import expand
+
+        now = timezone.now()
+        starts = {occurrence.start_datetime for occurrence in self.upcoming_occurrences}
+        for rule in self.active_rules:
+            exceptions = {exception.original_start for exception in rule.exceptions.all()}
+            # expand() is lazy, so the far window end costs nothing beyond the dates taken.
+            generated = expand(rule, now, now + timedelta(days=UPCOMING_DATES_HORIZON_DAYS), exceptions)
+            starts.update(itertools.islice(generated, limit))
+        # A stored occurrence at a generated start replaces it, so the set holds it once.
+        return sorted(starts)[:limit]
 
     def fits_group(self, size: int) -> bool:
         if size < self.min_group_size:
@@ -173,20 +426,36 @@ class Event(models.Model):
             return False
         return True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored kind and budget, so the attendance rollups are only redone when they change.
+        instance._loaded_rollup_key = (instance.__dict__.get('kind'), instance.__dict__.get('budget'))
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.generate_unique_slug()
         if self.min_group_size and self.max_group_size:
             if self.max_group_size < self.min_group_size:
                 self.max_group_size = self.min_group_size
-        super().save(*args, **kwargs)
+        self.compute_spatial_fields()
+        self.save_with_slug(*args, **kwargs)
+        self._loaded_rollup_key = (self.kind, self.budget)
+        if self.latitude is None and self.location_name:
+            GeocodeJob.enqueue(GeocodeJob.EVENT, {self.pk: self.location_name})
 
-    def generate_unique_slug(self):
-        alphabet = string.ascii_letters + string.digits
-        while True:
-            random_slug = ''.join(secrets.choice(alphabet) for i in range(16))
-            if not Event.objects.filter(slug=random_slug).exists():
-                return random_slug
+    def delete(self, *args, **kwargs):
+        # As EventQuerySet.delete(): the occurrences' days are re-aggregated in one pass.
+        with rollups.deferred():
+            return super().delete(*args, **kwargs)
+
+    def compute_spatial_fields(self):
+        # Also called directly by bulk paths that bypass save().
+        if self.latitude is not None and self.longitude is not None:
+            self.grid_cell = geohash_encode(self.latitude, self.longitude)
+            self.eastings, self.northings = osgb_grid(self.latitude, self.longitude)
+        else:
+            self.grid_cell = ""
+            self.eastings = self.northings = None
 
     @property
     def category(self):
@@ -201,15 +470,202 @@ class EventOccurrence(models.Model):
     start_datetime = models.DateTimeField()
     duration_hours = models.DecimalField(max_digits=4, decimal_places=2, default=2.0)
     actual_attendees = models.PositiveIntegerField(default=0, help_text="Actual number of attendees.")
+    # Day of the week of start_datetime in the site's time zone (0 = Monday), so
+    # preferred-day filters are an indexed lookup rather than a date function.
+    weekday = models.PositiveSmallIntegerField(editable=False)
+    # start_datetime + duration_hours, stored so overlap checks are index range scans (planner.scheduling).
+    end_datetime = models.DateTimeField(editable=False)
+
+    objects = EventOccurrenceQuerySet.as_manager()
 
     class Meta:
         ordering = ["start_datetime"]
         unique_together = [("event", "start_datetime")]
+        indexes = [
+            # Keyset pagination in api_occurrences seeks on (start_datetime, id).
+            models.Index(fields=["start_datetime", "id"]),
+            models.Index(fields=["weekday", "start_datetime"]),
+            # Overlap queries seek on start_datetime and check end_datetime in the index.
+            models.Index(fields=["start_datetime", "end_datetime"]),
+        ]
 
     def __str__(self):
         return f"{self.event.title} on {self.start_datetime.strftime('%Y-%m-%d %H:%M')}"
 
-    @property
-    def end_datetime(self):
-        from datetime import timedelta
-        return self.start_datetime + timedelta(hours=float(self.duration_hours))
\ No newline at end of file
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored start, so a moved occurrence's old day is rolled up again too.
+        instance._loaded_start_datetime = instance.__dict__.get('start_datetime')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.compute_derived_fields()
+        super().save(*args, **kwargs)
+        self._loaded_start_datetime = self.start_datetime
+
+    def compute_derived_fields(self):
+        # Also called directly by bulk paths that bypass save().
+        start = self.start_datetime
+        if timezone.is_aware(start):
+            start = timezone.localtime(start)
+        self.weekday = start.weekday()
+        self.end_datetime = self.start_datetime + timedelta(hours=float(self.duration_hours))
+
+
+class OccurrenceListing(models.Model):
+    """
+    Read model for the dashboard listings: a stored occurrence together
+    with the event columns they filter and display, so a listing is a range
+    scan over one table. Kept in sync by planner.signals; see planner.listings.
+    """
+    # Shares the occurrence's id, so listing cursors and ids match api_occurrences.
+    occurrence = models.OneToOneField(EventOccurrence, on_delete=models.CASCADE, primary_key=True, related_name="listing")
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="+")
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    duration_hours = models.DecimalField(max_digits=4, decimal_places=2)
+    actual_attendees = models.PositiveIntegerField()
+    title = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20)
+    budget = models.CharField(max_length=10)
+    description = models.TextField(blank=True)
+    slug = models.SlugField(db_index=False)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    location_name = models.CharField(max_length=255, blank=True)
+    grid_cell = models.CharField(max_length=12, blank=True)
+
+    class Meta:
+        # Each dashboard filter combination seeks on its own (filters..., start_datetime, id) prefix.
+        indexes = [
+            models.Index(fields=["start_datetime", "occurrence"]),
+            models.Index(fields=["kind", "start_datetime", "occurrence"]),
+            models.Index(fields=["budget", "start_datetime", "occurrence"]),
+            models.Index(fields=["kind", "budget", "start_datetime", "occurrence"]),
+            # What is booked at a place and when (planner.scheduling).
+            models.Index(fields=["grid_cell", "start_datetime", "end_datetime"]),
+        ]
+
+    def __str__(self):
+        return f"{self.title} on {self.start_datetime.strftime('%Y-%m-%d %H:%M')}"
+
+
+class AttendanceRollup(models.Model):
+    """
+    Stored occurrences and their attendance summed per local day, event kind
+    and budget band, for the attendance analytics. Kept in sync by
+    planner.signals; see planner.rollups.
+    """
+    day = models.DateField()
+    weekday = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=20)
+    budget = models.CharField(max_length=10)
+    occurrences = models.PositiveIntegerField(default=0)
+    # Occurrences with an attendance recorded (actual_attendees above zero), and their total.
+    reported = models.PositiveIntegerField(default=0)
+    attendees = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Also the index analytics windows seek on.
+        unique_together = [("day", "kind", "budget")]
+
+    def __str__(self):
+        return f"{self.day} {self.kind}/{self.budget}: {self.attendees} attendees"
+
+
+class RecurrenceRuleQuerySet(models.QuerySet):
+
+    def active(self, now=None):
+        """
+        Rules that have not passed their until date. A rule whose count is
+        used up is still included; expanding it yields nothing.
+        """
+        now = now or timezone.now()
+        return self.filter(Q(until__isnull=True) | Q(until__gte=now))
+
+
+class RecurrenceRule(models.Model):
+    """
+    RRULE-style schedule for an Event. Its occurrences are expanded lazily
+    by planner.recurrence; only overrides are stored as EventOccurrence rows.
+    """
+    DAILY = "DAILY"
+    WEEKLY = "WEEKLY"
+    MONTHLY = "MONTHLY"
+    FREQUENCY_CHOICES = ((DAILY, "Daily"), (WEEKLY, "Weekly"), (MONTHLY, "Monthly"))
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="recurrence_rules")
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    weekdays = MultiSelectField(choices=Choices.get_best_days(), max_length=27, blank=True,
+                                help_text="Weekly rules only; defaults to the weekday of the first occurrence.")
+    dtstart = models.DateTimeField(help_text="Start of the first occurrence.")
+    until = models.DateTimeField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True, help_text="Total number of occurrences.")
+    duration_hours = models.DecimalField(max_digits=4, decimal_places=2, default=2.0)
+
+    objects = RecurrenceRuleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["dtstart", "until"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} ({self.get_frequency_display()})"
+
+    def expand(self, window_start, window_end):
+        from .recurrence import expand
+        return expand(self, window_start, window_end)
+
+
+class RecurrenceException(models.Model):
+    """A generated occurrence of a rule that has been cancelled."""
+    rule = models.ForeignKey(RecurrenceRule, on_delete=models.CASCADE, related_name="exceptions")
+    original_start = models.DateTimeField()
+
+    class Meta:
+        unique_together = [("rule", "original_start")]
+
+    def __str__(self):
+        return f"{self.rule} except {self.original_start:%Y-%m-%d %H:%M}"
+
+
+class SearchTerm(models.Model):
+    """Inverted-index rows used by planner.search on databases without FTS5."""
+    TERM_MAX_LENGTH = 50
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="search_terms")
+    term = models.CharField(max_length=TERM_MAX_LENGTH, db_index=True)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = [("term", "event")]
+
+    def __str__(self):
+        return f"{self.term} -> {self.event_id}"
+
+
+class CalendarFeed(models.Model):
+    """
+    A private iCalendar subscription URL: calendar apps cannot log in, so
+    the unguessable token identifies the user, and query holds the
+    dashboard filters the feed applies.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="calendar_feeds")
+    token = models.CharField(max_length=43, unique=True, editable=False)
+    # Normalized querystring of the dashboard filters.
+    query = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("user", "query")]
+
+    def __str__(self):
+        return f"Feed for {self.user} ({self.query or 'all events'})"
+
+    def save(self, *args, **kwargs):
+        if not self.token:
+            self.token = secrets.token_urlsafe(32)
+        super().save(*args, **kwargs)
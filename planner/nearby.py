@@ -0,0 +1,77 @@
+"""
+"Events within N km of me", nearest first.
+
+Events store National Grid eastings/northings in metres, so the radius is
+first applied in SQL as an integer box on the (eastings, northings) index
+plus a squared planar distance check. Candidates that survive are ranked by
+exact haversine distance in Python, computed over the whole candidate set
+at once.
+"""
+from django.db.models import F, IntegerField, Q
+from django.db.models.expressions import ExpressionWrapper
+
+from .geo import haversine_many, osgb_grid
+
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+
+
+def parse_near(params):
+    """
+    (latitude, longitude, radius_km) from ?near_lat=&near_lng=&radius_km=,
+    or None when the dashboard's distance filter is not in use or invalid.
+    """
+    try:
+        latitude = float(params.get('near_lat'))
+        longitude = float(params.get('near_lng'))
+        radius_km = float(params.get('radius_km') or DEFAULT_RADIUS_KM)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or radius_km <= 0:
+        return None
+    return round(latitude, 5), round(longitude, 5), min(radius_km, MAX_RADIUS_KM)
+
+
+def within_radius_filter(latitude, longitude, radius_km, field='pk'):
+    """
+    Q object restricting `field` (an event id column) to events within
+    radius_km of the point, evaluated as a subquery on the grid index.
+    """
+    from .models import Event
+
+    easting, northing = osgb_grid(latitude, longitude)
+    radius_m = int(radius_km * 1000)
+    distance_sq = ExpressionWrapper(
+        (F('eastings') - easting) * (F('eastings') - easting)
+        + (F('northings') - northing) * (F('northings') - northing),
+        output_field=IntegerField(),
+    )
+    within = (
+        Event.objects.filter(
+            eastings__gte=easting - radius_m, eastings__lte=easting + radius_m,
+            northings__gte=northing - radius_m, northings__lte=northing + radius_m,
+        )
+        .annotate(distance_sq=distance_sq)
+        .filter(distance_sq__lte=radius_m * radius_m)
+        .values('pk')
+    )
+    return Q(**{f'{field}__in': within})
+
+
+def nearest_events(events, latitude, longitude, radius_km=DEFAULT_RADIUS_KM, limit=50):
+    """
+    [(event_id, distance_km)] for the events in the queryset within
+    radius_km of the point, nearest first.
+    """
+    rows = list(
+        events.filter(within_radius_filter(latitude, longitude, radius_km))
+        .order_by().values_list('pk', 'latitude', 'longitude')
+    )
+    if not rows:
+        return []
+    ids, latitudes, longitudes = zip(*rows)
+    distances = haversine_many(latitude, longitude, latitudes, longitudes)
+    ranked = sorted(
+        (distance, pk) for pk, distance in zip(ids, distances) if distance <= radius_km
+    )
+    return [(pk, distance) for distance, pk in ranked[:limit]]
@@ -0,0 +1,242 @@
+"""
+Cached place search for the event creation map (/planner/api/geocode/).
+
+Queries are normalized (case, punctuation, spacing) so "Drygate, Glasgow"
+and "drygate glasgow" share one entry. A search is answered from a
+per-process LRU, then the PlaceCache table, and only then the place backend
+(planner.geocoding). Backend calls go through an upstream.UpstreamGuard and
+then take a RATE_LIMIT slot kept in the Django cache, so the rate holds
+across every worker process sharing that cache. Neither step waits: a
+search that finds the guard busy or its slot taken fails at once with
+UpstreamUnavailable, so a slow, failing or saturated geocoder costs a
+request its timeout at most rather than holding every worker. The table is seeded with known locations (GLASGOW_LOCATIONS and
+the named locations events already use) so the common venues never reach
+the backend at all.
+"""
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from . import geocoding, upstream
+
+GLASGOW_LOCATIONS = [
+    ("OVO Hydro / SEC Campus", Decimal('55.8601'), Decimal('-4.2882')),
+    ("Glasgow Royal Concert Hall", Decimal('55.8647'), Decimal('-4.2541')),
+    ("Platform Glasgow (The Arches)", Decimal('55.8569'), Decimal('-4.2498')),
+    ("Òran Mór, West End", Decimal('55.8790'), Decimal('-4.2891')),
+    ("Topgolf Glasgow", Decimal('55.8290'), Decimal('-4.2100')),
+    ("Drygate Brewing Co.", Decimal('55.8655'), Decimal('-4.2380')),
+    ("Kelvingrove Art Gallery and Museum", Decimal('55.8722'), Decimal('-4.2936')),
+    ("SWG3, West End", Decimal('55.8660'), Decimal('-4.3000')),
+    ("Glasgow Science Centre", Decimal('55.8576'), Decimal('-4.2929')),
+    ("Gallery of Modern Art (GoMA)", Decimal('55.8596'), Decimal('-4.2520')),
+]
+
+MIN_QUERY_LENGTH = 3
+MAX_RESULTS = 5
+SEED_CHUNK = 500
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+RATE_KEY = "planner:place-search-rate"
+
+_lru = None
+_guard = None
+_setup_lock = threading.Lock()
+
+
+def get_lru():
+    global _lru
+    with _setup_lock:
+        if _lru is None:
+            _lru = LRUCache(geocoding.geocoder_setting('PLACE_LRU_SIZE'))
+        return _lru
+
+
+def get_guard():
+    global _guard
+    with _setup_lock:
+        if _guard is None:
+            _guard = upstream.UpstreamGuard(
+                "Location search",
+                geocoding.geocoder_setting('REQUEST_CONCURRENCY'),
+                geocoding.geocoder_setting('BREAKER_FAILURES'),
+                geocoding.geocoder_setting('BREAKER_COOLDOWN'),
+            )
+        return _guard
+
+
+def take_rate_slot():
+    """
+    Claims the current 1/RATE_LIMIT-second slot for a backend call without
+    waiting; False if another search, in any process, already has it.
+    """
+    from .cache import get_cache
+
+    rate = geocoding.geocoder_setting('RATE_LIMIT')
+    if not rate:
+        return True
+    slot = int(time.time() * rate)
+    # cache.add() only stores a key that is not there yet, atomically on the shared backends.
+    return get_cache().add(f"{RATE_KEY}:{slot}", 1, max(1, math.ceil(2 / rate)))
+
+
+def normalize_query(query):
+    return " ".join(re.findall(r"\w+", (query or "").lower()))[:255]
+
+
+def _expires_at(results, fetched_at, seeded):
+    if seeded:
+        return None
+    ttl = geocoding.geocoder_setting('TTL_DAYS' if results else 'NEGATIVE_TTL_DAYS')
+    return fetched_at + timedelta(days=ttl)
+
+
+def _is_fresh(expires_at, now):
+    return expires_at is None or expires_at > now
+
+
+def search(query, backend=None):
+    """
+    Returns (normalized query, [{'name', 'lat', 'lng'}]) for a free-text
+    place search. Backend errors propagate and nothing is cached for them;
+    upstream.UpstreamUnavailable means the backend was not called at all.
+    """
+    from .models import PlaceCache
+
+    key = normalize_query(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        return key, []
+
+    now = timezone.now()
+    lru = get_lru()
+    hit = lru.get(key)
+    if hit is not None and _is_fresh(hit[1], now):
+        return key, hit[0]
+
+    entry = PlaceCache.objects.filter(query=key).first()
+    if entry is not None:
+        results = entry.get_results()
+        expires_at = _expires_at(results, entry.fetched_at, entry.seeded)
+        if _is_fresh(expires_at, now):
+            lru.set(key, (results, expires_at))
+            return key, results
+
+    backend = backend or geocoding.get_place_backend(timeout=geocoding.geocoder_setting('REQUEST_TIMEOUT'))
+
+    def lookup():
+        if not take_rate_slot():
+            rate = geocoding.geocoder_setting('RATE_LIMIT')
+            raise upstream.UpstreamUnavailable("Too many location searches", max(1, math.ceil(1 / rate)))
+        return backend.search(" ".join(query.split()), limit=MAX_RESULTS)
+
+    matches = get_guard().call(lookup)
+    results = [
+        {'name': match['name'], 'lat': float(match['latitude']), 'lng': float(match['longitude'])}
+        for match in matches
+    ]
+    now = timezone.now()
+    PlaceCache.objects.update_or_create(
+        query=key, defaults={'results': json.dumps(results), 'seeded': False, 'fetched_at': now},
+    )
+    lru.set(key, (results, _expires_at(results, now, False)))
+    prune_cache()
+    return key, results
+
+
+def event_locations():
+    """(name, latitude, longitude) for each distinct named location events already use."""
+    from .models import Event
+
+    rows = (
+        Event.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .exclude(location_name="")
+        # create_event names pins dropped without a search "(lat, lng)".
+        .exclude(location_name__startswith="(")
+        .order_by().values_list('location_name', 'latitude', 'longitude').distinct()
+    )
+    places = {}
+    for name, latitude, longitude in rows.iterator():
+        places.setdefault(name, (name, latitude, longitude))
+    return list(places.values())
+
+
+def seed_cache(places):
+    """
+    Stores each (name, latitude, longitude) as a permanent entry under its
+    full name and its leading part ("SWG3, West End" also answers "swg3").
+    Seeds replace searched entries for the same query; the first place
+    given for a query wins. Returns the number of queries seeded.
+    """
+    from .models import PlaceCache
+
+    entries = {}
+    for name, latitude, longitude in places:
+        results = [{'name': name, 'lat': float(latitude), 'lng': float(longitude)}]
+        for key in (normalize_query(name), normalize_query(re.split(r"[,(]", name)[0])):
+            if len(key) >= MIN_QUERY_LENGTH:
+                entries.setdefault(key, results)
+
+    now = timezone.now()
+    keys = sorted(entries)
+    for i in range(0, len(keys), SEED_CHUNK):
+        chunk = keys[i:i + SEED_CHUNK]
+        PlaceCache.objects.filter(query__in=chunk).delete()
+        PlaceCache.objects.bulk_create([
+            PlaceCache(query=key, results=json.dumps(entries[key]), seeded=True, fetched_at=now)
+            for key in chunk
+        ])
+    get_lru().clear()
+    return len(entries)
+
+
+def prune_cache(max_entries=None):
+    """Drops expired searched entries, then the oldest beyond MAX_ENTRIES. Seeds are kept."""
+    from .models import PlaceCache
+
+    now = timezone.now()
+    searched = PlaceCache.objects.filter(seeded=False)
+    searched.exclude(results="[]").filter(
+        fetched_at__lt=now - timedelta(days=geocoding.geocoder_setting('TTL_DAYS'))
+    ).delete()
+    searched.filter(
+        results="[]", fetched_at__lt=now - timedelta(days=geocoding.geocoder_setting('NEGATIVE_TTL_DAYS'))
+    ).delete()
+
+    max_entries = max_entries or geocoding.geocoder_setting('MAX_ENTRIES')
+    cutoff = list(searched.order_by('-fetched_at').values_list('fetched_at', flat=True)[max_entries:max_entries + 1])
+    if cutoff:
+        searched.filter(fetched_at__lte=cutoff[0]).delete()
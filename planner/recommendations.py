@@ -0,0 +1,162 @@
+"""
+Event recommendations for a group: size, budget band, preferred days,
+occasion and a home location.
+
+The hard constraints (group size within the event's min/max, budget band,
+preferred weekdays, date window and a box around home) are all indexed SQL
+filters, and the matching occurrences are grouped per event in that same
+query. Only the surviving candidates are scored in Python, by distance
+from home and how well the group, budget and occasion fit the event.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, FloatField, Min, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from . import recurrence
+from .geo import bbox_cell_filter, haversine_km, radius_bbox
+from .models import Choices, Event, EventOccurrence
+
+BUDGET_ORDER = [code for code, _ in Choices.get_budget_band()]
+WEEKDAY_CODES = [code for code, _ in Choices.get_best_days()]
+
+# Event kinds that suit each occasion; a matching kind adds to the score.
+OCCASION_KINDS = {
+    'BIRTHDAY': {'SOCIAL', 'FOOD', 'CLUB', 'COMEDY', 'CONCERT'},
+    'CHRISTMAS': {'FOOD', 'CLUB', 'SOCIAL', 'THEATRE', 'COMEDY'},
+    'RETIREMENT': {'FOOD', 'SOCIAL', 'THEATRE', 'TOUR'},
+    'CELEBRATION': {'CLUB', 'FOOD', 'SOCIAL', 'CONCERT'},
+    'WELCOME': {'SOCIAL', 'FOOD', 'WORKSHOP', 'TOUR'},
+}
+
+SCORE_WEIGHTS = {
+    'distance': 0.45,
+    'fit': 0.30,
+    'occasion': 0.15,
+    'budget': 0.10,
+}
+
+DEFAULT_RADIUS_KM = 15.0
+MAX_RADIUS_KM = 100.0
+
+# Only what scoring needs is grouped; titles etc. are fetched for the winners.
+CANDIDATE_COLUMNS = ('event_id', 'event__kind', 'event__budget', 'event__max_group_size')
+
+
+def event_constraints(group_size, budget=None, home=None, radius_km=DEFAULT_RADIUS_KM, prefix='event__'):
+    """
+    Q object for the event-level hard constraints. budget is the most the
+    group wants to spend, so cheaper bands qualify too.
+    """
+    constraints = Q(**{
+        f'{prefix}is_active': True,
+        f'{prefix}min_group_size__lte': group_size,
+    }) & (Q(**{f'{prefix}max_group_size__isnull': True}) | Q(**{f'{prefix}max_group_size__gte': group_size}))
+
+    if budget:
+        constraints &= Q(**{f'{prefix}budget__in': BUDGET_ORDER[:BUDGET_ORDER.index(budget) + 1]})
+
+    if home:
+        south, west, north, east = radius_bbox(home[0], home[1], radius_km)
+        constraints &= bbox_cell_filter(south, west, north, east, field=f'{prefix}grid_cell') & Q(**{
+            f'{prefix}latitude__gte': south, f'{prefix}latitude__lte': north,
+            f'{prefix}longitude__gte': west, f'{prefix}longitude__lte': east,
+        })
+    return constraints
+
+
+def candidates(group_size, budget=None, days=(), home=None, radius_km=DEFAULT_RADIUS_KM,
+               window_start=None, window_end=None):
+    """
+    {event_id: candidate dict} for every event with a qualifying occurrence
+    in the window, with its next such start and how many there are. Grouped
+    per event in a single query.
+    """
+    window_start = window_start or timezone.now()
+    window_end = window_end or window_start + timedelta(days=recurrence.DEFAULT_HORIZON_DAYS)
+    constraints = event_constraints(group_size, budget, home, radius_km)
+    weekdays = sorted(WEEKDAY_CODES.index(code) for code in days)
+
+    occurrences = EventOccurrence.objects.filter(
+        constraints, start_datetime__gte=window_start, start_datetime__lt=window_end,
+    )
+    if weekdays:
+        occurrences = occurrences.filter(weekday__in=weekdays)
+    rows = (
+        occurrences.values_list(*CANDIDATE_COLUMNS)
+        # Floats rather than Decimals: these are only used for distances.
+        .annotate(lat=Cast('event__latitude', FloatField()), lng=Cast('event__longitude', FloatField()))
+        .annotate(next_start=Min('start_datetime'), matching=Count('pk'))
+        .order_by()
+    )
+
+    found = {}
+    for event_id, kind, event_budget, max_size, lat, lng, next_start, matching in rows:
+        found[event_id] = {
+            'category': kind, 'budget': event_budget, 'max_group_size': max_size,
+            'lat': lat, 'lng': lng, 'next_start': next_start, 'matching': matching,
+        }
+
+    # Recurring events contribute their generated dates, checked against the same days.
+    rules = recurrence.active_rules(window_start, window_end).filter(constraints).select_related('event')
+    for start, rule in recurrence.expanded_occurrences(rules, window_start, window_end):
+        if weekdays and timezone.localtime(start).weekday() not in weekdays:
+            continue
+        event = rule.event
+        candidate = found.setdefault(event.pk, {
+            'category': event.kind, 'budget': event.budget, 'max_group_size': event.max_group_size,
+            'lat': float(event.latitude) if event.latitude is not None else None,
+            'lng': float(event.longitude) if event.longitude is not None else None,
+            'next_start': start, 'matching': 0,
+        })
+        candidate['next_start'] = min(candidate['next_start'], start)
+        candidate['matching'] += 1
+    return found
+
+
+def score(candidate, group_size, budget=None, occasion=None, home=None, radius_km=DEFAULT_RADIUS_KM):
+    """Weighted 0-1 score; also sets candidate['distance_km'] when home is given."""
+    parts = {}
+
+    if home and candidate['lat'] is not None and candidate['lng'] is not None:
+        distance = haversine_km(home[0], home[1], candidate['lat'], candidate['lng'])
+        candidate['distance_km'] = round(distance, 2)
+        parts['distance'] = max(0.0, 1.0 - distance / radius_km)
+    else:
+        candidate['distance_km'] = None
+        parts['distance'] = 0.0
+
+    # The fuller the group makes the event, the better; open-ended events sit in the middle.
+    max_size = candidate['max_group_size']
+    parts['fit'] = group_size / max_size if max_size else 0.5
+
+    parts['occasion'] = 1.0 if candidate['category'] in OCCASION_KINDS.get(occasion, ()) else 0.0
+
+    if budget:
+        gap = BUDGET_ORDER.index(budget) - BUDGET_ORDER.index(candidate['budget'])
+        parts['budget'] = 1.0 - gap / len(BUDGET_ORDER)
+    else:
+        parts['budget'] = 1.0
+
+    return sum(SCORE_WEIGHTS[name] * value for name, value in parts.items())
+
+
+def recommend(group_size, budget=None, days=(), occasion=None, home=None, radius_km=DEFAULT_RADIUS_KM,
+              window_start=None, window_end=None, limit=20):
+    """The best `limit` candidates, highest score first, ties broken by the soonest date."""
+    found = candidates(group_size, budget, days, home, radius_km, window_start, window_end)
+    ranked = []
+    for event_id, candidate in found.items():
+        candidate['score'] = round(score(candidate, group_size, budget, occasion, home, radius_km), 4)
+        ranked.append((-candidate['score'], candidate['next_start'], event_id, candidate))
+    ranked.sort(key=lambda item: item[:3])
+    ranked = ranked[:limit]
+
+    details = Event.objects.in_bulk([event_id for _, _, event_id, _ in ranked])
+    results = []
+    for _, _, event_id, candidate in ranked:
+        event = details[event_id]
+        candidate.update(slug=event.slug, name=event.title, address=event.location_name)
+        results.append(candidate)
+    return results
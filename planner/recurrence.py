@@ -0,0 +1,129 @@
+"""
+Lazy expansion of RecurrenceRule into occurrences.
+
+Recurring events are not written out as EventOccurrence rows. Their dates
+are generated on demand for whatever window is being listed, and only
+materialized overrides (e.g. an occurrence with a recorded attendee count)
+exist as real rows; a stored occurrence at the same (event, start) replaces
+the generated one. Generated occurrences get string ids of the form
+"r<rule id>-<unix seconds>".
+"""
+import calendar
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+WEEKDAY_CODES = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+
+# How far ahead rules are expanded when a listing has no end date.
+DEFAULT_HORIZON_DAYS = 92
+
+
+def _add_months(year, month, months):
+    month_index = year * 12 + (month - 1) + months
+    return month_index // 12, month_index % 12 + 1
+
+
+def _local_starts(rule, from_local):
+    """
+    Yields naive local start datetimes of the rule in order, beginning
+    with the first period that can contain from_local. Ignores until/count.
+    """
+    first = timezone.localtime(rule.dtstart).replace(tzinfo=None)
+    interval = max(rule.interval, 1)
+
+    if rule.frequency == rule.DAILY:
+        skip = max((from_local - first).days // interval, 0)
+        current = first + timedelta(days=skip * interval)
+        while True:
+            yield current
+            current += timedelta(days=interval)
+
+    elif rule.frequency == rule.WEEKLY:
+        offsets = sorted({WEEKDAY_CODES.index(code) for code in rule.weekdays} or {first.weekday()})
+        week_start = (first - timedelta(days=first.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        skip = max((from_local - week_start).days // (7 * interval), 0)
+        period = week_start + timedelta(weeks=skip * interval)
+        while True:
+            for offset in offsets:
+                candidate = (period + timedelta(days=offset)).replace(
+                    hour=first.hour, minute=first.minute, second=first.second, microsecond=first.microsecond)
+                if candidate >= first:
+                    yield candidate
+            period += timedelta(weeks=interval)
+
+    elif rule.frequency == rule.MONTHLY:
+        months_between = (from_local.year - first.year) * 12 + (from_local.month - first.month)
+        step = max(months_between // interval, 0)
+        while True:
+            year, month = _add_months(first.year, first.month, step * interval)
+            # Months without that day (e.g. the 31st) are skipped, as in RFC 5545.
+            if first.day <= calendar.monthrange(year, month)[1]:
+                yield first.replace(year=year, month=month)
+            step += 1
+
+    else:
+        raise ValueError(f"Unknown frequency: {rule.frequency}")
+
+
+def expand(rule, window_start, window_end, exceptions=None):
+    """Aware start datetimes of the rule in [window_start, window_end), in order."""
+    if exceptions is None:
+        exceptions = set(rule.exceptions.values_list('original_start', flat=True))
+    end = window_end if rule.until is None else min(window_end, rule.until + timedelta(microseconds=1))
+
+    # A count limit is defined from dtstart, so those rules are walked from the beginning.
+    from_local = timezone.localtime(rule.dtstart if rule.count else window_start).replace(tzinfo=None)
+    for index, local_start in enumerate(_local_starts(rule, from_local)):
+        if rule.count and index >= rule.count:
+            return
+        start = timezone.make_aware(local_start, is_dst=False)
+        if start >= end:
+            return
+        if start >= window_start and start not in exceptions:
+            yield start
+
+
+def active_rules(window_start, window_end):
+    """Rules that may produce occurrences in the window."""
+    from .models import RecurrenceRule
+
+    return RecurrenceRule.objects.active(window_start).filter(dtstart__lt=window_end)
+
+
+def expanded_occurrences(rules, window_start, window_end):
+    """
+    Yields (start_datetime, rule) for every generated occurrence of the
+    given rules in the window, merged into start order, skipping the ones
+    a stored EventOccurrence overrides.
+    """
+    from .models import EventOccurrence, RecurrenceException
+
+    rules = list(rules)
+    if not rules:
+        return
+
+    overridden = set(EventOccurrence.objects.filter(
+        event_id__in={rule.event_id for rule in rules},
+        start_datetime__gte=window_start,
+        start_datetime__lt=window_end,
+    ).values_list('event_id', 'start_datetime'))
+
+    exceptions = {}
+    for rule_id, original_start in RecurrenceException.objects.filter(
+        rule__in=rules, original_start__gte=window_start, original_start__lt=window_end,
+    ).values_list('rule_id', 'original_start'):
+        exceptions.setdefault(rule_id, set()).add(original_start)
+
+    def generate(rule):
+        for start in expand(rule, window_start, window_end, exceptions.get(rule.pk, set())):
+            if (rule.event_id, start) not in overridden:
+                yield start, rule.pk, rule
+
+    for start, _, rule in heapq.merge(*(generate(rule) for rule in rules)):
+        yield start, rule
+
+
+def virtual_id(rule, start):
+    return f"r{rule.pk}-{int(start.timestamp())}"
@@ -0,0 +1,214 @@
+"""
+The AttendanceRollup table behind the attendance analytics.
+
+Stored occurrences are summed per local day, event kind and budget band:
+how many there were, how many had an attendance recorded and how many
+people attended. A summary over any window reads at most
+days x kinds x budgets rollup rows, however long the occurrence history
+grows. Totals are never adjusted by deltas; a write re-aggregates the
+whole days it touched from EventOccurrence, so the rows cannot drift from
+the source. The receivers in planner.signals keep the rows current; bulk
+writers and deletes (see the Event and EventOccurrence querysets) wrap
+their work in deferred() so each touched day is re-aggregated once at the
+end rather than once per batch or deleted row. `manage.py rebuild_rollups`
+regenerates the whole table.
+"""
+import operator
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .scheduling import day_bounds
+
+# Days (or event ids) re-aggregated per statement.
+BATCH_SIZE = 100
+
+DEFAULT_WINDOW_DAYS = 90
+MAX_WINDOW_DAYS = 3660
+
+FIGURES = ('occurrences', 'reported', 'attendees')
+
+# Per thread: the days collected inside deferred().
+_local = threading.local()
+
+
+def local_date(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def _aggregate(occurrences):
+    """{(day, kind, budget): (occurrences, reported, attendees)} for an EventOccurrence queryset."""
+    groups = (
+        occurrences.order_by()
+        .annotate(day=TruncDate('start_datetime'))
+        .values_list('day', 'event__kind', 'event__budget')
+        .annotate(
+            occurrences=Count('pk'),
+            reported=Count('pk', filter=Q(actual_attendees__gt=0)),
+            attendees=Sum('actual_attendees'),
+        )
+    )
+    return {
+        (day, kind, budget): (count, reported, attendees or 0)
+        for day, kind, budget, count, reported, attendees in groups
+    }
+
+
+def _new_rows(totals):
+    from .models import AttendanceRollup
+
+    return [
+        AttendanceRollup(day=day, weekday=day.weekday(), kind=kind, budget=budget,
+                         **dict(zip(FIGURES, figures)))
+        for (day, kind, budget), figures in totals.items()
+    ]
+
+
+@contextmanager
+def deferred():
+    """
+    Collects the days synced inside the block and re-aggregates each of
+    them once on the way out, e.g. around a multi-batch import.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+    finally:
+        # Also on errors: batches committed before the failure still need their days.
+        days, _local.pending = _local.pending, None
+        sync_days(days)
+
+
+def sync_days(days):
+    """
+    Re-aggregates the rollup rows of the given local dates. The days' rows
+    are locked before the occurrences are read, so concurrent syncs of the
+    same days queue up, and rows are updated in place rather than deleted
+    and re-inserted, so they cannot collide on the unique key.
+    """
+    from .models import AttendanceRollup, EventOccurrence
+
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(days)
+        return
+
+    days = sorted(set(days))
+    for i in range(0, len(days), BATCH_SIZE):
+        chunk = days[i:i + BATCH_SIZE]
+        ranges = reduce(operator.or_, (
+            Q(start_datetime__gte=start, start_datetime__lt=end) for start, end in map(day_bounds, chunk)
+        ))
+        with transaction.atomic():
+            existing = AttendanceRollup.objects.select_for_update().filter(day__in=chunk).order_by('pk')
+            totals = _aggregate(EventOccurrence.objects.filter(ranges))
+            changed, emptied = [], []
+            for row in existing:
+                figures = totals.pop((row.day, row.kind, row.budget), None)
+                if figures is None:
+                    emptied.append(row.pk)
+                elif figures != tuple(getattr(row, field) for field in FIGURES):
+                    for field, value in zip(FIGURES, figures):
+                        setattr(row, field, value)
+                    changed.append(row)
+            AttendanceRollup.objects.bulk_update(changed, FIGURES, batch_size=500)
+            AttendanceRollup.objects.filter(pk__in=emptied).delete()
+            # A concurrent sync may have created the same group since the lock was taken.
+            AttendanceRollup.objects.bulk_create(_new_rows(totals), batch_size=500, ignore_conflicts=True)
+
+
+def sync_occurrence(occurrence):
+    """Re-aggregates the day of a saved or deleted occurrence, and the day it moved from."""
+    days = {local_date(occurrence.start_datetime)}
+    loaded = getattr(occurrence, '_loaded_start_datetime', None)
+    if loaded is not None:
+        days.add(local_date(loaded))
+    sync_days(days)
+
+
+def _event_days(event_ids):
+    from .models import EventOccurrence
+
+    event_ids = sorted(set(event_ids))
+    days = set()
+    for i in range(0, len(event_ids), BATCH_SIZE):
+        days.update(
+            EventOccurrence.objects.filter(event_id__in=event_ids[i:i + BATCH_SIZE]).order_by()
+            .annotate(day=TruncDate('start_datetime')).values_list('day', flat=True).distinct()
+        )
+    return days
+
+
+def sync_events(event_ids):
+    """Re-aggregates every day on which the given events have an occurrence."""
+    sync_days(_event_days(event_ids))
+
+
+def update_event(event):
+    """Re-aggregates a saved event's days if its kind or budget changed."""
+    if getattr(event, '_loaded_rollup_key', None) != (event.kind, event.budget):
+        sync_events([event.pk])
+
+
+def rebuild():
+    """Regenerates every rollup row in one grouped pass; returns how many were written."""
+    from .models import AttendanceRollup, EventOccurrence
+
+    with transaction.atomic():
+        AttendanceRollup.objects.all().delete()
+        rows = _new_rows(_aggregate(EventOccurrence.objects.all()))
+        AttendanceRollup.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def _figures(value, label, totals):
+    occurrences, reported, attendees = totals or (0, 0, 0)
+    return {
+        'value': value,
+        'label': label,
+        'occurrences': occurrences,
+        'reported': reported,
+        'attendees': attendees,
+        # Averaged over the occurrences that have an attendance recorded.
+        'average': round(attendees / reported, 1) if reported else None,
+    }
+
+
+def attendance_summary(days=DEFAULT_WINDOW_DAYS, today=None):
+    """
+    Occurrence counts and attendance over the `days` local dates ending
+    today, in total and broken down by kind, weekday and budget band.
+    """
+    from .models import AttendanceRollup, Choices
+
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = AttendanceRollup.objects.filter(day__gte=start, day__lte=today).order_by()
+    sums = {f'total_{field}': Sum(field) for field in FIGURES}
+
+    def breakdown(field, choices):
+        groups = rows.values(field).annotate(**sums).values_list(field, *sums)
+        totals = {row[0]: row[1:] for row in groups}
+        return [_figures(value, label, totals.get(value)) for value, label in choices]
+
+    overall = rows.aggregate(**sums)
+    return {
+        'start': start.isoformat(),
+        'end': today.isoformat(),
+        'days': days,
+        'total': _figures('', "All events", tuple(overall[key] or 0 for key in sums)),
+        'kind': breakdown('kind', Choices.get_event_kind()),
+        'weekday': breakdown('weekday', [(index, label) for index, (_, label) in enumerate(Choices.get_best_days())]),
+        'budget': breakdown('budget', Choices.get_budget_band()),
+    }
@@ -0,0 +1,146 @@
+"""
+Interval queries over stored occurrences: what overlaps a time slot,
+anywhere or at one place, and which parts of a day are still free.
+
+Occurrences store end_datetime, and none lasts longer than MAX_DURATION
+(duration_hours is at most 99.99), so everything overlapping [start, end)
+began in [start - MAX_DURATION, end). Each query is therefore a bounded
+range scan over a (..., start_datetime, end_datetime) index whose end
+check is answered from the index itself:
+
+- anywhere: EventOccurrence(start_datetime, end_datetime);
+- at a place: OccurrenceListing(grid_cell, start_datetime, end_datetime),
+  a place being its event's full-precision geohash cell (a few metres);
+- near a place: the same index over the grid_cell ranges covering the
+  radius, trimmed to the exact distance afterwards.
+
+Near a place, the dates recurring events generate are booked too: the
+rules of events in the same grid_cell ranges are expanded over the window
+and returned as GeneratedSlot rows alongside the stored ones.
+"""
+import bisect
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from . import recurrence
+from .geo import bbox_cell_filter, geohash_encode, haversine_km, radius_bbox
+
+MAX_DURATION = timedelta(hours=100)
+
+DEFAULT_NEAR_RADIUS_KM = 0.25
+# How close another occurrence must be to count as booking the same place. Picked
+# points and geocoded coordinates for one venue rarely agree to the metre.
+BOOKING_RADIUS_KM = 0.05
+MAX_NEAR_RADIUS_KM = 5.0
+# Gaps shorter than this are not offered as free slots.
+DEFAULT_MIN_SLOT = timedelta(minutes=30)
+
+# Listing columns the overlap queries return.
+SLOT_FIELDS = (
+    'occurrence_id', 'event_id', 'start_datetime', 'end_datetime', 'title', 'slug',
+    'latitude', 'longitude', 'location_name',
+)
+
+# A date generated by a recurring event, with the SLOT_FIELDS of a listing row;
+# occurrence_id is its recurrence.virtual_id.
+GeneratedSlot = namedtuple('GeneratedSlot', SLOT_FIELDS)
+
+# How far ahead the later dates of a repeating event are checked for clashes.
+REPEAT_CHECK_HORIZON = timedelta(days=366)
+
+
+def overlapping(start, end, queryset=None):
+    """
+    The rows of queryset (EventOccurrences by default, or any queryset of a
+    model with start_datetime/end_datetime) overlapping [start, end).
+    """
+    if queryset is None:
+        from .models import EventOccurrence
+        queryset = EventOccurrence.objects.all()
+    return queryset.filter(
+        start_datetime__gt=start - MAX_DURATION, start_datetime__lt=end, end_datetime__gt=start,
+    )
+
+
+def overlapping_at(latitude, longitude, start, end):
+    """OccurrenceListing rows at the place of the point overlapping [start, end), earliest first."""
+    from .models import OccurrenceListing
+
+    at_place = OccurrenceListing.objects.filter(grid_cell=geohash_encode(latitude, longitude))
+    return overlapping(start, end, at_place).only(*SLOT_FIELDS).order_by('start_datetime')
+
+
+def overlapping_near(latitude, longitude, radius_km, start, end):
+    """
+    Stored and generated occurrences within radius_km of the point
+    overlapping [start, end), earliest first.
+    """
+    from .models import OccurrenceListing
+
+    def near(row):
+        return row.latitude is not None and haversine_km(latitude, longitude, row.latitude, row.longitude) <= radius_km
+
+    bbox = radius_bbox(latitude, longitude, radius_km)
+    nearby = OccurrenceListing.objects.filter(bbox_cell_filter(*bbox))
+    rows = [row for row in overlapping(start, end, nearby).only(*SLOT_FIELDS) if near(row)]
+
+    rules = recurrence.active_rules(start - MAX_DURATION, end).filter(
+        bbox_cell_filter(*bbox, field='event__grid_cell'),
+    ).select_related('event')
+    rules = [rule for rule in rules if near(rule.event)]
+    for occurrence_start, rule in recurrence.expanded_occurrences(rules, start - MAX_DURATION, end):
+        occurrence_end = occurrence_start + timedelta(hours=float(rule.duration_hours))
+        if occurrence_end > start:
+            event = rule.event
+            rows.append(GeneratedSlot(
+                recurrence.virtual_id(rule, occurrence_start), event.pk, occurrence_start, occurrence_end,
+                event.title, event.slug, event.latitude, event.longitude, event.location_name,
+            ))
+    return sorted(rows, key=lambda row: row.start_datetime)
+
+
+def conflicts_near(latitude, longitude, radius_km, slots):
+    """
+    The occurrences overlapping_near() finds for any of the (start, end)
+    slots, which must be in start order with ends in the same order (as
+    the dates of one event are), from one lookup over their whole span.
+    """
+    if not slots:
+        return []
+    ends = [end for _, end in slots]
+    conflicts = []
+    for row in overlapping_near(latitude, longitude, radius_km, slots[0][0], ends[-1]):
+        # The first slot ending after the row starts is the only one that can overlap it first.
+        index = bisect.bisect_right(ends, row.start_datetime)
+        if index < len(slots) and slots[index][0] < row.end_datetime:
+            conflicts.append(row)
+    return conflicts
+
+
+def day_bounds(day, opens=None, closes=None):
+    """Aware [start, end) of a local date, optionally narrowed to opening hours."""
+    start = timezone.make_aware(datetime.combine(day, opens or time.min))
+    if closes:
+        end = timezone.make_aware(datetime.combine(day, closes))
+    else:
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    if end <= start:
+        raise ValueError("closing time must be after opening time")
+    return start, end
+
+
+def free_slots(busy, start, end, min_slot=DEFAULT_MIN_SLOT):
+    """The (start, end) gaps of at least min_slot left in [start, end) by the busy rows."""
+    slots = []
+    cursor = start
+    for row in sorted(busy, key=lambda row: row.start_datetime):
+        if row.start_datetime - cursor >= min_slot:
+            slots.append((cursor, row.start_datetime))
+        cursor = max(cursor, row.end_datetime)
+        if cursor >= end:
+            break
+    if end - cursor >= min_slot:
+        slots.append((cursor, end))
+    return slots
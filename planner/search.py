@@ -0,0 +1,182 @@
+"""
+Full-text search over events (title, description, location_name, tags).
+
+On SQLite builds with FTS5 the index is the planner_event_fts virtual
+table, keyed by event id. Other databases use the SearchTerm table as an
+inverted index of (term, event, weight) rows. Both support ranked prefix
+queries, and both are kept current by the receivers in planner.signals.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "planner_event_fts"
+
+# Relative importance of each indexed field, highest first.
+FIELD_WEIGHTS = {
+    'title': 10,
+    'tags': 5,
+    'location_name': 2,
+    'description': 1,
+}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def uses_fts5(conn=None):
+    conn = conn or connection
+    if conn.vendor != 'sqlite':
+        return False
+    if not hasattr(conn, '_planner_fts5'):
+        with conn.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            options = {row[0] for row in cursor.fetchall()}
+        conn._planner_fts5 = 'ENABLE_FTS5' in options
+    return conn._planner_fts5
+
+
+def create_fts_table(schema_editor):
+    if uses_fts5(schema_editor.connection):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, description, location_name, tags)"
+        )
+
+
+def drop_fts_table(schema_editor):
+    if uses_fts5(schema_editor.connection):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _match_expression(query):
+    # Every token must match, each as a prefix: "jaz nig" -> "jaz"* "nig"*
+    return " ".join(f'"{token}"*' for token in tokenize(query))
+
+
+def _event_documents(event_ids):
+    from .models import Event
+
+    events = Event.objects.filter(pk__in=event_ids).prefetch_related('tags')
+    for event in events:
+        yield event.pk, {
+            'title': event.title,
+            'description': event.description,
+            'location_name': event.location_name,
+            'tags': " ".join(tag.name for tag in event.tags.all()),
+        }
+
+
+def index_events(event_ids):
+    """(Re)indexes the given events; ids that no longer exist are dropped."""
+    from .models import SearchTerm
+
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    documents = list(_event_documents(event_ids))
+
+    if uses_fts5():
+        remove_events(event_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, location_name, tags) VALUES (%s, %s, %s, %s, %s)",
+                [(pk, doc['title'], doc['description'], doc['location_name'], doc['tags']) for pk, doc in documents],
+            )
+        return
+
+    SearchTerm.objects.filter(event_id__in=event_ids).delete()
+    terms = []
+    for pk, doc in documents:
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(doc[field]):
+                term = token[:SearchTerm.TERM_MAX_LENGTH]
+                weights[term] = max(weights.get(term, 0), weight)
+        terms.extend(SearchTerm(event_id=pk, term=term, weight=weight) for term, weight in weights.items())
+    SearchTerm.objects.bulk_create(terms)
+
+
+def remove_events(event_ids):
+    from .models import SearchTerm
+
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    if uses_fts5():
+        placeholders = ", ".join(["%s"] * len(event_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", event_ids)
+    else:
+        SearchTerm.objects.filter(event_id__in=event_ids).delete()
+
+
+def rebuild_index(batch_size=1000):
+    from .models import Event, SearchTerm
+
+    if uses_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    else:
+        SearchTerm.objects.all().delete()
+
+    event_ids = list(Event.objects.values_list('pk', flat=True))
+    for i in range(0, len(event_ids), batch_size):
+        index_events(event_ids[i:i + batch_size])
+    return len(event_ids)
+
+
+def _term_queryset(query):
+    from .models import SearchTerm
+
+    terms = SearchTerm.objects.all()
+    for token in tokenize(query):
+        terms = terms.filter(
+            event_id__in=SearchTerm.objects.filter(term__startswith=token).values('event_id')
+        )
+    prefixes = Q()
+    for token in tokenize(query):
+        prefixes |= Q(term__startswith=token)
+    return terms.filter(prefixes)
+
+
+def matching_events_filter(query, field='pk'):
+    """
+    A Q object restricting `field` (an event id column) to events matching
+    the query, evaluated as a subquery so the ids never reach Python.
+    """
+    if not tokenize(query):
+        return Q()
+    if uses_fts5():
+        subquery = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (_match_expression(query),))
+    else:
+        subquery = _term_queryset(query).values('event_id')
+    return Q(**{f"{field}__in": subquery})
+
+
+def search_event_ids(query, limit=20):
+    """Event ids matching every query token as a prefix, best match first."""
+    if not tokenize(query):
+        return []
+    if uses_fts5():
+        weights = ", ".join(str(float(FIELD_WEIGHTS[field])) for field in ('title', 'description', 'location_name', 'tags'))
+        with connection.cursor() as cursor:
+            # bm25() is lower for better matches.
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+                [_match_expression(query), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    ranked = (
+        _term_queryset(query).values('event_id')
+        .annotate(score=Sum('weight'), hits=Count('term'))
+        .order_by('-score', '-hits', 'event_id')[:limit]
+    )
+    return [row['event_id'] for row in ranked]
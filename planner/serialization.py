@@ -0,0 +1,110 @@
+"""
+Column-level serialization for occurrence listings.
+
+Instead of hydrating EventOccurrence/Event instances (and their Decimal
+fields) only to convert them again, the listing APIs fetch just the
+columns below with values_list() and turn each row into the dashboard's
+JSON shape in a single pass.
+"""
+import json
+
+OCCURRENCE_COLUMNS = (
+    'pk',
+    'start_datetime',
+    'duration_hours',
+    'actual_attendees',
+    'event__title',
+    'event__kind',
+    'event__description',
+    'event__budget',
+    'event__slug',
+    'event__latitude',
+    'event__longitude',
+    'event__location_name',
+)
+
+# The same row shape from the denormalized OccurrenceListing table (no join).
+LISTING_COLUMNS = (
+    'pk',
+    'start_datetime',
+    'duration_hours',
+    'actual_attendees',
+    'title',
+    'kind',
+    'description',
+    'budget',
+    'slug',
+    'latitude',
+    'longitude',
+    'location_name',
+)
+
+# Rows per chunk emitted by iter_occurrence_json.
+JSON_CHUNK_ROWS = 500
+
+
+def occurrence_rows(queryset):
+    return queryset.values_list(*OCCURRENCE_COLUMNS)
+
+
+def listing_rows(queryset):
+    return queryset.values_list(*LISTING_COLUMNS)
+
+
+def recurrence_row(rule, start):
+    """A generated occurrence of a RecurrenceRule (with its event loaded) as an occurrence row."""
+    from .recurrence import virtual_id
+
+    event = rule.event
+    return (
+        virtual_id(rule, start), start, rule.duration_hours, 0, event.title, event.kind,
+        event.description, event.budget, event.slug, event.latitude, event.longitude,
+        event.location_name,
+    )
+
+
+def serialize_rows(rows):
+    """Converts occurrence_rows() / listing_rows() tuples to the dashboard's event dicts."""
+    return [
+        {
+            'id': pk,
+            'name': title,
+            'date_ms': int(start.timestamp() * 1000),
+            'time': f"{start.hour:02d}:{start.minute:02d}",
+            'duration': float(duration),
+            'category': kind,
+            'attendees': attendees,
+            'description': description,
+            'budget': budget,
+            'slug': slug,
+            'location': {
+                'lat': float(lat) if lat else 0.0,
+                'lng': float(lng) if lng else 0.0,
+                'address': location_name,
+            },
+        }
+        for (pk, start, duration, attendees, title, kind, description,
+             budget, slug, lat, lng, location_name) in rows
+    ]
+
+
+def iter_occurrence_json(rows, **extra):
+    """
+    Yields a JSON object {"results": [...], **extra} in chunks so large
+    listings never have to exist as one Python list of dicts.
+    """
+    yield '{"results": ['
+    chunk = []
+    first = True
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= JSON_CHUNK_ROWS:
+            yield ('' if first else ',') + json.dumps(serialize_rows(chunk))[1:-1]
+            first = False
+            chunk = []
+    if chunk:
+        yield ('' if first else ',') + json.dumps(serialize_rows(chunk))[1:-1]
+    yield ']'
+    for key, value in extra.items():
+        yield f', {json.dumps(key)}: {json.dumps(value)}'
+    yield '}'
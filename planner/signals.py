@@ -0,0 +1,105 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import cache, listings, rollups, search
+from .models import Event, EventOccurrence, RecurrenceException, RecurrenceRule, Tag
+
+# Sent by bulk writers (e.g. import_events) that bypass model save signals.
+# occurrence_days, when given, are the local dates of occurrences written.
+events_bulk_written = Signal(providing_args=["event_ids", "occurrence_days"])
+
+
+@receiver(post_save, sender=Event)
+def index_saved_event(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_events([instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def unindex_deleted_event(sender, instance, **kwargs):
+    search.remove_events([instance.pk])
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+def index_retagged_events(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # pk_set is not provided for a clear from the tag side, so note the events first.
+        instance._cleared_event_ids = list(instance.events.values_list('pk', flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        search.index_events([instance.pk])
+    elif action == "post_clear":
+        search.index_events(getattr(instance, '_cleared_event_ids', []))
+    else:
+        search.index_events(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def index_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_events(instance.events.values_list('pk', flat=True))
+
+
+@receiver(events_bulk_written)
+def index_bulk_written_events(sender, event_ids, **kwargs):
+    search.index_events(event_ids)
+
+
+@receiver(post_save, sender=EventOccurrence)
+def list_saved_occurrence(sender, instance, raw=False, **kwargs):
+    if not raw:
+        listings.sync_occurrences([instance.pk])
+
+
+@receiver(post_save, sender=Event)
+def relist_saved_event(sender, instance, created, raw=False, **kwargs):
+    # A new event has no occurrences yet; deletes cascade to the listing rows.
+    if not created and not raw:
+        listings.update_event(instance)
+
+
+@receiver(events_bulk_written)
+def list_bulk_written_events(sender, event_ids, **kwargs):
+    listings.sync_events(event_ids)
+
+
+@receiver(post_save, sender=EventOccurrence)
+@receiver(post_delete, sender=EventOccurrence)
+def roll_up_occurrence(sender, instance, raw=False, **kwargs):
+    # Deletes run inside rollups.deferred() (see the model querysets), so a
+    # queryset or cascading delete re-aggregates each day once.
+    if not raw:
+        rollups.sync_occurrence(instance)
+
+
+@receiver(post_save, sender=Event)
+def roll_up_saved_event(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        rollups.update_event(instance)
+
+
+@receiver(events_bulk_written)
+def roll_up_bulk_written_occurrences(sender, occurrence_days=None, **kwargs):
+    # Senders that only touch event columns the rollups do not use omit occurrence_days.
+    if occurrence_days:
+        rollups.sync_days(occurrence_days)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=EventOccurrence)
+@receiver(post_delete, sender=EventOccurrence)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=RecurrenceRule)
+@receiver(post_delete, sender=RecurrenceRule)
+@receiver(post_save, sender=RecurrenceException)
+@receiver(post_delete, sender=RecurrenceException)
+@receiver(m2m_changed, sender=Event.tags.through)
+@receiver(events_bulk_written)
+def invalidate_dashboard_cache(sender, **kwargs):
+    # Starting a new generation orphans every cached dashboard payload.
+    if not kwargs.get('raw', False):
+        cache.bump_generation()
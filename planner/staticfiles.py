@@ -0,0 +1,120 @@
+"""
+Fingerprinted, pre-compressed static assets for production.
+
+CompressedManifestStorage is ManifestStaticFilesStorage (content-hashed
+file names plus a staticfiles.json manifest that {% static %} resolves
+through, so every deploy busts caches by itself) which also writes .gz
+copies, and .br copies when the optional brotli package is installed, of
+each text asset during collectstatic.
+
+serve() sends those files from STATIC_ROOT when no front-end server does.
+A hashed name never changes content, so it is cacheable for a year and
+marked immutable; repeat page loads then make no asset requests at all.
+The best pre-compressed variant the client accepts is sent as is.
+"""
+import gzip
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml')
+# Smaller files gain nothing from compression.
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# For unhashed names, which may change on the next deploy.
+DEFAULT_MAX_AGE = 60
+
+# Preferred first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compressible(name):
+    return name.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = {name for name in list(paths) + list(self.hashed_files.values()) if compressible(name)}
+        for name in sorted(names):
+            for variant in self.compress(name):
+                yield name, variant, True
+
+    def compress(self, name):
+        """Writes the compressed variants of one file that come out smaller; returns their names."""
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return []
+        variants = [(name + '.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((name + '.br', brotli.compress(content)))
+
+        written = []
+        for variant, data in variants:
+            if len(data) >= len(content):
+                continue
+            if self.exists(variant):
+                self.delete(variant)
+            self.save(variant, ContentFile(data))
+            written.append(variant)
+        return written
+
+
+@lru_cache(maxsize=None)
+def hashed_names():
+    # The manifest only changes with a deploy, which restarts the workers.
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve(request, path):
+    """Serves a collected static file with long-lived caching and pre-compressed variants."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    send_path, encoding = full_path, None
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for name, suffix in ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + suffix):
+            send_path, encoding = full_path + suffix, name
+            break
+
+    stat = os.stat(send_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    response = FileResponse(open(send_path, 'rb'), content_type=content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if compressible(path):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if path in hashed_names():
+        response['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response['Cache-Control'] = f"public, max-age={DEFAULT_MAX_AGE}"
+    return response
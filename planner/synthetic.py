@@ -0,0 +1,82 @@
+"""
+Synthetic event/occurrence data at arbitrary scale.
+
+Rows are produced in the import_events format and loaded through
+EventImporter, so generating data exercises the same bulk path partners'
+feeds use. Locations are scattered around Glasgow city centre.
+"""
+import math
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .importing import EventImporter
+from .models import Choices
+
+GLASGOW_CENTRE = (55.8642, -4.2518)
+
+TITLE_WORDS = (
+    "Jazz", "Comedy", "Quiz", "Brewery", "Gallery", "Python", "Karaoke", "Whisky",
+    "Ceilidh", "Startup", "Design", "Poetry", "Vinyl", "Cocktail", "Science", "Film",
+)
+TITLE_FORMATS = ("Night", "Workshop", "Tour", "Meetup", "Social", "Showcase", "Masterclass", "Festival")
+AREAS = ("Merchant City", "West End", "Finnieston", "Southside", "East End", "City Centre", "Partick", "Dennistoun")
+BASE_TAGS = ("Team Building", "Corporate", "Social", "Training", "Entertainment")
+
+
+def random_point(rng, centre, spread_km):
+    # Uniform over a disc of radius spread_km around the centre.
+    distance = spread_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    lat = centre[0] + (distance / 111.32) * math.cos(bearing)
+    lng = centre[1] + (distance / (111.32 * math.cos(math.radians(centre[0])))) * math.sin(bearing)
+    return round(lat, 6), round(lng, 6)
+
+
+def generate_rows(events=1000, occurrences_per_event=10, tags=20, spread_km=10.0,
+                  days=180, seed=None, start=None):
+    """Yields one import row per occurrence; rows for each event are contiguous."""
+    rng = random.Random(seed)
+    start = start or timezone.now().replace(minute=0, second=0, microsecond=0)
+    kinds = [choice[0] for choice in Choices.get_event_kind()]
+    budgets = [choice[0] for choice in Choices.get_budget_band()]
+    tag_names = list(BASE_TAGS[:tags]) + [f"Tag {i}" for i in range(len(BASE_TAGS), tags)]
+    # There are only so many distinct (day, hour) slots to draw from.
+    occurrences_per_event = min(occurrences_per_event, (days + 8) * 14)
+
+    for i in range(events):
+        title = f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_FORMATS)} #{i}"
+        lat, lng = random_point(rng, GLASGOW_CENTRE, spread_km)
+        min_size = rng.randint(2, 50)
+        max_size = min_size + rng.randint(0, 200)
+        event_tags = rng.sample(tag_names, k=min(len(tag_names), rng.randint(0, 3)))
+        event = {
+            'title': title,
+            'description': f"{title} in {rng.choice(AREAS)}. Synthetic benchmark data.",
+            'kind': rng.choice(kinds),
+            'budget': rng.choice(budgets),
+            'latitude': lat,
+            'longitude': lng,
+            'location_name': f"{rng.choice(AREAS)} venue {i % 97}",
+            'min_group_size': min_size,
+            'max_group_size': max_size,
+            'tags': event_tags,
+            'duration_hours': rng.choice(("1.5", "2.0", "3.0", "4.0")),
+        }
+        starts = set()
+        while len(starts) < occurrences_per_event:
+            starts.add(start + timedelta(days=rng.randint(-7, days), hours=rng.randint(9, 22)))
+        for occurrence_start in sorted(starts):
+            yield dict(
+                event,
+                start_datetime=occurrence_start.isoformat(),
+                actual_attendees=rng.randint(min_size, max_size),
+            )
+
+
+def populate(batch_size=1000, on_batch=None, **options):
+    """Generates and imports synthetic data; returns the EventImporter for its counters."""
+    importer = EventImporter(batch_size=batch_size)
+    importer.run(generate_rows(**options), on_batch=on_batch)
+    return importer
@@ -0,0 +1,33 @@
+"""
+Tag names and batched tag resolution.
+
+Tags are free text typed by users or carried by imports, so every name is
+normalized (whitespace collapsed, lowercased) before it is stored or looked
+up; "Team  Building" and "team building" are the same tag. Writers resolve
+all of an event's or a batch's names at once with resolve_tags() rather
+than one get_or_create() per name.
+"""
+
+TAG_NAME_MAX_LENGTH = 50
+
+
+def normalize_tag_name(name):
+    return " ".join(str(name).split()).lower()[:TAG_NAME_MAX_LENGTH].strip()
+
+
+def resolve_tags(names):
+    """
+    Maps the normalized form of each name to its Tag row, creating missing
+    ones, in at most three queries however many names there are.
+    """
+    from .models import Tag
+
+    names = sorted({normalize_tag_name(name) for name in names} - {""})
+    if not names:
+        return {}
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=missing)})
+    return tags
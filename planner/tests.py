@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from time import monotonic as timer, sleep
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import Http404, QueryDict
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import dateformat, timezone
+
+from . import (
+    cache, geo, geocoding, listings, metrics, nearby, places, recurrence, rollups, search, staticfiles, upstream,
+)
+from .geocode_queue import GeocodeWorker
+from .importing import EventImporter, read_rows
+from .models import (
+    SLUG_LENGTH, AttendanceRollup, Event, EventOccurrence, GeocodeJob, OccurrenceListing, PlaceCache,
+    RecurrenceException, RecurrenceRule, Tag, Venue, generate_slug,
+)
+from .serialization import iter_occurrence_json, listing_rows, occurrence_rows, serialize_rows
+from .signals import events_bulk_written
+from .tags import TAG_NAME_MAX_LENGTH, normalize_tag_name, resolve_tags
+from .views import facet_counts
+
+
+def rollup_rows():
+    return sorted(AttendanceRollup.objects.values_list(
+        'day', 'weekday', 'kind', 'budget', 'occurrences', 'reported', 'attendees',
+    ))
+
+
+def rollup_queries(context):
+    return [query for query in context.captured_queries if 'attendancerollup' in query['sql']]
+
+
+class SlugTests(TestCase):
+
+    def test_generated_slugs_are_unique_and_ordered(self):
+        slugs = [generate_slug() for _ in range(1000)]
+        self.assertEqual(len(set(slugs)), 1000)
+        self.assertTrue(all(len(slug) == SLUG_LENGTH and slug.isalnum() for slug in slugs))
+        # The timestamp prefix keeps slugs from different milliseconds in creation order.
+        earlier = generate_slug()
+        sleep(0.002)
+        self.assertLess(earlier, generate_slug())
+
+    def test_save_makes_no_existence_query(self):
+        event = Event(title="Quiz")
+        with CaptureQueriesContext(connection) as context:
+            event.save()
+        self.assertFalse([query for query in context.captured_queries if '."slug" =' in query['sql']])
+        slug = event.slug
+        event.title = "Pub Quiz"
+        event.save()
+        self.assertEqual(Event.objects.get(pk=event.pk).slug, slug)
+
+    def test_clashing_slug_is_regenerated(self):
+        taken = Event.objects.create(title="First").slug
+        with mock.patch('planner.models.generate_slug', side_effect=[taken, "fresh0000000000a"]):
+            event = Event.objects.create(title="Second")
+        self.assertEqual(event.slug, "fresh0000000000a")
+
+    def test_other_integrity_errors_are_not_retried(self):
+        Venue.objects.create(name="Hall", postcode="", best_days=['MON'])
+        with mock.patch('planner.models.generate_slug', wraps=generate_slug) as generate:
+            with self.assertRaises(IntegrityError):
+                Venue.objects.create(name="Hall", postcode="", best_days=['MON'])
+        self.assertEqual(generate.call_count, 1)
+
+    def test_assign_slugs_before_bulk_create(self):
+        events = Event.assign_slugs([Event(title=f"Event {i}") for i in range(3)] + [Event(title="Kept", slug="kept")])
+        Event.objects.bulk_create(events)
+        self.assertEqual(Event.objects.get(title="Kept").slug, "kept")
+        self.assertEqual(Event.objects.exclude(slug="").count(), 4)
+
+
+class SearchTests(TestCase):
+    """Run against FTS5 where SQLite has it; SearchTermSearchTests repeats them on the SearchTerm index."""
+
+    def setUp(self):
+        self.jazz = Event.objects.create(title="Jazz Night", description="Live band", location_name="Hall")
+        self.quiz = Event.objects.create(title="Pub Quiz", description="Questions about jazz history")
+        self.walk = Event.objects.create(title="Museum Walk")
+
+    def search(self, query):
+        return search.search_event_ids(query)
+
+    def test_prefixes_of_every_word_match_best_first(self):
+        self.assertEqual(self.search("jaz"), [self.jazz.pk, self.quiz.pk])
+        self.assertEqual(self.search("jaz nig"), [self.jazz.pk])
+        self.assertEqual(self.search("  "), [])
+        self.assertEqual(list(Event.objects.filter(search.matching_events_filter("quiz"))), [self.quiz])
+
+    def test_tag_changes_are_indexed(self):
+        tags = resolve_tags(["outdoors", "history"])
+        self.walk.tags.add(tags["outdoors"])
+        self.assertEqual(self.search("outdoor"), [self.walk.pk])
+        tags["history"].events.add(self.walk)
+        self.assertEqual(self.search("museum histor"), [self.walk.pk])
+
+        tags["outdoors"].name = "fresh air"
+        tags["outdoors"].save()
+        self.assertEqual(self.search("outdoor"), [])
+        self.assertEqual(self.search("fresh"), [self.walk.pk])
+
+        tags["history"].events.clear()
+        self.assertEqual(self.search("museum histor"), [])
+        self.walk.tags.remove(tags["outdoors"])
+        self.assertEqual(self.search("fresh"), [])
+
+    def test_edits_and_deletes_are_indexed(self):
+        self.walk.title = "Gallery Walk"
+        self.walk.save()
+        self.assertEqual((self.search("museum"), self.search("galler")), ([], [self.walk.pk]))
+        self.jazz.delete()
+        self.assertEqual(self.search("jazz"), [self.quiz.pk])
+
+    def test_search_endpoint(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        results = self.client.get(reverse('planner:api_search_events'), {'q': "jazz"}).json()['results']
+        self.assertEqual([row['slug'] for row in results], [self.jazz.slug, self.quiz.slug])
+
+
+class SearchTermSearchTests(SearchTests):
+
+    def setUp(self):
+        patcher = mock.patch('planner.search.uses_fts5', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        self.event = Event.objects.create(title="Jazz Night", budget='LOW')
+        EventOccurrence.objects.create(event=self.event, start_datetime=timezone.now() + timedelta(days=1))
+
+    def get(self, params=None, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('planner:api_occurrences'), params or {}, **headers)
+        listing_queries = [query for query in context.captured_queries if 'occurrence' in query['sql']]
+        return response, len(listing_queries)
+
+    def test_equivalent_filters_share_a_cached_payload(self):
+        first, queries = self.get({'search_name': "Jazz  Night", 'budget': 'LOW'})
+        self.assertGreater(queries, 0)
+        second, queries = self.get({'search_name': "jazz night", 'budget': 'LOW', 'kind': 'NOT-A-KIND'})
+        self.assertEqual(queries, 0)
+        self.assertEqual((second.content, second['ETag']), (first.content, first['ETag']))
+        self.assertEqual(second['Cache-Control'], 'private, no-cache')
+        _, queries = self.get({'budget': 'HIGH'})
+        self.assertGreater(queries, 0)
+
+    def test_unchanged_data_revalidates_with_304(self):
+        first, _ = self.get()
+        second, _ = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])[0].status_code, 304)
+
+    def test_writes_start_a_new_generation(self):
+        first, _ = self.get()
+        self.event.title = "Blues Night"
+        self.event.save()
+        second, queries = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertGreater(queries, 0)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertContains(second, "Blues Night")
+
+
+class RecurrenceTests(TestCase):
+
+    def setUp(self):
+        self.event = Event.objects.create(title="Club Night")
+
+    def at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def rule(self, **values):
+        return RecurrenceRule.objects.create(event=self.event, **values)
+
+    def test_weekly_rule_on_chosen_weekdays(self):
+        rule = self.rule(frequency=RecurrenceRule.WEEKLY, interval=2, weekdays=['MON', 'THU'],
+                         dtstart=self.at(2030, 1, 7, 10))
+        self.assertEqual(list(rule.expand(self.at(2030, 1, 1), self.at(2030, 2, 1))), [
+            self.at(2030, 1, 7, 10), self.at(2030, 1, 10, 10), self.at(2030, 1, 21, 10), self.at(2030, 1, 24, 10),
+        ])
+        # A window starting later picks up the same schedule.
+        self.assertEqual(next(rule.expand(self.at(2030, 1, 22), self.at(2030, 2, 1))), self.at(2030, 1, 24, 10))
+
+    def test_monthly_rule_skips_short_months_and_stops_at_its_count(self):
+        rule = self.rule(frequency=RecurrenceRule.MONTHLY, count=4, dtstart=self.at(2030, 1, 31, 18))
+        self.assertEqual([start.month for start in rule.expand(self.at(2030, 1, 1), self.at(2031, 1, 1))], [1, 3, 5, 7])
+        self.assertEqual([start.month for start in rule.expand(self.at(2030, 4, 1), self.at(2031, 1, 1))], [5, 7])
+
+    def test_until_and_exceptions(self):
+        rule = self.rule(frequency=RecurrenceRule.DAILY, dtstart=self.at(2030, 1, 1, 10), until=self.at(2030, 1, 5, 10))
+        RecurrenceException.objects.create(rule=rule, original_start=self.at(2030, 1, 3, 10))
+        self.assertEqual([start.day for start in rule.expand(self.at(2029, 12, 1), self.at(2030, 2, 1))], [1, 2, 4, 5])
+
+    @override_settings(TIME_ZONE='Europe/London')
+    def test_local_time_is_kept_across_a_clock_change(self):
+        rule = self.rule(frequency=RecurrenceRule.WEEKLY, dtstart=self.at(2030, 3, 20, 19))
+        starts = list(rule.expand(self.at(2030, 3, 1), self.at(2030, 4, 10)))
+        self.assertEqual([timezone.localtime(start).hour for start in starts], [19] * 3)
+        self.assertEqual(starts[2] - starts[1], timedelta(days=7, hours=-1))
+
+    def test_stored_occurrences_replace_generated_ones(self):
+        rule = self.rule(frequency=RecurrenceRule.DAILY, count=3, dtstart=self.at(2030, 1, 1, 10))
+        EventOccurrence.objects.create(event=self.event, start_datetime=self.at(2030, 1, 2, 10), actual_attendees=40)
+        generated = recurrence.expanded_occurrences([rule], self.at(2030, 1, 1), self.at(2030, 2, 1))
+        self.assertEqual([start.day for start, _ in generated], [1, 3])
+
+    def test_pages_merge_stored_and_generated_occurrences(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        first = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        rule = self.rule(frequency=RecurrenceRule.DAILY, count=4, dtstart=first)
+        override = EventOccurrence.objects.create(event=self.event, start_datetime=first + timedelta(days=1))
+        # Another event at the same time as a generated date: stored rows sort first on a tie.
+        other = EventOccurrence.objects.create(event=Event.objects.create(title="Quiz"), start_datetime=first)
+
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(reverse('planner:api_occurrences'), params).json()
+            ids.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        generated = [recurrence.virtual_id(rule, first + timedelta(days=days)) for days in (0, 2, 3)]
+        self.assertEqual(ids, [other.pk, generated[0], override.pk, generated[1], generated[2]])
+
+
+class CalendarTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        concert = Event.objects.create(title="Concert", kind='CONCERT', budget='HIGH')
+        quiz = Event.objects.create(title="Quiz", kind='SOCIAL', budget='LOW')
+        for day, hour in ((3, 19), (3, 21), (17, 19)):
+            EventOccurrence.objects.create(event=concert, start_datetime=self.at(2030, 6, day, hour))
+        # 23:30 UTC on 30 June is 00:30 on 1 July in London.
+        EventOccurrence.objects.create(event=concert, start_datetime=self.at(2030, 6, 30, 23, 30))
+        RecurrenceRule.objects.create(event=quiz, frequency=RecurrenceRule.WEEKLY, count=3, dtstart=self.at(2030, 6, 3, 20))
+
+    def at(self, *args):
+        return datetime(*args, tzinfo=timezone.utc)
+
+    def month(self, **params):
+        return self.client.get(reverse('planner:api_calendar_month'), params).json()
+
+    def test_month_counts_stored_and_generated_occurrences_per_day(self):
+        data = self.month(month='2030-06')
+        self.assertEqual((data['month'], data['total']), ('2030-06', 7))
+        self.assertEqual(data['kinds'], {'CONCERT': 4, 'SOCIAL': 3})
+        self.assertEqual(data['days']['2030-06-03'], {
+            'count': 3, 'kinds': {'CONCERT': 2, 'SOCIAL': 1}, 'budgets': {'HIGH': 2, 'LOW': 1},
+        })
+        self.assertEqual(list(data['days']), ['2030-06-03', '2030-06-10', '2030-06-17', '2030-06-30'])
+        self.assertEqual(self.month(month='2030-06', kind='SOCIAL')['total'], 3)
+
+    @override_settings(TIME_ZONE='Europe/London')
+    def test_days_are_local_dates(self):
+        self.assertNotIn('2030-06-30', self.month(month='2030-06')['days'])
+        self.assertEqual(self.month(month='2030-07')['days'], {
+            '2030-07-01': {'count': 1, 'kinds': {'CONCERT': 1}, 'budgets': {'HIGH': 1}},
+        })
+
+    def test_day_lists_its_occurrences(self):
+        url = reverse('planner:api_calendar_day')
+        results = self.client.get(url, {'date': '2030-06-03'}).json()['results']
+        self.assertEqual([(row['name'], row['time']) for row in results],
+                         [("Concert", "19:00"), ("Quiz", "20:00"), ("Concert", "21:00")])
+        self.assertEqual(self.client.get(url, {'date': '2030-06-04'}).json()['results'], [])
+
+    def test_bad_month_or_date_is_a_400(self):
+        for month in ('2030-13', 'June', '2030'):
+            self.assertEqual(self.client.get(reverse('planner:api_calendar_month'), {'month': month}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('planner:api_calendar_day'), {'date': '2030-02-30'}).status_code, 400)
+
+
+class NearbyTests(TestCase):
+    CENTRE = (55.8609, -4.2514)  # George Square
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=1)
+        self.events = {}
+        # Roughly 0.2, 1.6, 2.6 and 3.9 km from the centre (and Edinburgh), created out of distance order.
+        for title, lat, lng in (("Kelvingrove", 55.8686, -4.2904), ("Queen Street", 55.8624, -4.2513),
+                                ("Glasgow Green", 55.8497, -4.2349), ("Hampden", 55.8258, -4.2520),
+                                ("Edinburgh", 55.9533, -3.1883)):
+            event = Event.objects.create(title=title, latitude=lat, longitude=lng)
+            EventOccurrence.objects.create(event=event, start_datetime=start)
+            self.events[title] = event
+
+    def test_nearest_first_within_the_radius(self):
+        ranked = nearby.nearest_events(Event.objects.all(), *self.CENTRE, radius_km=3)
+        names = {event.pk: title for title, event in self.events.items()}
+        self.assertEqual([names[pk] for pk, _ in ranked], ["Queen Street", "Glasgow Green", "Kelvingrove"])
+        distances = [distance for _, distance in ranked]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[0], geo.haversine_km(*self.CENTRE, 55.8624, -4.2513), places=6)
+        self.assertEqual(len(nearby.nearest_events(Event.objects.all(), *self.CENTRE, radius_km=100, limit=2)), 2)
+
+    def test_endpoint(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        url = reverse('planner:api_nearby_events')
+        lat, lng = self.CENTRE
+        results = self.client.get(url, {'lat': lat, 'lng': lng, 'radius_km': 4}).json()['results']
+        self.assertEqual([row['name'] for row in results], ["Queen Street", "Glasgow Green", "Kelvingrove", "Hampden"])
+        self.assertEqual(self.client.get(url, {'lat': 91, 'lng': lng}).status_code, 400)
+
+    def test_parse_near(self):
+        self.assertEqual(nearby.parse_near({'near_lat': '55.860912', 'near_lng': '-4.25', 'radius_km': '500'}),
+                         (55.86091, -4.25, nearby.MAX_RADIUS_KM))
+        self.assertIsNone(nearby.parse_near({'near_lat': 'x', 'near_lng': '-4.25'}))
+        self.assertIsNone(nearby.parse_near({'near_lat': '55', 'near_lng': '-4', 'radius_km': '-1'}))
+
+
+class PlaceSearchTests(TestCase):
+    PLACES = {'Drygate Brewing': (55.8655, -4.238), 'Barrowland Ballroom': (55.855, -4.2365)}
+
+    def setUp(self):
+        cache.get_cache().clear()
+        places._lru = places._guard = None
+        self.addCleanup(setattr, places, '_guard', None)
+        self.backend = mock.Mock(wraps=geocoding.LocalPlaceBackend(self.PLACES))
+
+    def search(self, query):
+        return places.search(query, backend=self.backend)
+
+    @mock.patch('planner.places.time.time', return_value=1000.0)
+    def test_a_taken_rate_slot_fails_at_once(self, _):
+        self.assertEqual(self.search("drygate")[1][0]['name'], "Drygate Brewing")
+        started = timer()
+        with self.assertRaises(upstream.UpstreamUnavailable):
+            self.search("barrowland")
+        self.assertLess(timer() - started, 0.5)
+        # Cached queries need no slot, and rate rejections do not open the breaker.
+        self.assertEqual(self.search("Drygate!")[1][0]['name'], "Drygate Brewing")
+        for _ in range(10):
+            with self.assertRaises(upstream.UpstreamUnavailable):
+                self.search("barrowland")
+        self.assertIsNone(places.get_guard().breaker.opened_at)
+        self.assertEqual(self.backend.search.call_count, 1)
+
+    def test_a_busy_guard_fails_before_taking_a_slot(self):
+        guard = places.get_guard()
+        while guard.slots.acquire(blocking=False):
+            pass
+        with self.assertRaises(upstream.UpstreamUnavailable):
+            self.search("drygate")
+        self.assertTrue(places.take_rate_slot())
+        self.backend.search.assert_not_called()
+
+    def test_lru_evicts_the_least_recently_used(self):
+        lru = places.LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+    def test_variants_share_one_entry_served_from_memory(self):
+        self.search("Drygate  Brewing")
+        with self.assertNumQueries(0):
+            key, results = self.search("  drygate   BREWING ")
+        self.assertEqual((key, len(results)), ("drygate brewing", 1))
+        # A new process (empty LRU) answers from the table.
+        places.get_lru().clear()
+        self.assertEqual(self.search("drygate brewing")[1], results)
+        self.assertEqual(self.backend.search.call_count, 1)
+        self.assertEqual(self.search("ab"), ("ab", []))
+
+    def test_expired_entries_are_searched_again(self):
+        ttl, negative_ttl = geocoding.geocoder_setting('TTL_DAYS'), geocoding.geocoder_setting('NEGATIVE_TTL_DAYS')
+        now = timezone.now()
+        PlaceCache.objects.create(query="drygate", results=json.dumps([{'name': "Old", 'lat': 1, 'lng': 2}]),
+                                  fetched_at=now - timedelta(days=ttl + 1))
+        PlaceCache.objects.create(query="nowhere", results="[]", fetched_at=now - timedelta(days=negative_ttl - 1))
+        PlaceCache.objects.create(query="somewhere", results="[]", fetched_at=now - timedelta(days=negative_ttl + 1))
+        PlaceCache.objects.create(query="seeded", results=json.dumps([{'name': "Seed", 'lat': 1, 'lng': 2}]),
+                                  seeded=True, fetched_at=now - timedelta(days=ttl * 10))
+
+        with mock.patch('planner.places.take_rate_slot', return_value=True):
+            self.assertEqual(self.search("drygate")[1][0]['name'], "Drygate Brewing")
+            self.assertEqual(self.search("nowhere")[1], [])
+            self.search("somewhere")
+            self.assertEqual(self.search("seeded")[1][0]['name'], "Seed")
+        self.assertEqual([call.args[0] for call in self.backend.search.call_args_list], ["drygate", "somewhere"])
+
+    def test_prune_keeps_seeds_and_the_newest_searches(self):
+        now = timezone.now()
+        for i in range(5):
+            PlaceCache.objects.create(query=f"search {i}", results="[]", fetched_at=now - timedelta(hours=i))
+        PlaceCache.objects.create(query="stale", results='[{"name": "x"}]',
+                                  fetched_at=now - timedelta(days=geocoding.geocoder_setting('TTL_DAYS') + 1))
+        places.seed_cache([("SWG3, West End", 55.866, -4.3)])
+        places.prune_cache(max_entries=2)
+        self.assertEqual(sorted(PlaceCache.objects.values_list('query', flat=True)),
+                         ["search 0", "search 1", "swg3", "swg3 west end"])
+
+
+class ListingSyncTests(TestCase):
+
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.event = Event.objects.create(title="Jazz Night", kind='CONCERT', budget='LOW')
+        self.occurrences = [
+            EventOccurrence.objects.create(event=self.event, start_datetime=self.start + timedelta(days=i))
+            for i in range(3)
+        ]
+
+    def assertListingsMatch(self, count):
+        listed = sorted(OccurrenceListing.objects.values_list(*listings.LISTING_FIELDS))
+        self.assertEqual(listed, sorted(EventOccurrence.objects.values_list(*listings.SOURCE_COLUMNS)))
+        self.assertEqual(len(listed), count)
+
+    def test_occurrence_writes_are_listed(self):
+        self.assertListingsMatch(3)
+        occurrence = self.occurrences[0]
+        occurrence.start_datetime += timedelta(hours=2)
+        occurrence.duration_hours = Decimal('3.5')
+        occurrence.save()
+        self.assertListingsMatch(3)
+        self.occurrences[1].delete()
+        self.assertListingsMatch(2)
+
+    def test_event_writes_are_listed(self):
+        self.event.kind, self.event.title = 'COMEDY', "Comedy Night"
+        self.event.latitude, self.event.longitude = Decimal('55.86'), Decimal('-4.25')
+        self.event.save()
+        self.assertListingsMatch(3)
+        self.assertEqual(set(OccurrenceListing.objects.values_list('kind', 'grid_cell')),
+                         {('COMEDY', self.event.grid_cell)})
+
+        # Bulk writers bypass save() and announce the events they touched instead.
+        Event.objects.filter(pk=self.event.pk).update(budget='HIGH')
+        events_bulk_written.send(sender=Event, event_ids=[self.event.pk])
+        self.assertListingsMatch(3)
+
+        self.event.delete()
+        self.assertListingsMatch(0)
+
+    def test_rebuild(self):
+        OccurrenceListing.objects.all().delete()
+        self.assertEqual(listings.rebuild(), 3)
+        self.assertListingsMatch(3)
+
+
+class StaticAssetTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(
+            STATIC_ROOT=root.name, STATICFILES_STORAGE='planner.staticfiles.CompressedManifestStorage')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        staticfiles.hashed_names.cache_clear()
+        self.addCleanup(staticfiles.hashed_names.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = static('css/dashboard.css')[len(settings.STATIC_URL):]
+
+    def get(self, path, **headers):
+        return staticfiles.serve(RequestFactory().get(settings.STATIC_URL + path, **headers), path)
+
+    def test_hashed_assets_are_immutable(self):
+        self.assertNotEqual(self.hashed, 'css/dashboard.css')
+        response = self.get(self.hashed)
+        self.assertEqual(response['Cache-Control'], f"public, max-age={staticfiles.IMMUTABLE_MAX_AGE}, immutable")
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        response = self.get('css/dashboard.css')
+        self.assertEqual(response['Cache-Control'], f"public, max-age={staticfiles.DEFAULT_MAX_AGE}")
+
+    def test_compressed_variant(self):
+        with open(os.path.join(settings.STATIC_ROOT, self.hashed), 'rb') as f:
+            original = f.read()
+        response = self.get(self.hashed, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+
+    def test_not_modified_and_missing(self):
+        last_modified = self.get(self.hashed)['Last-Modified']
+        self.assertEqual(self.get(self.hashed, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        for path in ('css/missing.css', '../manage.py'):
+            with self.assertRaises(Http404):
+                self.get(path)
+
+
+class TagTests(TestCase):
+
+    def test_names_are_normalized(self):
+        self.assertEqual(normalize_tag_name("  Team \t Building "), "team building")
+        self.assertEqual(normalize_tag_name("x" * 80), "x" * TAG_NAME_MAX_LENGTH)
+
+    def test_resolve_tags_reuses_and_creates_in_a_batch(self):
+        existing = Tag.objects.create(name="team building")
+        with self.assertNumQueries(3):
+            tags = resolve_tags(["Team  Building", "team building", "Outdoor", "  "])
+        self.assertEqual(sorted(tags), ["outdoor", "team building"])
+        self.assertEqual(tags["team building"], existing)
+        self.assertEqual(Tag.objects.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_tags(["OUTDOOR"]), {"outdoor": tags["outdoor"]})
+        self.assertEqual(resolve_tags(["", " "]), {})
+
+
+class FacetTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        tags = resolve_tags(["outdoor", "music"])
+        for title, kind, budget, names, count in (
+            ("Picnic Gig", 'CONCERT', 'LOW', ["outdoor", "music"], 2),
+            ("Bushcraft", 'WORKSHOP', 'HIGH', ["outdoor"], 1),
+            ("Orchestra", 'CONCERT', 'HIGH', [], 1),
+        ):
+            event = Event.objects.create(title=title, kind=kind, budget=budget)
+            event.tags.set([tags[name] for name in names])
+            for day in range(count):
+                EventOccurrence.objects.create(event=event, start_datetime=start + timedelta(days=day))
+        # Two generated occurrences, counted alongside the stored ones.
+        social = Event.objects.create(title="Ceilidh", kind='SOCIAL', budget='LOW')
+        social.tags.set([tags["music"]])
+        RecurrenceRule.objects.create(event=social, frequency=RecurrenceRule.WEEKLY, count=2, dtstart=start)
+
+    def counts(self, **params):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        return {key: {row['value']: row['count'] for row in rows if row['count']}
+                for key, rows in facet_counts(query).items()}
+
+    def test_each_facet_leaves_its_own_selection_out(self):
+        self.assertEqual(self.counts(), {
+            'kind': {'CONCERT': 3, 'WORKSHOP': 1, 'SOCIAL': 2},
+            'budget': {'LOW': 4, 'HIGH': 2},
+            'tag': {'outdoor': 3, 'music': 4},
+        })
+        self.assertEqual(self.counts(kind='CONCERT', tag='Outdoor'), {
+            'kind': {'CONCERT': 2, 'WORKSHOP': 1},
+            'budget': {'LOW': 2},
+            'tag': {'outdoor': 2, 'music': 2},
+        })
+        self.assertEqual(self.counts(budget='LOW', tag='music'), {
+            'kind': {'CONCERT': 2, 'SOCIAL': 2},
+            'budget': {'LOW': 4},
+            'tag': {'outdoor': 2, 'music': 4},
+        })
+
+    def test_api_facets(self):
+        response = self.client.get(reverse('planner:api_facets'), {'tag': 'music'})
+        self.assertEqual(response.status_code, 200)
+        kinds = {row['value']: row['count'] for row in response.json()['kind']}
+        self.assertEqual((kinds['CONCERT'], kinds['SOCIAL'], kinds['WORKSHOP']), (2, 2, 0))
+        self.assertEqual(self.client.get(reverse('planner:api_facets'), {'start': 'soon'}).status_code, 400)
+
+
+class SerializationTests(TestCase):
+
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2030, 5, 4, 18, 30))
+        event = Event.objects.create(title="Jazz Night", kind='CONCERT', budget='LOW', latitude=55.86, longitude=-4.25,
+                                     location_name="Hall")
+        for i in range(5):
+            EventOccurrence.objects.create(event=event, start_datetime=self.start + timedelta(days=i),
+                                           duration_hours=Decimal('1.50'), actual_attendees=i)
+        self.event = event
+
+    def test_rows_become_dashboard_dicts(self):
+        occurrence = EventOccurrence.objects.order_by('start_datetime').first()
+        row, = serialize_rows(occurrence_rows(EventOccurrence.objects.filter(pk=occurrence.pk)))
+        self.assertEqual(row, {
+            'id': occurrence.pk, 'name': "Jazz Night", 'date_ms': int(self.start.timestamp() * 1000), 'time': "18:30",
+            'duration': 1.5, 'category': 'CONCERT', 'attendees': 0, 'description': "", 'budget': 'LOW',
+            'slug': self.event.slug, 'location': {'lat': 55.86, 'lng': -4.25, 'address': "Hall"},
+        })
+
+    def test_listing_table_gives_the_same_rows(self):
+        self.assertEqual(
+            list(listing_rows(OccurrenceListing.objects.order_by('start_datetime'))),
+            list(occurrence_rows(EventOccurrence.objects.order_by('start_datetime'))),
+        )
+
+    def test_chunked_json_is_one_document(self):
+        rows = list(occurrence_rows(EventOccurrence.objects.order_by('start_datetime')))
+        with mock.patch('planner.serialization.JSON_CHUNK_ROWS', 2):
+            chunks = list(iter_occurrence_json(rows, next_cursor=None, count=5))
+        data = json.loads("".join(chunks))
+        self.assertEqual(data['results'], serialize_rows(rows))
+        self.assertEqual((data['next_cursor'], data['count']), (None, 5))
+        self.assertEqual(json.loads("".join(iter_occurrence_json([]))), {'results': []})
+
+
+class MapApiTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        start = timezone.now() + timedelta(days=1)
+        places = [("West End", 55.872, -4.289), ("Merchant City", 55.859, -4.245),
+                  ("Merchant City Too", 55.8595, -4.2455), ("Edinburgh", 55.953, -3.188)]
+        for title, lat, lng in places:
+            event = Event.objects.create(title=title, latitude=lat, longitude=lng)
+            EventOccurrence.objects.create(event=event, start_datetime=start)
+        Event.objects.create(title="Nothing scheduled", latitude=55.86, longitude=-4.25)
+
+    def get(self, **params):
+        return self.client.get(reverse('planner:api_map_events'), params)
+
+    def test_points_inside_the_box(self):
+        data = self.get(bbox="55.85,-4.30,55.88,-4.24", zoom=15).json()
+        self.assertEqual(data['type'], 'points')
+        self.assertEqual(sorted(row['name'] for row in data['results']),
+                         ["Merchant City", "Merchant City Too", "West End"])
+
+    def test_clusters_group_by_grid_cell(self):
+        data = self.get(bbox="55.0,-5.0,56.5,-3.0", zoom=11).json()
+        self.assertEqual(data['type'], 'clusters')
+        counts = {row['cell']: row['count'] for row in data['results']}
+        self.assertEqual(sorted(counts.values()), [1, 1, 2])
+        self.assertTrue(all(len(cell) == 5 for cell in counts))
+        # Zoomed out, Glasgow and Edinburgh share a two-character cell.
+        self.assertEqual([row['count'] for row in self.get(bbox="55.0,-5.0,56.5,-3.0", zoom=3).json()['results']], [4])
+
+    def test_bad_box_is_a_400(self):
+        for bbox in ("", "1,2,3", "56,-4,55,-3", "a,b,c,d"):
+            self.assertEqual(self.get(bbox=bbox).status_code, 400)
+
+
+class OccurrencePaginationTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.occurrences = []
+        for i in range(7):
+            event = Event.objects.create(title=f"Event {i}")
+            # Pairs share a start time, so pages must break ties on id.
+            self.occurrences.append(EventOccurrence.objects.create(event=event, start_datetime=start + timedelta(hours=i // 2)))
+
+    def get(self, **params):
+        return self.client.get(reverse('planner:api_occurrences'), params)
+
+    def test_pages_follow_the_cursor_in_order(self):
+        ids, cursor = [], None
+        while True:
+            page = self.get(limit=3, **({'cursor': cursor} if cursor else {})).json()
+            self.assertLessEqual(len(page['results']), 3)
+            ids.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = sorted(self.occurrences, key=lambda occurrence: (occurrence.start_datetime, occurrence.pk))
+        self.assertEqual(ids, [occurrence.pk for occurrence in expected])
+
+    def test_bad_cursor_or_limit_is_a_400(self):
+        for cursor in ("nonsense", "1_x", "99999999999999999999999_1", "1_99999999999999999999999", "-1_r"):
+            response = self.get(cursor=cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'error': "invalid cursor"})
+        for limit in ("abc", "0", "-5"):
+            response = self.get(limit=limit)
+            self.assertEqual(response.status_code, 400, limit)
+            self.assertEqual(response.json(), {'error': "invalid limit"})
+
+
+class RecommendationParamTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+
+    def get(self, **params):
+        return self.client.get(reverse('planner:api_recommendations'), params)
+
+    def test_bad_numbers_name_the_parameter(self):
+        cases = [
+            ({'group_size': 'x'}, "group_size is required and must be a number"),
+            ({'group_size': 4, 'lat': '55.8'}, "lng is required and must be a number"),
+            ({'group_size': 4, 'lat': '55.8', 'lng': 'west'}, "lng must be a number"),
+            ({'group_size': 4, 'radius_km': 'nan'}, "radius_km must be a number"),
+            ({'group_size': 4, 'limit': '1.5'}, "limit must be a number"),
+            ({'group_size': 4, 'limit': '0'}, "limit must be positive"),
+        ]
+        for params, message in cases:
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json(), {'error': message})
+        self.assertEqual(self.get(group_size=4, lat='55.8', lng='-4.25', radius_km='5').status_code, 200)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+
+    def test_bad_window_is_a_400(self):
+        for name in ('planner:export_csv', 'planner:export_ics'):
+            self.assertEqual(self.client.get(reverse(name), {'start': 'bad'}).status_code, 400)
+            self.assertEqual(self.client.get(reverse(name), {'end': '2020-13-45'}).status_code, 400)
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+
+class CreateEventTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+
+    def post(self, **values):
+        data = {
+            'eventName': "Quiz", 'eventKind': 'SOCIAL', 'eventBudget': 'LOW', 'selected_date': '2030-06-01',
+            'eventTime': '19:00', 'eventDuration': '2', 'selectedLat': '55.860000', 'selectedLng': '-4.250000',
+        }
+        data.update(values)
+        return self.client.post(reverse('planner:create_event'), data)
+
+    def test_booking_a_few_metres_away_conflicts(self):
+        self.assertEqual(self.post().status_code, 302)
+        # About 20 m north of the first booking: a different geohash cell, the same place.
+        response = self.post(eventName="Karaoke", selectedLat='55.860180', eventTime='20:00')
+        self.assertContains(response, "already booked")
+        self.assertEqual(self.post(eventName="Karaoke", selectedLat='55.870000').status_code, 302)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_generated_dates_of_a_weekly_event_are_booked(self):
+        self.assertEqual(self.post(eventRepeat='WEEKLY').status_code, 302)
+        response = self.post(eventName="Karaoke", selected_date='2030-06-15', eventTime='20:00')
+        self.assertContains(response, "already booked")
+        self.assertContains(response, "Sat 15 Jun, 19:00")
+        self.assertEqual(self.post(eventName="Karaoke", selected_date='2030-06-16').status_code, 302)
+
+    def test_later_dates_of_a_new_weekly_event_are_checked(self):
+        self.assertEqual(self.post(selected_date='2030-06-22').status_code, 302)
+        response = self.post(eventName="Karaoke", eventRepeat='WEEKLY', eventTime='20:00')
+        self.assertContains(response, "already booked")
+        self.assertFalse(RecurrenceRule.objects.exists())
+        # Three weeks end before the booked date.
+        response = self.post(eventName="Karaoke", eventRepeat='WEEKLY', eventTime='20:00', eventRepeatCount='3')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RecurrenceRule.objects.get().event.title, "Karaoke")
+
+    @override_settings(TIME_ZONE='Europe/London')
+    def test_time_skipped_by_a_clock_change_is_a_form_error(self):
+        response = self.post(selected_date='2030-03-31', eventTime='01:30')
+        self.assertContains(response, "clock change")
+        self.assertFalse(Event.objects.exists())
+
+
+@override_settings(
+    PLANNER_METRICS={'ENABLED': True},
+    MIDDLEWARE=settings.MIDDLEWARE + ['planner.metrics.MetricsMiddleware'],
+)
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.get_store().clear()
+
+    def test_unresolved_requests_share_one_label(self):
+        for path in ('/wp-login.php', '/.env', '/planner/no-such-page/'):
+            self.assertEqual(self.client.get(path).status_code, 404)
+        self.client.get(reverse('planner:api_facets'))
+        _, totals = metrics.get_store().snapshot()
+        self.assertEqual(totals[(metrics.UNRESOLVED_VIEW, 'GET', 404)][0], 3)
+        self.assertEqual({view for view, _, _ in totals}, {metrics.UNRESOLVED_VIEW, 'planner:api_facets'})
+
+
+class ImporterTests(TestCase):
+
+    def run_import(self, text, fmt='jsonl', batch_size=2):
+        importer = EventImporter(batch_size=batch_size)
+        errors = []
+        importer.run(read_rows(io.StringIO(text), fmt), on_batch=lambda _, error=None: error and errors.append(error))
+        return importer, errors
+
+    def test_rows_become_events_and_occurrences(self):
+        rows = [
+            {'title': "Jazz Night", 'kind': 'concert', 'budget': 'low', 'location_name': "Hall",
+             'start_datetime': f"2030-01-0{day}T19:00:00", 'tags': "Music, Live", 'actual_attendees': 40}
+            for day in (1, 2, 3)
+        ]
+        importer, errors = self.run_import("\n".join(json.dumps(row) for row in rows))
+        self.assertEqual(errors, [])
+        self.assertEqual((importer.rows, importer.events_created, importer.occurrences_created), (3, 1, 3))
+        event = Event.objects.get()
+        self.assertEqual((event.kind, event.budget), ('CONCERT', 'LOW'))
+        self.assertEqual(sorted(event.tags.values_list('name', flat=True)), ['live', 'music'])
+        self.assertEqual(event.occurrences.count(), 3)
+
+        # Re-importing the same rows adds nothing.
+        importer, _ = self.run_import("\n".join(json.dumps(row) for row in rows))
+        self.assertEqual((importer.events_created, importer.occurrences_created), (0, 0))
+
+    def test_bad_rows_are_skipped_with_their_row_number(self):
+        lines = [
+            json.dumps({'title': "Good", 'start_datetime': "2030-01-01T10:00:00"}),
+            '{"title": "Broken",',
+            '["not", "an", "object"]',
+            json.dumps({'title': "Bad date", 'start_datetime': "2030-13-45T10:00:00"}),
+            json.dumps({'title': 7, 'kind': 3, 'start_datetime': "2030-01-02T10:00:00"}),
+            json.dumps({'title': "Bad budget", 'budget': 'LAVISH', 'start_datetime': "2030-01-03T10:00:00"}),
+            json.dumps({'title': "Also good", 'start_datetime': "2030-01-04T10:00:00"}),
+        ]
+        importer, errors = self.run_import("\n".join(lines))
+        self.assertEqual([error.split(':')[0] for error in errors], ['row 2', 'row 3', 'row 4', 'row 6'])
+        self.assertEqual((importer.rows, importer.errors), (3, 4))
+        self.assertEqual(sorted(Event.objects.values_list('title', flat=True)), ['7', 'Also good', 'Good'])
+
+    def test_values_outside_the_columns_are_skipped(self):
+        start = {'start_datetime': "2030-01-01T10:00:00"}
+        lines = [json.dumps(dict(start, title=title, **values)) for title, values in [
+            ("Too long", {'duration_hours': "1000"}),
+            ("No time", {'duration_hours': "0"}),
+            ("Negative group", {'min_group_size': "-1"}),
+            ("Empty group", {'max_group_size': 0}),
+            ("Huge crowd", {'actual_attendees': 2 ** 40}),
+            ("Fine", {'duration_hours': "12.345", 'min_group_size': "4", 'max_group_size': "3"}),
+        ]]
+        importer, errors = self.run_import("\n".join(lines))
+        self.assertEqual([error.split(':')[0] for error in errors], [f'row {i}' for i in range(1, 6)])
+        event = Event.objects.get()
+        self.assertEqual((event.title, event.min_group_size, event.max_group_size), ("Fine", 4, 4))
+        self.assertEqual(event.occurrences.get().duration_hours, Decimal('12.34'))
+
+    def test_csv(self):
+        text = "title,start_datetime,budget,tags\nQuiz,2030-02-01T20:00:00,HIGH,\"pub, quiz\"\n"
+        importer, errors = self.run_import(text, fmt='csv')
+        self.assertEqual((errors, importer.occurrences_created), ([], 1))
+        self.assertEqual(Event.objects.get().budget, 'HIGH')
+
+
+class RacingBackend(geocoding.LocalBackend):
+    """Runs `during` while the worker is resolving, as a concurrent request would."""
+
+    def __init__(self, postcodes, during):
+        super().__init__(postcodes)
+        self.during = during
+
+    def lookup_many(self, postcodes):
+        self.during()
+        return super().lookup_many(postcodes)
+
+
+class GeocodeWorkerTests(TestCase):
+    POSTCODES = {'G1 1AA': (259000, 665000, 55.86, -4.25), 'G2 2BB': (258000, 666000, 55.87, -4.26)}
+    PLACES = {'Kelvingrove Park': (55.868, -4.287)}
+
+    def setUp(self):
+        self.venue = Venue.objects.create(name="Hall", postcode="G1 1AA", best_days=['FRI'])
+        self.event = Event.objects.create(title="Picnic", location_name="Kelvingrove Park")
+
+    def run_worker(self, during=lambda: None):
+        worker = GeocodeWorker(
+            backend=RacingBackend(self.POSTCODES, during),
+            place_backend=geocoding.LocalPlaceBackend(self.PLACES), rate=0,
+        )
+        return worker, worker.run_once()
+
+    def test_writes_coordinates_and_finishes_jobs(self):
+        worker, claimed = self.run_worker()
+        self.assertEqual((claimed, worker.done), (2, 2))
+        self.venue.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((self.venue.eastings, float(self.venue.latitude)), (259000, 55.86))
+        self.assertEqual(float(self.event.latitude), 55.868)
+        self.assertEqual(set(GeocodeJob.objects.values_list('status', flat=True)), {GeocodeJob.DONE})
+
+    def test_coordinates_set_meanwhile_are_kept(self):
+        def set_by_hand():
+            Venue.objects.filter(pk=self.venue.pk).update(latitude=1, longitude=2)
+        self.run_worker(during=set_by_hand)
+        self.venue.refresh_from_db()
+        self.assertEqual((self.venue.latitude, self.venue.longitude), (1, 2))
+
+    def test_result_for_a_changed_postcode_is_dropped(self):
+        def change_postcode():
+            venue = Venue.objects.get(pk=self.venue.pk)
+            venue.postcode = "G2 2BB"
+            venue.save()
+        worker, _ = self.run_worker(during=change_postcode)
+        self.venue.refresh_from_db()
+        self.assertIsNone(self.venue.latitude)
+        job = GeocodeJob.objects.get(target_type=GeocodeJob.VENUE)
+        self.assertEqual((job.query, job.status), ("G2 2BB", GeocodeJob.PENDING))
+
+        worker, _ = self.run_worker()
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.eastings, 258000)
+
+    def test_geocode_venues_queues_the_backlog(self):
+        # A venue whose coordinates were never filled in and that has no job waiting.
+        GeocodeJob.objects.all().delete()
+        call_command('geocode_venues', stdout=io.StringIO())
+        job = GeocodeJob.objects.get()
+        self.assertEqual((job.target_id, job.query, job.status), (self.venue.pk, "G1 1AA", GeocodeJob.PENDING))
+
+        self.run_worker()
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.eastings, 259000)
+
+
+class LoadingQueryCountTests(TestCase):
+    """The loading querysets make a fixed number of queries however many events there are."""
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=1)
+        for i in range(3):
+            event = Event.objects.create(title=f"Event {i}", kind='SOCIAL')
+            event.tags.set(resolve_tags([f"tag {i}", "shared"]).values())
+            for days in range(3):
+                EventOccurrence.objects.create(event=event, start_datetime=start + timedelta(days=days))
+        self.event = event
+
+    def test_view_event(self):
+        # The event, its tags, its upcoming occurrences and its recurrence rules.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('planner:view_event', args=[self.event.slug]))
+        self.assertContains(response, "tag 2")
+
+    def test_view_repeating_event(self):
+        first = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time(19)))
+        event = Event.objects.create(title="Weekly Quiz")
+        rule = RecurrenceRule.objects.create(event=event, frequency=RecurrenceRule.WEEKLY, dtstart=first)
+        RecurrenceException.objects.create(rule=rule, original_start=first + timedelta(weeks=1))
+        # A stored override of a generated date is listed once.
+        EventOccurrence.objects.create(event=event, start_datetime=first + timedelta(weeks=2), actual_attendees=9)
+        RecurrenceRule.objects.create(event=Event.objects.create(title="Finished"), dtstart=first - timedelta(weeks=9),
+                                      until=first - timedelta(weeks=2))
+
+        listed = {event.title: event.is_upcoming for event in Event.objects.with_listing_data()}
+        self.assertTrue(listed["Weekly Quiz"])
+        self.assertFalse(listed["Finished"])
+
+        # As above, plus the rules' exceptions.
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('planner:view_event', args=[event.slug]))
+        expected = [first + timedelta(weeks=weeks) for weeks in (0, 2, 3, 4, 5)]
+        self.assertEqual(response.context['event'].upcoming_dates(), expected)
+        self.assertNotContains(response, "No upcoming dates.")
+        self.assertContains(response, dateformat.format(timezone.localtime(expected[-1]), "D j M Y, H:i"))
+
+    def test_event_listing_data(self):
+        with self.assertNumQueries(2):
+            events = list(Event.objects.with_listing_data())
+            summary = [(event.is_upcoming, [tag.name for tag in event.tags.all()]) for event in events]
+        self.assertEqual(len(summary), 3)
+        self.assertTrue(all(upcoming for upcoming, _ in summary))
+
+    def test_occurrence_detail_data(self):
+        with self.assertNumQueries(2):
+            occurrences = list(EventOccurrence.objects.with_detail_data())
+            names = {(occurrence.event.title, tag.name) for occurrence in occurrences for tag in occurrence.event.tags.all()}
+        self.assertEqual(len(occurrences), 9)
+        self.assertEqual(len(names), 6)
+
+    def test_occurrence_listing_data(self):
+        with self.assertNumQueries(1):
+            titles = {occurrence.event.title for occurrence in EventOccurrence.objects.with_listing_data()}
+        self.assertEqual(len(titles), 3)
+
+
+class AttendanceRollupTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.concert = Event.objects.create(title="Concert", kind='CONCERT', budget='LOW')
+        self.social = Event.objects.create(title="Social", kind='SOCIAL', budget='HIGH')
+
+    def at(self, days_ago, hour=12):
+        day = self.today - timedelta(days=days_ago)
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def assertMatchesRebuild(self):
+        rows = rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(rows, rollup_rows())
+
+    def test_saves_keep_the_day_totals(self):
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1), actual_attendees=10)
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1, 15), actual_attendees=0)
+        row = AttendanceRollup.objects.get(day=self.today - timedelta(days=1), kind='CONCERT')
+        self.assertEqual((row.occurrences, row.reported, row.attendees), (2, 1, 10))
+        self.assertMatchesRebuild()
+
+    def test_moved_occurrence_updates_both_days(self):
+        occurrence = EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1), actual_attendees=10)
+        occurrence = EventOccurrence.objects.get(pk=occurrence.pk)
+        occurrence.start_datetime = self.at(5)
+        occurrence.save()
+        self.assertEqual([row[0] for row in rollup_rows()], [self.today - timedelta(days=5)])
+        self.assertMatchesRebuild()
+
+    def test_event_kind_change_moves_its_totals(self):
+        EventOccurrence.objects.create(event=self.social, start_datetime=self.at(3), actual_attendees=30)
+        event = Event.objects.get(pk=self.social.pk)
+        event.kind = 'FOOD'
+        event.save()
+        self.assertEqual([row[2] for row in rollup_rows()], ['FOOD'])
+        self.assertMatchesRebuild()
+
+    def test_unchanged_event_save_skips_rollups(self):
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1))
+        event = Event.objects.get(pk=self.concert.pk)
+        event.title = "Renamed"
+        with CaptureQueriesContext(connection) as context:
+            event.save()
+        self.assertEqual(rollup_queries(context), [])
+
+    def test_event_delete_syncs_its_days_once(self):
+        for days_ago in range(20):
+            EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(days_ago), actual_attendees=5)
+        EventOccurrence.objects.create(event=self.social, start_datetime=self.at(3), actual_attendees=7)
+        with CaptureQueriesContext(connection) as context:
+            Event.objects.get(pk=self.concert.pk).delete()
+        # One locking read and one delete of the emptied rows.
+        self.assertEqual(len(rollup_queries(context)), 2)
+        self.assertEqual([row[2:] for row in rollup_rows()], [('SOCIAL', 'HIGH', 1, 1, 7)])
+
+    def test_bulk_delete_syncs_each_day_once(self):
+        for days_ago in range(20):
+            EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(days_ago), actual_attendees=5)
+            EventOccurrence.objects.create(event=self.social, start_datetime=self.at(days_ago), actual_attendees=7)
+        with CaptureQueriesContext(connection) as context:
+            EventOccurrence.objects.filter(event=self.concert).delete()
+            Event.objects.filter(pk=self.social.pk).delete()
+        self.assertEqual(len(rollup_queries(context)), 4)
+        self.assertEqual(rollup_rows(), [])
+
+    def test_failed_delete_leaves_later_syncs_alone(self):
+        occurrence = EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1))
+        with self.assertRaises(ZeroDivisionError), rollups.deferred():
+            occurrence.delete()
+            1 / 0
+        # The day was still synced on the way out, and later writes sync straight away.
+        self.assertEqual(rollup_rows(), [])
+        EventOccurrence.objects.create(event=self.social, start_datetime=self.at(2), actual_attendees=3)
+        self.assertEqual([row[2:] for row in rollup_rows()], [('SOCIAL', 'HIGH', 1, 1, 3)])
+
+    def test_import_syncs_once_at_the_end(self):
+        lines = [
+            json.dumps({'title': f"Tour {i % 5}", 'kind': 'TOUR', 'budget': 'LOW',
+                        'start_datetime': self.at(i % 60).isoformat(), 'actual_attendees': i})
+            for i in range(60)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            EventImporter(batch_size=10).run(read_rows(io.StringIO("\n".join(lines)), 'jsonl'))
+        self.assertEqual(len(rollup_queries(context)), 2)
+        self.assertEqual(sum(row[4] for row in rollup_rows()), 60)
+        self.assertMatchesRebuild()
+
+    def test_attendance_endpoint(self):
+        User.objects.create_user('planner', password='secret')
+        self.client.login(username='planner', password='secret')
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(1), actual_attendees=10)
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(2), actual_attendees=20)
+        EventOccurrence.objects.create(event=self.concert, start_datetime=self.at(2, 18), actual_attendees=0)
+        EventOccurrence.objects.create(event=self.social, start_datetime=self.at(100), actual_attendees=500)
+
+        summary = self.client.get('/planner/api/analytics/attendance/').json()
+        self.assertEqual(
+            {key: summary['total'][key] for key in ('occurrences', 'reported', 'attendees', 'average')},
+            {'occurrences': 3, 'reported': 2, 'attendees': 30, 'average': 15.0},
+        )
+        self.assertEqual(len(summary['weekday']), 7)
+        self.assertEqual(self.client.get('/planner/api/analytics/attendance/', {'days': 365}).json()['total']['attendees'], 530)
+        self.assertEqual(self.client.get('/planner/api/analytics/attendance/', {'days': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/planner/api/analytics/attendance/', {'days': 0}).status_code, 400)
@@ -0,0 +1,171 @@
+"""
+Guarding and pooling for calls to external services (the geocoders).
+
+A request thread that waits on a slow upstream is a worker that serves
+nobody else, so lookups made while handling a request go through an
+UpstreamGuard: at most a few run at once per process, each with a short
+timeout, and a circuit breaker stops calling an upstream that keeps
+failing. Requests that cannot get a slot fail at once with
+UpstreamUnavailable instead of queueing.
+
+Batch work off the request path (the geocode worker) uses
+AsyncJSONClient: pooled keep-alive connections through httpx when it is
+installed, otherwise blocking urllib calls on a bounded thread pool. Both
+limit concurrent requests and apply the same timeouts.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+try:
+    import httpx
+except ImportError:  # Optional: falls back to urllib on a thread pool.
+    httpx = None
+
+
+class UpstreamUnavailable(OSError):
+    """The upstream is busy or failing; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors and lets one trial call through after `cooldown` seconds."""
+
+    def __init__(self, failures, cooldown):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half open: the next result decides.
+                self.opened_at = None
+                self.consecutive = self.failures - 1
+                return True
+            return False
+
+    def retry_after(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            return max(1, int(self.cooldown - (time.monotonic() - self.opened_at)) + 1)
+
+    def record(self, ok):
+        with self.lock:
+            if ok:
+                self.consecutive = 0
+                self.opened_at = None
+                return
+            self.consecutive += 1
+            if self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+class UpstreamGuard:
+    """Per-process concurrency limit plus circuit breaker for calls made on the request path."""
+
+    def __init__(self, name, max_concurrent, failures, cooldown):
+        self.name = name
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.breaker = CircuitBreaker(failures, cooldown)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs func if the breaker is closed and a slot is free, else raises
+        UpstreamUnavailable without waiting. func may raise UpstreamUnavailable
+        itself (say for a rate limit) without counting as a failure.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(f"{self.name} is failing; not retrying yet", self.breaker.retry_after())
+        if not self.slots.acquire(blocking=False):
+            raise UpstreamUnavailable(f"{self.name} is busy")
+        try:
+            result = func(*args, **kwargs)
+        except UpstreamUnavailable:
+            raise
+        except (OSError, ValueError):
+            self.breaker.record(False)
+            raise
+        finally:
+            self.slots.release()
+        self.breaker.record(True)
+        return result
+
+
+class AsyncJSONClient:
+    """
+    Async JSON-over-HTTP client with a connection pool, per-request timeout
+    and at most max_connections requests in flight. Use as an async
+    context manager, or call aclose() when done.
+    """
+
+    def __init__(self, timeout, max_connections=10, headers=None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.headers = dict(headers or {})
+        self.limit = asyncio.Semaphore(max_connections)
+        if httpx is not None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout),
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                headers=self.headers,
+            )
+            self.executor = None
+        else:
+            self.client = None
+            self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='upstream')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def get_json(self, url, params=None, headers=None):
+        return await self.request_json('GET', url, params=params, headers=headers)
+
+    async def post_json(self, url, payload, headers=None):
+        return await self.request_json('POST', url, payload=payload, headers=headers)
+
+    async def request_json(self, method, url, params=None, payload=None, headers=None):
+        """Returns the decoded JSON body; transport errors and timeouts raise OSError."""
+        async with self.limit:
+            if self.client is not None:
+                try:
+                    response = await self.client.request(method, url, params=params, json=payload, headers=headers)
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    raise OSError(str(e) or e.__class__.__name__) from e
+                return response.json()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._urlopen_json, method, url, params, payload, headers)
+
+    def _urlopen_json(self, method, url, params, payload, headers):
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        all_headers = {**self.headers, **(headers or {})}
+        data = None
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            all_headers.setdefault('Content-Type', 'application/json')
+        request = Request(url, data=data, headers=all_headers, method=method)
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
@@ -12,4 +12,20 @@ urlpatterns = [
     path('login/', views.user_login, name="login"),
     path('logout/', views.user_logout, name="logout"),
     path('event/create/', views.create_event, name='create_event'),
+    path('api/occurrences/', views.api_occurrences, name='api_occurrences'),
+    path('api/map/', views.api_map_events, name='api_map_events'),
+    path('api/nearby/', views.api_nearby_events, name='api_nearby_events'),
+    path('api/search/', views.api_search_events, name='api_search_events'),
+    path('api/calendar/', views.api_calendar_month, name='api_calendar_month'),
+    path('api/calendar/day/', views.api_calendar_day, name='api_calendar_day'),
+    path('api/facets/', views.api_facets, name='api_facets'),
+    path('api/analytics/attendance/', views.api_attendance, name='api_attendance'),
+    path('api/recommendations/', views.api_recommendations, name='api_recommendations'),
+    path('api/free-slots/', views.api_free_slots, name='api_free_slots'),
+    path('export/events.ics', views.export_ics, name='export_ics'),
+    path('export/events.csv', views.export_csv, name='export_csv'),
+    path('api/feeds/', views.api_calendar_feed, name='api_calendar_feed'),
+    path('feeds/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('api/geocode/', views.api_geocode, name='api_geocode'),
+    path('_metrics', views.planner_metrics, name='metrics'),
 ]
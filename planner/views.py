@@ -1,18 +1,43 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth.decorators import login_required
 from django.template import loader
 from django.utils import timezone
-from .models import Venue, Event, EventOccurrence, Choices, Tag
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models import Q, Count, Avg, Exists, OuterRef
+from django.db.models.functions import Substr, TruncDate
+from .models import Venue, Event, EventOccurrence, OccurrenceListing, Choices, RecurrenceRule, CalendarFeed
+from . import search
+from .cache import cached_json_response, generation_validators, normalize_filters
+from .serialization import iter_occurrence_json, listing_rows, recurrence_row
+from . import recurrence
+from . import recommendations
+from . import nearby
+from . import places
+from . import scheduling
+from . import exports
+from . import rollups
+from .tags import normalize_tag_name, resolve_tags
+from .upstream import UpstreamUnavailable
+from .metrics import instrument_view, metrics_setting, prometheus_text
+from .geo import bbox_cell_filter
 from .forms import * # Assuming all forms are imported here
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.forms import AuthenticationForm
 from datetime import datetime, timedelta 
 import random
 import json 
+import heapq
+import math
+from collections import Counter
+import itertools
 from decimal import Decimal 
+import pytz
 
 
 class MockEvent:
@@ -98,6 +123,7 @@ def user_logout(request):
     return redirect(reverse('planner:index'))
 
 @login_required
+@instrument_view
 def create_event(request):
     
     if request.method == 'POST':
@@ -120,7 +146,47 @@ def create_event(request):
             duration = data.get('eventDuration') or Decimal(2.0)
             attendee_count = data.get('eventAttendees') or 0
             
-            start_datetime = datetime.combine(date, time)
+            repeat = data.get('eventRepeat') or 'NONE'
+            until = data.get('eventRepeatUntil')
+            try:
+                # make_aware raises for a local time that a clock change skips or repeats.
+                start_datetime = timezone.make_aware(datetime.combine(date, time))
+                until_datetime = timezone.make_aware(datetime.combine(until, datetime.max.time())) if until else None
+            except (ValueError, pytz.InvalidTimeError):
+                error_message = "That time does not exist or is ambiguous on that date because of a clock change."
+                form.add_error('eventTime', error_message)
+                context = {'form': form, 'error': f"Please correct the errors: eventTime: {error_message}"}
+                return render(request, 'planner/eventCreation.html', context)
+
+            rule = None
+            if repeat != 'NONE':
+                # Repeating events store only the rule; dates are expanded when listed.
+                rule = RecurrenceRule(
+                    frequency=repeat,
+                    dtstart=start_datetime,
+                    until=until_datetime,
+                    count=data.get('eventRepeatCount'),
+                    duration_hours=duration,
+                )
+
+            if not data.get('allowOverlap'):
+                # Every date a repeating event will have within the horizon must be free too.
+                if rule:
+                    horizon_end = start_datetime + scheduling.REPEAT_CHECK_HORIZON
+                    starts = list(recurrence.expand(rule, start_datetime, horizon_end, exceptions=set()))
+                else:
+                    starts = [start_datetime]
+                length = timedelta(hours=float(duration))
+                conflicts = scheduling.conflicts_near(
+                    lat, lng, scheduling.BOOKING_RADIUS_KM, [(start, start + length) for start in starts],
+                )
+                if conflicts:
+                    context = {
+                        'form': form,
+                        'error': "This location is already booked at that time.",
+                        'conflicts': conflicts,
+                    }
+                    return render(request, 'planner/eventCreation.html', context)
             
             try:
                 new_event = Event.objects.create(
@@ -135,19 +201,18 @@ def create_event(request):
                 )
         
                 if tags_str:
-                    tag_names = [name.strip() for name in tags_str.split(',') if name.strip()]
-                    tag_objects = []
-                    for name in tag_names:
-                        tag, created = Tag.objects.get_or_create(name=name.lower())
-                        tag_objects.append(tag)
-                    new_event.tags.set(tag_objects)
+                    new_event.tags.set(resolve_tags(tags_str.split(',')).values())
     
-                EventOccurrence.objects.create(
-                    event=new_event,
-                    start_datetime=start_datetime,
-                    duration_hours=duration,
-                    actual_attendees=attendee_count,
-                )
+                if rule:
+                    rule.event = new_event
+                    rule.save()
+                else:
+                    EventOccurrence.objects.create(
+                        event=new_event,
+                        start_datetime=start_datetime,
+                        duration_hours=duration,
+                        actual_attendees=attendee_count,
+                    )
                 
 
                 return redirect('planner:dashboard')
@@ -170,132 +235,915 @@ def create_event(request):
 
     return render(request, 'planner/eventCreation.html', {'form': form})
 
-@login_required
-def dashboard(request):
-    
-    search_name = request.GET.get('search_name')
-    budget = request.GET.get('budget')
-    kind = request.GET.get('kind') # NEW: Get the 'kind' filter
-    min_attendees_str = request.GET.get('min_attendees')
-    
-    occurrences_queryset = EventOccurrence.objects.filter(
-        start_datetime__gte=timezone.now() - timedelta(days=1)
-    ).select_related('event').order_by('start_datetime')
+OCCURRENCE_PAGE_SIZE = 100
+OCCURRENCE_PAGE_MAX = 500
+
 
+def _parse_window_bound(value):
+    # Accepts either a plain date (YYYY-MM-DD) or a full ISO datetime.
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(parsed_date, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_window(params):
+    # Listings default to everything from yesterday onwards.
+    window_start = _parse_window_bound(params.get('start')) or timezone.now() - timedelta(days=1)
+    window_end = _parse_window_bound(params.get('end'))
+    return window_start, window_end
+
+
+def _encode_cursor(start_datetime, pk):
+    # Generated occurrences ("r<rule>-<ts>") sort after stored ones at the same start.
+    if isinstance(pk, str):
+        pk = "r" + pk[1:].split('-', 1)[0]
+    return f"{int(start_datetime.timestamp() * 1000000)}_{pk}"
+
+
+# Largest id a cursor may carry (a signed 64-bit column).
+CURSOR_MAX_ID = 2 ** 63 - 1
+
+
+def _decode_cursor(cursor):
+    # Any malformed or out-of-range cursor (timestamps past year 9999 raise
+    # OverflowError or OSError) is reported the same way, without the details.
+    try:
+        micros, pk = cursor.split('_', 1)
+        start_datetime = datetime.fromtimestamp(int(micros) / 1000000, tz=timezone.utc)
+        kind, pk = (1, int(pk[1:])) if pk.startswith('r') else (0, int(pk))
+    except (ValueError, OverflowError, OSError):
+        raise ValueError("invalid cursor")
+    if not 0 <= pk <= CURSOR_MAX_ID:
+        raise ValueError("invalid cursor")
+    return start_datetime, kind, pk
+
+
+def event_filters(params, prefix='event__', id_field=None):
+    """
+    Q object for the event-level dashboard filters (search_name, budget,
+    kind, tag, and near_lat/near_lng/radius_km). prefix is the path from the
+    queried model to Event's columns and id_field the event id column,
+    by default derived from prefix.
+    """
+    if id_field is None:
+        id_field = f'{prefix}id' if prefix else 'pk'
+    filters = Q()
+    search_name = params.get('search_name')
+    budget = params.get('budget')
+    kind = params.get('kind')
 
     if search_name:
-        occurrences_queryset = occurrences_queryset.filter(
-            event__title__icontains=search_name
-        )
-    
+        # Ranked prefix search over title, description, location and tags (see planner.search).
+        filters &= search.matching_events_filter(search_name, field=id_field)
+
     if budget and budget in [choice[0] for choice in Choices.get_budget_band()]:
+        filters &= Q(**{f'{prefix}budget': budget})
+
+    if kind and kind in [choice[0] for choice in Choices.get_event_kind()]:
+        filters &= Q(**{f'{prefix}kind': kind})
+
+    tag = normalize_tag_name(params.get('tag') or '')
+    if tag:
+        tagged = Event.tags.through.objects.filter(tag__name=tag).values('event_id')
+        filters &= Q(**{f'{id_field}__in': tagged})
+
+    near = nearby.parse_near(params)
+    if near:
+        filters &= nearby.within_radius_filter(*near, field=id_field)
+
+    return filters
+
+
+def _min_attendees(params):
+    try:
+        return int(params.get('min_attendees') or 0)
+    except ValueError:
+        return 0
+
+
+def filter_occurrences(params):
+    """
+    Applies the dashboard filters (search_name, budget, kind, min_attendees)
+    and the start/end date window to the stored occurrences, queried through
+    the denormalized OccurrenceListing table so no join to Event is needed.
+    """
+    window_start, window_end = parse_window(params)
+
+    occurrences_queryset = OccurrenceListing.objects.filter(start_datetime__gte=window_start)
+    if window_end:
+        occurrences_queryset = occurrences_queryset.filter(start_datetime__lt=window_end)
+
+    occurrences_queryset = occurrences_queryset.filter(event_filters(params, prefix='', id_field='event_id'))
+
+    min_attendees = _min_attendees(params)
+    if min_attendees:
         occurrences_queryset = occurrences_queryset.filter(
-            event__budget=budget
+            actual_attendees__gte=min_attendees
         )
-        
-    if kind and kind in [choice[0] for choice in Choices.get_event_kind()]:
+
+    return occurrences_queryset
+
+
+def expanded_occurrence_rows(params, after=None):
+    """
+    Lazily generated rows (in OCCURRENCE_COLUMNS order) for recurring events
+    matching the dashboard filters, in (start_datetime, rule) order. after
+    is a decoded cursor; only rows sorting after it are produced.
+    """
+    if _min_attendees(params):
+        # Generated occurrences have no attendees recorded yet.
+        return
+    window_start, window_end = parse_window(params)
+    window_end = window_end or window_start + timedelta(days=recurrence.DEFAULT_HORIZON_DAYS)
+    if after:
+        window_start = max(window_start, after[0])
+
+    rules = recurrence.active_rules(window_start, window_end).filter(event_filters(params)).select_related('event')
+    for start, rule in recurrence.expanded_occurrences(rules, window_start, window_end):
+        if after and (start, 1, rule.pk) <= after:
+            continue
+        yield recurrence_row(rule, start)
+
+
+@login_required
+@instrument_view
+def dashboard(request):
+    # Occurrences are no longer inlined into the page; dashboard.js pulls the
+    # visible month from api_occurrences using the same querystring filters.
+    context = {
+        'occurrences_api_url': reverse('planner:api_occurrences'),
+        'map_api_url': reverse('planner:api_map_events'),
+        'calendar_api_url': reverse('planner:api_calendar_month'),
+        'calendar_day_api_url': reverse('planner:api_calendar_day'),
+        'nearby_api_url': reverse('planner:api_nearby_events'),
+        'facets_api_url': reverse('planner:api_facets'),
+        'attendance_api_url': reverse('planner:api_attendance'),
+    }
+    return render(request, 'planner/dashboard.html', context)
+
+
+def _after_cursor(occurrences_queryset, cursor):
+    """Restricts stored occurrences to those sorting after cursor; returns (queryset, decoded cursor)."""
+    if not cursor:
+        return occurrences_queryset, None
+    after = _decode_cursor(cursor)
+    cursor_start, cursor_kind, cursor_pk = after
+    if cursor_kind == 0:
         occurrences_queryset = occurrences_queryset.filter(
-            event__kind=kind
+            Q(start_datetime__gt=cursor_start) |
+            Q(start_datetime=cursor_start, pk__gt=cursor_pk)
         )
-    
-    if min_attendees_str:
+    else:
+        occurrences_queryset = occurrences_queryset.filter(start_datetime__gt=cursor_start)
+    return occurrences_queryset, after
+
+
+def occurrence_page_body(occurrences_queryset, params, after, limit):
+    # One query for the stored page (plus one row to detect a next page), columns
+    # only, merged with generated occurrences of recurring events in start order.
+    # occurrence_id rather than pk: ordering by the one-to-one pk would join to EventOccurrence.
+    stored = listing_rows(occurrences_queryset.order_by('start_datetime', 'occurrence_id'))[:limit + 1]
+    merged = heapq.merge(
+        ((row[1], 0, row[0], row) for row in stored),
+        ((row[1], 1, row[0], row) for row in expanded_occurrence_rows(params, after)),
+    )
+    rows = [row for _, _, _, row in itertools.islice(merged, limit + 1)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][1], rows[-1][0])
+    return "".join(iter_occurrence_json(rows, next_cursor=next_cursor)).encode('utf-8')
+
+
+def _page_limit(params):
+    try:
+        limit = int(params.get('limit') or OCCURRENCE_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("invalid limit")
+    if limit < 1:
+        raise ValueError("invalid limit")
+    return min(limit, OCCURRENCE_PAGE_MAX)
+
+
+@login_required
+@instrument_view
+def api_occurrences(request):
+    """
+    Keyset-paginated occurrence listing ordered by (start_datetime, id).
+    Pass the returned next_cursor back as ?cursor= to fetch the next page.
+    """
+    cursor = request.GET.get('cursor')
+    try:
+        limit = _page_limit(request.GET)
+        occurrences_queryset, after = _after_cursor(filter_occurrences(request.GET), cursor)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    filters = normalize_filters(request.GET) + (cursor or "", limit)
+    return cached_json_response(
+        request, 'occurrences', filters,
+        lambda: occurrence_page_body(occurrences_queryset, request.GET, after, limit),
+    )
+
+
+def _parse_month(value):
+    # ?month=YYYY-MM, defaulting to the current month, as a window in the site's time zone.
+    today = timezone.localdate()
+    if value:
         try:
-            min_attendees = int(min_attendees_str)
-            occurrences_queryset = occurrences_queryset.filter(
-                actual_attendees__gte=min_attendees
-            )
+            year, month = (int(part) for part in value.split('-'))
+            first = datetime(year, month, 1)
         except ValueError:
-            pass
+            raise ValueError(f"Invalid month: {value}")
+    else:
+        first = datetime(today.year, today.month, 1)
+    following = datetime(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return timezone.make_aware(first), timezone.make_aware(following)
 
-    occurrences = occurrences_queryset 
 
-    event_data_list = []
-    
-    if not occurrences.exists() and not (search_name or budget or kind or min_attendees_str): 
-        print("Using mock event data for dashboard.")
-        
-        class MockEventInternal:
-            def __init__(self, title, description, category, lat, lng, location_name, budget='MEDIUM'):
-                self.title = title
-                self.description = description
-                self.category = category 
-                self.latitude = lat
-                self.longitude = lng
-                self.location_name = location_name
-                self.budget = budget
-                self.min_group_size = 1
+def _parse_day(value):
+    day = parse_date(value or '')
+    if day is None:
+        raise ValueError(f"Invalid date: {value}")
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
 
-        class MockEventOccurrenceUpdated:
-            def __init__(self, title, description, start_datetime, duration_hours, attendees, category, lat, lng, location_name, budget='MEDIUM'):
-                self.id = random.randint(100, 999) 
-                self.start_datetime = start_datetime
-                self.duration_hours = duration_hours
-                self.actual_attendees = attendees
-                self.event = MockEventInternal(title, description, category, lat, lng, location_name, budget)
-
-        mock_occurrences = [
-            MockEventOccurrenceUpdated(
-                title="Tech Conference 2025", 
-                description="Annual technology conference.",
-                start_datetime=datetime.now().replace(day=15, hour=9, minute=0, second=0, microsecond=0) + timedelta(days=30),
-                duration_hours=Decimal(8), attendees=500, category='Conference',
-                lat=55.8642, lng=-4.2518, location_name='Glasgow City Centre', budget='HIGH'
-            ),
-            MockEventOccurrenceUpdated(
-                title="Design Workshop", 
-                description="Hands-on workshop.",
-                start_datetime=datetime.now().replace(day=18, hour=14, minute=0, second=0, microsecond=0) + timedelta(days=30),
-                duration_hours=Decimal(3), attendees=30, category='Workshop',
-                lat=55.8700, lng=-4.2600, location_name='West End Community Hall', budget='LOW'
-            ),
-        ]
-        
-        for occurrence in mock_occurrences:
-            event_data_list.append({
-                'id': occurrence.id,
-                'name': occurrence.event.title,
-                'date_ms': int(occurrence.start_datetime.timestamp() * 1000), 
-                'time': occurrence.start_datetime.strftime('%H:%M'),
-                'duration': float(occurrence.duration_hours),
-                'category': occurrence.event.category,
-                'attendees': occurrence.actual_attendees,
-                'budget': occurrence.event.budget,
-                'location': {
-                    'lat': float(occurrence.event.latitude) if occurrence.event.latitude else 0.0,
-                    'lng': float(occurrence.event.longitude) if occurrence.event.longitude else 0.0,
-                    'address': occurrence.event.location_name,
+
+def _with_window(params, window_start, window_end):
+    params = params.copy()
+    params['start'] = window_start.isoformat()
+    params['end'] = window_end.isoformat()
+    return params
+
+
+@login_required
+@instrument_view
+def api_calendar_month(request):
+    """
+    Per-day occurrence counts for ?month=YYYY-MM, with kind and budget
+    breakdowns per day and for the month, under the dashboard filters.
+    Days are dates in the site's time zone.
+    """
+    try:
+        window_start, window_end = _parse_month(request.GET.get('month'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    params = _with_window(request.GET, window_start, window_end)
+
+    def build_body():
+        days = {}
+        kinds = {}
+        budgets = {}
+
+        def add(day, kind, budget, count):
+            entry = days.setdefault(day.isoformat(), {'count': 0, 'kinds': {}, 'budgets': {}})
+            entry['count'] += count
+            entry['kinds'][kind] = entry['kinds'].get(kind, 0) + count
+            entry['budgets'][budget] = entry['budgets'].get(budget, 0) + count
+            kinds[kind] = kinds.get(kind, 0) + count
+            budgets[budget] = budgets.get(budget, 0) + count
+
+        # One grouped query for every stored occurrence in the month...
+        grouped = (
+            filter_occurrences(params)
+            .annotate(day=TruncDate('start_datetime'))
+            .values_list('day', 'kind', 'budget')
+            .annotate(count=Count('pk'))
+            .order_by()
+        )
+        for day, kind, budget, count in grouped:
+            add(day, kind, budget, count)
+        # ...plus the generated occurrences of recurring events.
+        for row in expanded_occurrence_rows(params):
+            add(timezone.localtime(row[1]).date(), row[5], row[7], 1)
+
+        payload = {
+            'month': window_start.strftime('%Y-%m'),
+            'total': sum(entry['count'] for entry in days.values()),
+            'kinds': kinds,
+            'budgets': budgets,
+            'days': dict(sorted(days.items())),
+        }
+        return json.dumps(payload).encode('utf-8')
+
+    return cached_json_response(request, 'calendar_month', normalize_filters(params), build_body)
+
+
+@login_required
+@instrument_view
+def api_calendar_day(request):
+    """
+    The occurrences on ?date=YYYY-MM-DD under the dashboard filters, in the
+    same shape and with the same cursor paging as api_occurrences.
+    """
+    cursor = request.GET.get('cursor')
+    try:
+        params = _with_window(request.GET, *_parse_day(request.GET.get('date')))
+        limit = _page_limit(request.GET)
+        occurrences_queryset, after = _after_cursor(filter_occurrences(params), cursor)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    filters = normalize_filters(params) + (cursor or "", limit)
+    return cached_json_response(
+        request, 'calendar_day', filters,
+        lambda: occurrence_page_body(occurrences_queryset, params, after, limit),
+    )
+
+
+# Tag facet values returned, most frequent first.
+FACET_TAG_LIMIT = 30
+
+
+def facet_counts(params):
+    """
+    Occurrence counts for every kind, budget and tag value under the
+    current filters, each facet counted with its own selection left out
+    (so the kind list shows what picking another kind would give).
+    Stored occurrences are counted by two grouped queries:
+
+    - (kind, budget) with every filter but kind and budget; kind counts sum
+      the groups matching the selected budget and vice versa;
+    - tag with every filter but the tag.
+
+    Generated occurrences of recurring events are tallied the same way in
+    Python from one expansion and one lookup of their events' tags.
+    """
+    kind = params.get('kind') or ''
+    budget = params.get('budget') or ''
+    tag = normalize_tag_name(params.get('tag') or '')
+    counts = {'kind': Counter(), 'budget': Counter(), 'tag': Counter()}
+
+    open_params = params.copy()
+    for key in ('kind', 'budget', 'tag'):
+        open_params.pop(key, None)
+    tag_params = params.copy()
+    tag_params.pop('tag', None)
+    if tag:
+        open_params['tag'] = tag
+
+    groups = filter_occurrences(open_params).order_by().values_list('kind', 'budget').annotate(count=Count('pk'))
+    for row_kind, row_budget, count in groups:
+        if not budget or row_budget == budget:
+            counts['kind'][row_kind] += count
+        if not kind or row_kind == kind:
+            counts['budget'][row_budget] += count
+
+    tag_groups = (
+        filter_occurrences(tag_params).order_by()
+        .values_list('event__tags__name')
+        .annotate(count=Count('pk'))
+    )
+    for name, count in tag_groups:
+        if name:
+            counts['tag'][name] += count
+
+    generated_params = params.copy()
+    for key in ('kind', 'budget', 'tag'):
+        generated_params.pop(key, None)
+    generated = list(expanded_occurrence_rows(generated_params))
+    if generated:
+        event_tags = {}
+        generated_events = Event.objects.filter(slug__in={row[8] for row in generated}).order_by()
+        for slug, name in generated_events.values_list('slug', 'tags__name'):
+            if name:
+                event_tags.setdefault(slug, set()).add(name)
+        for row in generated:
+            row_kind, row_budget, names = row[5], row[7], event_tags.get(row[8], set())
+            kind_match = not kind or row_kind == kind
+            budget_match = not budget or row_budget == budget
+            tag_match = not tag or tag in names
+            if budget_match and tag_match:
+                counts['kind'][row_kind] += 1
+            if kind_match and tag_match:
+                counts['budget'][row_budget] += 1
+            if kind_match and budget_match:
+                counts['tag'].update(names)
+
+    tags = counts['tag'].most_common(FACET_TAG_LIMIT)
+    if tag and tag not in dict(tags):
+        tags.append((tag, counts['tag'][tag]))
+    return {
+        'kind': [{'value': value, 'label': label, 'count': counts['kind'][value]}
+                 for value, label in Choices.get_event_kind()],
+        'budget': [{'value': value, 'label': label, 'count': counts['budget'][value]}
+                   for value, label in Choices.get_budget_band()],
+        'tag': [{'value': name, 'label': name, 'count': count} for name, count in tags],
+    }
+
+
+@login_required
+@instrument_view
+def api_facets(request):
+    """Counts per kind, budget and tag for the dashboard filters in the querystring."""
+    try:
+        parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return cached_json_response(
+        request, 'facets', normalize_filters(request.GET),
+        lambda: json.dumps(facet_counts(request.GET)).encode('utf-8'),
+    )
+
+
+@login_required
+@instrument_view
+def api_attendance(request):
+    """
+    Attendance over the last ?days= (default 90) local dates, in total and
+    by kind, weekday and budget band, read from the attendance rollups.
+    """
+    try:
+        days = int(request.GET.get('days') or rollups.DEFAULT_WINDOW_DAYS)
+    except ValueError:
+        return JsonResponse({'error': "days must be a whole number"}, status=400)
+    if not 1 <= days <= rollups.MAX_WINDOW_DAYS:
+        return JsonResponse({'error': f"days must be between 1 and {rollups.MAX_WINDOW_DAYS}"}, status=400)
+    today = timezone.localdate()
+    return cached_json_response(
+        request, 'attendance', (days, today.isoformat()),
+        lambda: json.dumps(rollups.attendance_summary(days, today)).encode('utf-8'),
+    )
+
+
+# Dashboard filters a subscription feed keeps; its date window always rolls forward.
+FEED_FILTER_KEYS = ('search_name', 'budget', 'kind', 'tag', 'min_attendees', 'near_lat', 'near_lng', 'radius_km')
+
+EXPORT_FORMATS = {
+    'ics': ('text/calendar; charset=utf-8', 'planner-events.ics'),
+    'csv': ('text/csv; charset=utf-8', 'planner-events.csv'),
+}
+
+
+def _export_params(params):
+    # Without ?start= the window opens at yesterday's local midnight rather
+    # than "24 hours ago", so an unchanged export keeps its ETag all day.
+    params = params.copy()
+    if not params.get('start'):
+        params['start'] = (timezone.localdate() - timedelta(days=1)).isoformat()
+    return params
+
+
+def export_rows(params):
+    """
+    Every occurrence matching the dashboard filters in start order, stored
+    rows read in chunks with iterator() and merged with generated ones.
+    """
+    stored = listing_rows(filter_occurrences(params).order_by('start_datetime', 'occurrence_id')).iterator(
+        chunk_size=exports.EXPORT_CHUNK_SIZE,
+    )
+    merged = heapq.merge(
+        ((row[1], 0, row[0], row) for row in stored),
+        ((row[1], 1, row[0], row) for row in expanded_occurrence_rows(params)),
+    )
+    return (row for _, _, _, row in merged)
+
+
+def export_response(request, params, export_format, attachment=True):
+    """
+    Streams the filtered occurrences as .ics or .csv. The ETag follows the
+    filters and the data generation, so a client polling an unchanged
+    export gets a 304 without the rows being read at all.
+    """
+    params = _export_params(params)
+    try:
+        # Checked up front: once streaming has started a bad window can only surface as a 500.
+        parse_window(params)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    etag, last_modified = generation_validators(f'export_{export_format}', normalize_filters(params))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        # One reverse() for the whole export rather than one per row.
+        url_pattern = request.build_absolute_uri(reverse('planner:view_event', args=['slug-placeholder']))
+        event_url = lambda slug: url_pattern.replace('slug-placeholder', slug)
+        rows = export_rows(params)
+        if export_format == 'ics':
+            stream = exports.iter_ics(rows, event_url, "SAS Planner events", request.get_host())
+        else:
+            stream = exports.iter_csv(rows, event_url)
+        content_type, filename = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(exports.buffered(stream), content_type=content_type)
+        if attachment:
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@instrument_view
+def export_ics(request):
+    """The occurrences matching the dashboard filters (and ?start=&end=) as an iCalendar file."""
+    return export_response(request, request.GET, 'ics')
+
+
+@login_required
+@instrument_view
+def export_csv(request):
+    """The occurrences matching the dashboard filters (and ?start=&end=) as a CSV file."""
+    return export_response(request, request.GET, 'csv')
+
+
+@login_required
+@instrument_view
+def api_calendar_feed(request):
+    """
+    The current user's subscription URL for the dashboard filters in the
+    querystring, created on first request; asking again returns the same URL.
+    """
+    query = QueryDict(mutable=True)
+    for key in FEED_FILTER_KEYS:
+        if request.GET.get(key):
+            query[key] = request.GET[key]
+    feed, _ = CalendarFeed.objects.get_or_create(user=request.user, query=query.urlencode())
+    url = request.build_absolute_uri(reverse('planner:calendar_feed', args=[feed.token]))
+    return JsonResponse({'url': url, 'webcal': 'webcal://' + url.split('://', 1)[1]})
+
+
+@instrument_view
+def calendar_feed(request, token):
+    """A subscription feed; the token in the URL stands in for a login."""
+    feed = get_object_or_404(CalendarFeed.objects.only('query'), token=token)
+    return export_response(request, QueryDict(feed.query), 'ics', attachment=False)
+
+
+def _number_param(params, name, cast=float, default=None):
+    # Error messages name the parameter rather than echoing the conversion error.
+    value = params.get(name)
+    if not value:
+        if default is None:
+            raise ValueError(f"{name} is required and must be a number")
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a number")
+    return number
+
+
+def _parse_recommendation_params(params):
+    try:
+        group_size = int(params.get('group_size') or '')
+    except ValueError:
+        raise ValueError("group_size is required and must be a number")
+    if group_size < 1:
+        raise ValueError("group_size must be positive")
+
+    budget = params.get('budget') or None
+    if budget and budget not in recommendations.BUDGET_ORDER:
+        raise ValueError(f"Invalid budget: {budget}")
+
+    days = [code for value in params.getlist('days') for code in value.upper().split(',') if code]
+    for code in days:
+        if code not in recommendations.WEEKDAY_CODES:
+            raise ValueError(f"Invalid day: {code}")
+
+    occasion = params.get('occasion') or None
+    if occasion and occasion not in [choice[0] for choice in Choices.get_occasion()]:
+        raise ValueError(f"Invalid occasion: {occasion}")
+
+    home = None
+    if params.get('lat') or params.get('lng'):
+        home = (_number_param(params, 'lat'), _number_param(params, 'lng'))
+        if not (-90 <= home[0] <= 90 and -180 <= home[1] <= 180):
+            raise ValueError("lat/lng out of range")
+    radius_km = min(_number_param(params, 'radius_km', default=recommendations.DEFAULT_RADIUS_KM),
+                    recommendations.MAX_RADIUS_KM)
+    if radius_km <= 0:
+        raise ValueError("radius_km must be positive")
+
+    window_start = _parse_window_bound(params.get('start')) or timezone.now()
+    window_end = (_parse_window_bound(params.get('end'))
+                  or window_start + timedelta(days=recurrence.DEFAULT_HORIZON_DAYS))
+    limit = min(_number_param(params, 'limit', int, default=20), 100)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return {
+        'group_size': group_size, 'budget': budget, 'days': tuple(sorted(set(days))),
+        'occasion': occasion, 'home': home, 'radius_km': radius_km,
+        'window_start': window_start, 'window_end': window_end, 'limit': limit,
+    }
+
+
+@login_required
+@instrument_view
+def api_recommendations(request):
+    """
+    Events suited to a group: ?group_size= (required), budget (the most to
+    spend), days (e.g. FRI,SAT), occasion, lat/lng of home plus radius_km,
+    and an optional start/end window. Best match first.
+    """
+    try:
+        options = _parse_recommendation_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    def build_body():
+        results = recommendations.recommend(**options)
+        payload = {
+            'results': [
+                {
+                    'slug': candidate['slug'],
+                    'name': candidate['name'],
+                    'category': candidate['category'],
+                    'budget': candidate['budget'],
+                    'address': candidate['address'],
+                    'lat': float(candidate['lat']) if candidate['lat'] is not None else None,
+                    'lng': float(candidate['lng']) if candidate['lng'] is not None else None,
+                    'distance_km': candidate['distance_km'],
+                    'next_start': candidate['next_start'].isoformat(),
+                    'matching_occurrences': candidate['matching'],
+                    'score': candidate['score'],
                 }
-            })
-    
-    elif occurrences.exists():
-        for occurrence in occurrences:
-            event = occurrence.event
-            event_data_list.append({
-                'id': occurrence.pk,
-                'name': event.title,
-                'date_ms': int(occurrence.start_datetime.timestamp() * 1000),
-                'time': occurrence.start_datetime.strftime('%H:%M'),
-                'duration': float(occurrence.duration_hours),
-                'category': event.category, 
-                'attendees': occurrence.actual_attendees,
-                'description': event.description,
-                'budget': event.budget,
-                'location': {
-                    'lat': float(event.latitude) if event.latitude else 0.0,
-                    'lng': float(event.longitude) if event.longitude else 0.0,
-                    'address': event.location_name,
+                for candidate in results
+            ],
+        }
+        return json.dumps(payload).encode('utf-8')
+
+    # Without an explicit start the window moves with the clock, so key on the hour.
+    filters = tuple(sorted(
+        (name, value.replace(minute=0, second=0, microsecond=0) if name.startswith('window') else value)
+        for name, value in options.items()
+    ))
+    return cached_json_response(request, 'recommendations', filters, build_body)
+
+
+@login_required
+@instrument_view
+def api_search_events(request):
+    """Best-ranked events for ?q=, matching each word as a prefix."""
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit') or 20), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+
+    event_ids = search.search_event_ids(query, limit=limit)
+    events = Event.objects.in_bulk(event_ids)
+    return JsonResponse({
+        'results': [
+            {
+                'slug': events[pk].slug,
+                'name': events[pk].title,
+                'category': events[pk].kind,
+                'address': events[pk].location_name,
+            }
+            for pk in event_ids if pk in events
+        ],
+    })
+
+
+# Below this zoom level the map API returns clusters instead of markers.
+MAP_CLUSTER_MAX_ZOOM = 14
+MAP_MARKER_LIMIT = 500
+
+
+def _cluster_precision(zoom):
+    # Roughly one geohash cell per ~60px on screen at each zoom level.
+    if zoom <= 5:
+        return 2
+    if zoom <= 7:
+        return 3
+    if zoom <= 10:
+        return 4
+    if zoom <= 12:
+        return 5
+    return 6
+
+
+def _parse_bbox(value):
+    south, west, north, east = (float(part) for part in value.split(','))
+    if not (-90 <= south <= north <= 90) or not (-180 <= west <= east <= 180):
+        raise ValueError("bbox must be south,west,north,east")
+    return south, west, north, east
+
+
+def scheduled_events(window_start, window_end):
+    """Active events with a stored or generated occurrence in the window."""
+    occurrences = EventOccurrence.objects.filter(
+        event=OuterRef('pk'),
+        start_datetime__gte=window_start,
+    )
+    if window_end:
+        occurrences = occurrences.filter(start_datetime__lt=window_end)
+    rules = recurrence.active_rules(
+        window_start, window_end or window_start + timedelta(days=recurrence.DEFAULT_HORIZON_DAYS),
+    ).filter(event=OuterRef('pk'))
+    return Event.objects.filter(is_active=True).annotate(
+        has_occurrence=Exists(occurrences), has_rule=Exists(rules),
+    ).filter(Q(has_occurrence=True) | Q(has_rule=True))
+
+
+@login_required
+@instrument_view
+def api_map_events(request):
+    """
+    Events inside ?bbox=south,west,north,east for the map. At zoom levels
+    below MAP_CLUSTER_MAX_ZOOM events are grouped by geohash prefix and
+    returned as clusters (count plus centroid) instead of single points.
+    """
+    try:
+        south, west, north, east = _parse_bbox(request.GET.get('bbox', ''))
+        zoom = int(request.GET.get('zoom') or MAP_CLUSTER_MAX_ZOOM)
+        window_start, window_end = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # The cover cells give index range scans on grid_cell; the exact
+    # lat/lng comparison then trims whatever spills over the box edges.
+    events = scheduled_events(window_start, window_end).filter(bbox_cell_filter(south, west, north, east)).filter(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+
+    events = events.filter(event_filters(request.GET, prefix=''))
+
+    def build_body():
+        if zoom < MAP_CLUSTER_MAX_ZOOM:
+            clusters = (
+                events.annotate(cell=Substr('grid_cell', 1, _cluster_precision(zoom)))
+                .values('cell')
+                .annotate(count=Count('pk'), lat=Avg('latitude'), lng=Avg('longitude'))
+                .order_by()
+            )
+            payload = {
+                'type': 'clusters',
+                'results': [
+                    {'cell': row['cell'], 'count': row['count'], 'lat': float(row['lat']), 'lng': float(row['lng'])}
+                    for row in clusters
+                ],
+            }
+        else:
+            rows = events.order_by().values_list(
+                'slug', 'title', 'latitude', 'longitude', 'location_name', 'budget', 'kind'
+            )[:MAP_MARKER_LIMIT]
+            payload = {
+                'type': 'points',
+                'results': [
+                    {
+                        'slug': slug, 'name': title, 'lat': float(lat), 'lng': float(lng),
+                        'address': location_name, 'budget': budget, 'category': kind,
+                    }
+                    for slug, title, lat, lng, location_name, budget, kind in rows
+                ],
+            }
+        return json.dumps(payload).encode('utf-8')
+
+    filters = normalize_filters(request.GET) + ((south, west, north, east), zoom)
+    return cached_json_response(request, 'map', filters, build_body)
+
+
+@login_required
+@instrument_view
+def api_nearby_events(request):
+    """
+    Events within ?radius_km= of ?lat=&lng=, nearest first, with their
+    distance. Honours the dashboard filters and the start/end window.
+    """
+    try:
+        latitude = float(request.GET.get('lat', ''))
+        longitude = float(request.GET.get('lng', ''))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("lat/lng out of range")
+        radius_km = min(float(request.GET.get('radius_km') or nearby.DEFAULT_RADIUS_KM), nearby.MAX_RADIUS_KM)
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive")
+        limit = min(int(request.GET.get('limit') or 50), MAP_MARKER_LIMIT)
+        window_start, window_end = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    events = scheduled_events(window_start, window_end).filter(event_filters(request.GET, prefix=''))
+
+    def build_body():
+        ranked = nearby.nearest_events(events, latitude, longitude, radius_km, limit)
+        details = Event.objects.in_bulk([pk for pk, _ in ranked])
+        payload = {
+            'results': [
+                {
+                    'slug': details[pk].slug,
+                    'name': details[pk].title,
+                    'category': details[pk].kind,
+                    'budget': details[pk].budget,
+                    'address': details[pk].location_name,
+                    'lat': float(details[pk].latitude),
+                    'lng': float(details[pk].longitude),
+                    'distance_km': round(distance, 3),
                 }
-            })
-        
-    context = {
-        'events_json': json.dumps(event_data_list), 
-    }
-    return render(request, 'planner/dashboard.html', context)
+                for pk, distance in ranked
+            ],
+        }
+        return json.dumps(payload).encode('utf-8')
+
+    point = (round(latitude, 5), round(longitude, 5), radius_km, limit)
+    return cached_json_response(request, 'nearby', normalize_filters(request.GET) + point, build_body)
+
+
+def _parse_clock(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except ValueError:
+        raise ValueError(f"{name} must be HH:MM")
+
+
+@login_required
+@instrument_view
+def api_free_slots(request):
+    """
+    Free time on ?date=YYYY-MM-DD within ?radius_km= of ?lat=&lng=: the
+    stored occurrences booked there that day and the gaps between them of
+    at least ?min_minutes= (default 30), optionally within ?open=&close=
+    (HH:MM) hours.
+    """
+    try:
+        day = parse_date(request.GET.get('date') or '')
+        if day is None:
+            raise ValueError(f"Invalid date: {request.GET.get('date')}")
+        latitude = float(request.GET.get('lat', ''))
+        longitude = float(request.GET.get('lng', ''))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("lat/lng out of range")
+        radius_km = min(float(request.GET.get('radius_km') or scheduling.DEFAULT_NEAR_RADIUS_KM),
+                        scheduling.MAX_NEAR_RADIUS_KM)
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive")
+        min_minutes = int(request.GET.get('min_minutes') or scheduling.DEFAULT_MIN_SLOT.total_seconds() // 60)
+        if min_minutes < 1:
+            raise ValueError("min_minutes must be positive")
+        window_start, window_end = scheduling.day_bounds(
+            day, _parse_clock(request.GET.get('open'), 'open'), _parse_clock(request.GET.get('close'), 'close'),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    def build_body():
+        busy = scheduling.overlapping_near(latitude, longitude, radius_km, window_start, window_end)
+        slots = scheduling.free_slots(busy, window_start, window_end, timedelta(minutes=min_minutes))
+        payload = {
+            'date': day.isoformat(),
+            'start': window_start.isoformat(),
+            'end': window_end.isoformat(),
+            'busy': [
+                {
+                    'id': row.occurrence_id,
+                    'slug': row.slug,
+                    'title': row.title,
+                    'address': row.location_name,
+                    'start': row.start_datetime.isoformat(),
+                    'end': row.end_datetime.isoformat(),
+                }
+                for row in busy
+            ],
+            'free': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots],
+        }
+        return json.dumps(payload).encode('utf-8')
+
+    filters = (day.isoformat(), round(latitude, 5), round(longitude, 5), radius_km, min_minutes,
+               window_start.isoformat(), window_end.isoformat())
+    return cached_json_response(request, 'free_slots', filters, build_body)
+
+
+PLACE_RESPONSE_MAX_AGE = 3600
 
 
+@login_required
+@instrument_view
+def api_geocode(request):
+    """
+    Place search for the event creation map: ?q= gives up to five
+    {name, lat, lng} matches, served from the place cache when possible.
+    """
+    try:
+        query, results = places.search(request.GET.get('q', ''))
+    except UpstreamUnavailable as e:
+        response = JsonResponse({'error': "Location search is busy, please try again shortly."}, status=503)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    except (OSError, ValueError):
+        return JsonResponse({'error': "Location search is unavailable, please try again."}, status=502)
+    response = JsonResponse({'query': query, 'results': results})
+    patch_cache_control(response, private=True, max_age=PLACE_RESPONSE_MAX_AGE)
+    return response
+
+
+@instrument_view
 def view_event(request, event_slug):
     try:
-        event = Event.objects.get(slug=event_slug)
+        event = Event.objects.with_detail_data().get(slug=event_slug)
     except Event.DoesNotExist:
         event = None
     context_dict = {
@@ -307,4 +1155,17 @@ def view_venue(request, venue_slug):
     venue = get_object_or_404(Venue, slug=venue_slug)
     
     context_dict = {'venue': venue}
-    return HttpResponse(f"Venue page for: {venue.name}")
\ No newline at end of file
+    return HttpResponse(f"Venue page for: {venue.name}")
+
+
+def planner_metrics(request):
+    """Recorded view metrics in the Prometheus text format, for staff users or PLANNER_METRICS['TOKEN']."""
+    if not metrics_setting('ENABLED'):
+        raise Http404
+    token = metrics_setting('TOKEN')
+    authorized = request.user.is_staff or (
+        token and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f"Bearer {token}")
+    )
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
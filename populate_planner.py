@@ -8,23 +8,12 @@ from django.utils.text import slugify
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sas_app.settings') 
 django.setup()
 
-from planner.models import Event, EventOccurrence, Tag, Choices
+from planner import rollups
+from planner.models import Event, EventOccurrence, Choices
+from planner.places import GLASGOW_LOCATIONS, event_locations, seed_cache
+from planner.tags import normalize_tag_name, resolve_tags
 from django.utils import timezone
 
-
-GLASGOW_LOCATIONS = [
-    ("OVO Hydro / SEC Campus", Decimal('55.8601'), Decimal('-4.2882')),
-    ("Glasgow Royal Concert Hall", Decimal('55.8647'), Decimal('-4.2541')),
-    ("Platform Glasgow (The Arches)", Decimal('55.8569'), Decimal('-4.2498')),
-    ("Òran Mór, West End", Decimal('55.8790'), Decimal('-4.2891')),
-    ("Topgolf Glasgow", Decimal('55.8290'), Decimal('-4.2100')),
-    ("Drygate Brewing Co.", Decimal('55.8655'), Decimal('-4.2380')),
-    ("Kelvingrove Art Gallery and Museum", Decimal('55.8722'), Decimal('-4.2936')),
-    ("SWG3, West End", Decimal('55.8660'), Decimal('-4.3000')),
-    ("Glasgow Science Centre", Decimal('55.8576'), Decimal('-4.2929')),
-    ("Gallery of Modern Art (GoMA)", Decimal('55.8596'), Decimal('-4.2520')),
-]
-
 EVENT_TEMPLATES = [
     ("Team Golf Challenge at Topgolf", "Casual fun with food and drinks in private bays for team bonding.", "MEDIUM", 8, 40, 3.0, 'ACTIVITY'), 
     ("Escape Room: The Glasgow Vaults", "High-pressure, fun team problem-solving challenge.", "MEDIUM", 6, 20, 2.0, 'ACTIVITY'), 
@@ -65,13 +54,8 @@ def populate():
     print("Existing Event Occurrence data cleared.")
     
     tag_names = ['Team Building', 'Corporate', 'Social', 'Training', 'Entertainment']
-    tags = {}
-    for name in tag_names:
-        tag, created = Tag.objects.get_or_create(name=name)
-        tags[slugify(name)] = tag
-        if created:
-            print(f"Created tag: {name}")
-            
+    resolved = resolve_tags(tag_names)
+    tags = {slugify(name): resolved[normalize_tag_name(name)] for name in tag_names}
     print("Tags confirmed/created.")
 
     current_date = timezone.now().date()
@@ -148,7 +132,11 @@ def populate():
             print(f"Error processing event {final_title}: {e}")
             continue
 
+    # Lets the event creation map find these places without asking Nominatim.
+    seeded = seed_cache(GLASGOW_LOCATIONS + event_locations())
+
     print("-" * 50)
+    print(f"Seeded the place search cache with {seeded} queries.")
     print(f"Database population complete! Created {created_occurrences_count} new Event Occurrences.")
     if EventOccurrence.objects.exists():
         print(f"Total Events in DB: {Event.objects.count()}")
@@ -160,4 +148,6 @@ if __name__ == '__main__':
     if 'your_project_name' in os.environ.get('DJANGO_SETTINGS_MODULE', ''):
         print("ERROR: Please update 'your_project_name.settings' in the script to your actual Django project name.")
     else:
-        populate()
\ No newline at end of file
+        # The attendance rollups of every touched day are re-aggregated once, at the end.
+        with rollups.deferred():
+            populate()
\ No newline at end of file
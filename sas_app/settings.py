@@ -92,6 +92,39 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# The dashboard APIs cache their JSON here (planner.cache). Local memory is
+# per-process; with several workers switch to the file-based backend, e.g.
+# 'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+# 'LOCATION': os.path.join(BASE_DIR, 'cache'),
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'planner',
+    }
+}
+
+PLANNER_CACHE_ALIAS = 'default'
+PLANNER_CACHE_TIMEOUT = 300
+
+
+# Per-view timing and SQL metrics (planner.metrics): a Server-Timing header
+# on each response and Prometheus text at /planner/_metrics, readable by
+# staff or with "Authorization: Bearer <TOKEN>". While enabled, the planner
+# views decorated with @instrument_view are measured; add
+# 'planner.metrics.MetricsMiddleware' to MIDDLEWARE to measure every view.
+
+PLANNER_METRICS = {
+    'ENABLED': False,
+    'BUFFER_SIZE': 2048,
+    'SERVER_TIMING': True,
+    'DUPLICATE_WARNING': 5,
+    'TOKEN': '',
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -131,3 +164,31 @@ USE_TZ = True
 MEDIA_ROOT = MEDIA_DIR
 MEDIA_URL = '/media/'
 STATIC_URL = '/static/'
+
+
+# Geocoding (planner.geocoding). Saves only read the cache and queue a
+# GeocodeJob for misses; `manage.py geocode_worker` drains the queue through
+# BACKEND (postcodes) and PLACE_BACKEND (event locations) at RATE_LIMIT
+# requests per second. Use 'planner.geocoding.LocalBackend' /
+# 'planner.geocoding.LocalPlaceBackend' with LOCAL_POSTCODES / LOCAL_PLACES
+# for offline work.
+PLANNER_GEOCODER = {
+    'BACKEND': 'planner.geocoding.PostcodesIOBackend',
+    'TIMEOUT': 5,
+    'BATCH_SIZE': 100,
+    'TTL_DAYS': 90,
+    'NEGATIVE_TTL_DAYS': 7,
+    'MAX_ENTRIES': 50000,
+    'LOCAL_POSTCODES': {},
+    # Free-text place search for event locations, used by `manage.py geocode_worker`.
+    'PLACE_BACKEND': 'planner.geocoding.NominatimBackend',
+    'USER_AGENT': 'SAS_app event planner',
+    'RATE_LIMIT': 1.0,
+    'WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'LOCAL_PLACES': {},
+    # /planner/api/geocode/ (planner.places) searches through PLACE_BACKEND too.
+    'PLACE_VIEWBOX': (-4.45, 55.95, -4.05, 55.78),
+    'PLACE_COUNTRY_CODES': 'gb',
+    'PLACE_LRU_SIZE': 1024,
+}
@@ -0,0 +1,77 @@
+"""
+Production profile for sas_app, layered over settings.py.
+
+    DJANGO_SETTINGS_MODULE=sas_app.settings_production gunicorn -c gunicorn.conf.py sas_app.wsgi
+
+Configured from the environment:
+
+    DJANGO_SECRET_KEY       required
+    DJANGO_ALLOWED_HOSTS    comma-separated, default "localhost,127.0.0.1"
+    DJANGO_CONN_MAX_AGE     seconds a worker keeps its database connection open (default 600)
+    PLANNER_DATABASE        "sqlite" (default) or "postgres"
+    PLANNER_SQLITE_PATH     SQLite file (default <BASE_DIR>/db.sqlite3)
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+    PLANNER_CACHE_DIR       file cache shared by all workers (default <BASE_DIR>/cache)
+    PLANNER_STATIC_ROOT     collectstatic target (default <BASE_DIR>/staticfiles)
+    PLANNER_SERVE_STATIC    "1" (default) to serve static files from the app, "0" behind a web server
+
+Postgres needs psycopg2 installed. SQLite is fine for a few workers on one
+host: WAL lets every worker read while one writes, but writes are still
+serialized, so use Postgres once create/import traffic grows.
+
+Static files must be collected before starting: templates resolve
+{% static %} through the manifest collectstatic writes.
+"""
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+                 if host.strip()]
+
+# Reuse each worker's connection across requests instead of reconnecting every time.
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+
+if os.environ.get('PLANNER_DATABASE', 'sqlite') == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'sas_app'),
+            'USER': os.environ.get('POSTGRES_USER', 'sas_app'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+        }
+    }
+else:
+    DATABASES['default']['NAME'] = os.environ.get('PLANNER_SQLITE_PATH', DATABASES['default']['NAME'])
+    DATABASES['default']['CONN_MAX_AGE'] = CONN_MAX_AGE
+    # Seconds the sqlite3 driver waits for a lock before raising "database is locked".
+    DATABASES['default']['OPTIONS'] = {'timeout': 20}
+    # Run on every new connection by planner.db.configure_connection.
+    PLANNER_SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 20000,
+        'synchronous': 'NORMAL',
+    }
+
+# Workers are separate processes, so the dashboard cache and its generation
+# key must live somewhere they all see (see planner.cache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PLANNER_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+STATIC_ROOT = os.environ.get('PLANNER_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+# collectstatic writes content-hashed names plus .gz/.br copies (see planner.staticfiles).
+STATICFILES_STORAGE = 'planner.staticfiles.CompressedManifestStorage'
+# Lets the app serve STATIC_ROOT itself, with far-future caching; turn off when a front-end server does.
+PLANNER_SERVE_STATIC = os.environ.get('PLANNER_SERVE_STATIC', '1') == '1'
+
+SESSION_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES', '1') == '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
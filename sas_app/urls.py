@@ -13,15 +13,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include
-from planner import views
+from planner import staticfiles, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.redirect_to_index, name='redirect_to_index'),
     path('planner/', include('planner.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if getattr(settings, 'PLANNER_SERVE_STATIC', False):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), staticfiles.serve),
+    ]
@@ -1,35 +1,261 @@
-let dataFromDjango = window.eventsDataJson || '';
+const apiUrl = window.occurrencesApiUrl || '/planner/api/occurrences/';
+const mapApiUrl = window.mapApiUrl || '/planner/api/map/';
+const calendarApiUrl = window.calendarApiUrl || '/planner/api/calendar/';
+const calendarDayApiUrl = window.calendarDayApiUrl || '/planner/api/calendar/day/';
+const nearbyApiUrl = window.nearbyApiUrl || '/planner/api/nearby/';
+const facetsApiUrl = window.facetsApiUrl || '/planner/api/facets/';
+const attendanceApiUrl = window.attendanceApiUrl || '/planner/api/analytics/attendance/';
+
+// Only the month shown in the calendar is fetched; further pages of that
+// month are pulled on demand with the cursor returned by the API.
+let events = [];
+let nextCursor = null;
+let loadRequestId = 0;
+
+// Per-day counts for the calendar come from the month summary endpoint;
+// clicking a day narrows the event list to that day's occurrences.
+let monthSummary = { days: {} };
+let summaryRequestId = 0;
+let selectedDay = null;
+
+// With the distance filter on, the server already limits every listing to the
+// radius; distances (by event slug) come from the nearby endpoint.
+let distances = {};
 
-const fallbackEvents = [
-];
-let rawEvents = []; 
+let currentDate = new Date();
+let selectedEventId = null;
+let map = null;
+let markers = {};
+let mapLayer = null;
+let mapRequestId = 0;
 
-try {
-    if (typeof dataFromDjango === 'string' && dataFromDjango.trim() !== '') {
-        rawEvents = JSON.parse(dataFromDjango);
-        
-        if (!Array.isArray(rawEvents)) {
-            throw new Error("Parsed data is not an array.");
-        }
-        
+
+function monthWindow(date) {
+    const start = new Date(date.getFullYear(), date.getMonth(), 1);
+    const end = new Date(date.getFullYear(), date.getMonth() + 1, 1);
+    return { start: start.toISOString(), end: end.toISOString() };
+}
+
+function dayKey(year, month, day) {
+    return `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+}
+
+function buildApiUrl(cursor) {
+    // Carry over the dashboard's filter form (search_name, budget, ...) from the page URL.
+    const params = new URLSearchParams(window.location.search);
+    let url = apiUrl;
+    if (selectedDay) {
+        url = calendarDayApiUrl;
+        params.set('date', selectedDay);
     } else {
-        console.warn("Django context (events_json) was empty or not a string. Using fallback data.");
-        rawEvents = fallbackEvents;
+        const window_ = monthWindow(currentDate);
+        params.set('start', window_.start);
+        params.set('end', window_.end);
     }
-} catch (e) {
-    console.error("Error processing events data. Using fallback data.", e);
-    rawEvents = fallbackEvents;
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    return `${url}?${params.toString()}`;
 }
 
-const events = rawEvents.map(event => ({
-    ...event,
-    date: new Date(event.date_ms)
-}));
+async function loadCalendarSummary() {
+    const requestId = ++summaryRequestId;
+    const params = new URLSearchParams(window.location.search);
+    params.set('month', dayKey(currentDate.getFullYear(), currentDate.getMonth(), 1).slice(0, 7));
+    try {
+        const response = await fetch(`${calendarApiUrl}?${params.toString()}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        const data = await response.json();
+        if (requestId !== summaryRequestId) {
+            return;
+        }
+        monthSummary = data;
+    } catch (e) {
+        console.error("Error loading the calendar summary from the API.", e);
+        monthSummary = { days: {} };
+    }
+    renderCalendar();
+}
 
-let currentDate = new Date();
-let selectedEventId = null;
-let map = null;
-let markers = {};
+// Shows how many occurrences each kind, budget and tag would give under the other filters.
+async function loadFacets() {
+    try {
+        const response = await fetch(`${facetsApiUrl}${window.location.search}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        const facets = await response.json();
+        ['kind', 'budget'].forEach(name => {
+            const select = document.getElementById(name);
+            facets[name].forEach(facet => {
+                const option = select.querySelector(`option[value="${facet.value}"]`);
+                if (option) {
+                    option.dataset.label = option.dataset.label || option.textContent;
+                    option.textContent = `${option.dataset.label} (${facet.count})`;
+                }
+            });
+        });
+        const tagSelect = document.getElementById('tag');
+        const selected = tagSelect.dataset.selected;
+        tagSelect.querySelectorAll('option:not([value=""])').forEach(option => option.remove());
+        facets.tag.forEach(facet => {
+            const option = new Option(`${facet.label} (${facet.count})`, facet.value, false, facet.value === selected);
+            tagSelect.appendChild(option);
+        });
+    } catch (e) {
+        console.error("Error loading the filter counts from the API.", e);
+    }
+}
+
+// Attendance panel: totals per kind, weekday and budget from the rollup endpoint.
+let attendanceRequestId = 0;
+
+function attendanceTable(title, rows) {
+    const table = document.createElement('table');
+    table.className = 'attendance-table';
+    const head = table.createTHead().insertRow();
+    [title, 'Events', 'Attendees', 'Average'].forEach(text => {
+        const th = document.createElement('th');
+        th.textContent = text;
+        head.appendChild(th);
+    });
+    const body = table.createTBody();
+    rows.filter(row => row.occurrences > 0).forEach(row => {
+        const tr = body.insertRow();
+        [row.label, row.occurrences, row.attendees, row.average === null ? '-' : row.average].forEach(value => {
+            tr.insertCell().textContent = value;
+        });
+    });
+    if (!body.rows.length) {
+        const cell = body.insertRow().insertCell();
+        cell.colSpan = 4;
+        cell.textContent = 'No events in this period';
+    }
+    return table;
+}
+
+async function loadAttendance() {
+    const requestId = ++attendanceRequestId;
+    const days = document.getElementById('attendanceDays').value;
+    try {
+        const response = await fetch(`${attendanceApiUrl}?days=${encodeURIComponent(days)}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        const summary = await response.json();
+        if (requestId !== attendanceRequestId) return;
+
+        const total = summary.total;
+        document.getElementById('attendanceSummary').textContent =
+            `${summary.start} to ${summary.end}: ${total.occurrences} events, ${total.attendees} attendees` +
+            (total.average === null ? '' : `, ${total.average} on average`);
+        const panel = document.getElementById('attendancePanel');
+        panel.replaceChildren(
+            attendanceTable('Type', summary.kind),
+            attendanceTable('Weekday', summary.weekday),
+            attendanceTable('Budget', summary.budget),
+        );
+    } catch (e) {
+        console.error("Error loading attendance analytics from the API.", e);
+    }
+}
+
+document.getElementById('attendanceDays').addEventListener('change', loadAttendance);
+
+async function loadEvents(append = false) {
+    const requestId = ++loadRequestId;
+    try {
+        const response = await fetch(buildApiUrl(append ? nextCursor : null), {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        const data = await response.json();
+        if (requestId !== loadRequestId) {
+            return; // A newer month was requested while this one was in flight.
+        }
+
+        const page = data.results.map(event => ({
+            ...event,
+            id: String(event.id), // Generated recurrences have string ids ("r<rule>-<ts>").
+            date: new Date(event.date_ms)
+        }));
+        events = append ? events.concat(page) : page;
+        nextCursor = data.next_cursor;
+    } catch (e) {
+        console.error("Error loading events from the API.", e);
+        if (!append) {
+            events = [];
+            nextCursor = null;
+        }
+    }
+
+    if (!append) {
+        selectedEventId = null;
+    }
+    renderEventList();
+    loadMapLayer();
+    loadDistances();
+}
+
+function nearFilter() {
+    const params = new URLSearchParams(window.location.search);
+    const lat = parseFloat(params.get('near_lat'));
+    const lng = parseFloat(params.get('near_lng'));
+    if (isNaN(lat) || isNaN(lng) || !params.get('radius_km')) {
+        return null;
+    }
+    return { lat, lng, radius: parseFloat(params.get('radius_km')) };
+}
+
+async function loadDistances() {
+    const near = nearFilter();
+    if (!near) {
+        return;
+    }
+    const params = new URLSearchParams(window.location.search);
+    const window_ = monthWindow(currentDate);
+    params.set('lat', near.lat);
+    params.set('lng', near.lng);
+    params.set('start', window_.start);
+    params.set('end', window_.end);
+    params.set('limit', 500);
+    try {
+        const response = await fetch(`${nearbyApiUrl}?${params.toString()}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+        const data = await response.json();
+        distances = {};
+        data.results.forEach(result => { distances[result.slug] = result.distance_km; });
+    } catch (e) {
+        console.error("Error loading distances from the API.", e);
+        return;
+    }
+    renderEventList();
+}
+
+window.loadMoreEvents = function() {
+    if (nextCursor) {
+        loadEvents(true);
+    }
+}
 
 
 function formatDate(date) {
@@ -108,6 +334,7 @@ function renderEventList() {
                 <p>No events available</p>
             </div>
         `;
+        updateEventDisplay(null);
         return;
     }
 
@@ -118,9 +345,10 @@ function renderEventList() {
     const isSelected = selectedEventId === event.id;
     
     const budgetSymbol = getBudgetSymbol(event.budget);
+    const distance = distances[event.slug];
 
     return `
-        <div class="event-item ${isSelected ? 'selected' : ''}" onclick="selectEvent(${event.id})">
+        <div class="event-item ${isSelected ? 'selected' : ''}" onclick="selectEvent('${event.id}')">
             <div class="event-item-header">
                 <div>
                     <div class="event-item-title">${event.name}</div>
@@ -138,7 +366,7 @@ function renderEventList() {
                     <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
                         <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M17.657 16.657L13.414 20.9a1.998 1.998 0 01-2.827 0l-4.244-4.243a8 8 0 1111.314 0z"></path>
                     </svg>
-                    <span>${event.location.address}</span>
+                    <span>${event.location.address}${distance !== undefined ? ` (${distance.toFixed(1)} km away)` : ''}</span>
                 </div>
                 <div class="event-item-detail">
                     <svg fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -155,7 +383,11 @@ function renderEventList() {
             <div class="event-item-description">${event.description}</div>
         </div>
     `;
-}).join('');
+}).join('') + (nextCursor ? `
+        <button class="btn-create-event" style="width: 100%; margin-top: 12px;" onclick="loadMoreEvents()">
+            Load more events
+        </button>
+    ` : '');
 
     if (events.length > 0 && selectedEventId === null) {
         selectEvent(events[0].id);
@@ -171,9 +403,11 @@ window.selectEvent = function(eventId) {
     if (event) {
         renderEventList();
 
-        if (map && markers[eventId]) {
+        if (map && event.location && event.location.lat && event.location.lng) {
             map.setView([event.location.lat, event.location.lng], 15);
-            markers[eventId].openPopup();
+            if (markers[event.slug]) {
+                markers[event.slug].openPopup();
+            }
         }
 
         updateEventDisplay(event);
@@ -221,18 +455,16 @@ function renderCalendar() {
         day.className = 'calendar-day';
         day.textContent = i;
 
-        const hasEvent = events.some(event => {
-            const eventDate = event.date;
-            return eventDate instanceof Date && !isNaN(eventDate) &&
-                    eventDate.getDate() === i &&
-                    eventDate.getMonth() === month &&
-                    eventDate.getFullYear() === year;
-        });
-
-        if (hasEvent) {
+        const key = dayKey(year, month, i);
+        const summary = monthSummary.days[key];
+        if (summary) {
             day.classList.add('has-event');
-            const dayDate = new Date(year, month, i);
-            day.addEventListener('click', () => showEventsForDate(dayDate));
+            day.title = `${summary.count} event${summary.count > 1 ? 's' : ''}: ` +
+                Object.entries(summary.kinds).map(([kind, count]) => `${count} ${kind}`).join(', ');
+            day.addEventListener('click', () => showEventsForDate(key));
+        }
+        if (key === selectedDay) {
+            day.classList.add('selected');
         }
 
         calendar.appendChild(day);
@@ -247,27 +479,29 @@ function renderCalendar() {
     }
 }
 
-function showEventsForDate(date) {
-    const dateEvents = events.filter(event =>
-        event.date.getDate() === date.getDate() &&
-        event.date.getMonth() === date.getMonth() &&
-        event.date.getFullYear() === date.getFullYear()
-    );
+function showEventsForDate(key) {
+    // Clicking the selected day again goes back to the whole month.
+    selectedDay = selectedDay === key ? null : key;
+    renderCalendar();
+    loadEvents();
+}
 
-    if (dateEvents.length > 0) {
-        dateEvents.sort((a, b) => (a.time > b.time) ? 1 : ((b.time > a.time) ? -1 : 0));
-        selectEvent(dateEvents[0].id);
-    }
+function changeMonth(offset) {
+    currentDate.setDate(1);
+    currentDate.setMonth(currentDate.getMonth() + offset);
+    selectedDay = null;
+    monthSummary = { days: {} };
+    renderCalendar();
+    loadCalendarSummary();
+    loadEvents();
 }
 
 window.previousMonth = function() {
-    currentDate.setMonth(currentDate.getMonth() - 1);
-    renderCalendar();
+    changeMonth(-1);
 }
 
 window.nextMonth = function() {
-    currentDate.setMonth(currentDate.getMonth() + 1);
-    renderCalendar();
+    changeMonth(1);
 }
 
 function initMap() {
@@ -289,33 +523,153 @@ function initMap() {
         maxZoom: 19
     }).addTo(map);
 
-    events.forEach(event => {
-        if (event.location && event.location.lat && event.location.lng) {
-            const dateStr = event.date.toLocaleDateString();
-            const budgetSymbol = getBudgetSymbol(event.budget);
-            const marker = L.marker([event.location.lat, event.location.lng])
-                .addTo(map)
-                .bindPopup(`
-                    <div style="color: #1a1a1a; min-width: 200px;">
-                        <h3 style="margin: 0 0 8px 0; font-size: 1rem; font-weight: 600;">${event.name}</h3>
-                        <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Date:</strong> ${dateStr}</p>
-                        <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Time:</strong> ${event.time}</p>
-                        <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Location:</strong> ${event.location.address}</p>
-                        <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Budget:</strong> ${budgetSymbol}</p>
-                        <p style="margin: 8px 0 0 0; font-size: 0.85rem;">${event.description}</p>
-                    </div>
-                `);
-
-            marker.on('click', () => {
-                selectEvent(event.id);
-            });
+    mapLayer = L.layerGroup().addTo(map);
 
-            markers[event.id] = marker;
+    const near = nearFilter();
+    if (near) {
+        L.circle([near.lat, near.lng], { radius: near.radius * 1000, color: '#00d9ff', fillOpacity: 0.05 }).addTo(map);
+        map.setView([near.lat, near.lng], 13);
+    }
+    map.on('moveend', loadMapLayer);
+    loadMapLayer();
+}
+
+function buildMapApiUrl() {
+    const bounds = map.getBounds();
+    const params = new URLSearchParams(window.location.search);
+    const window_ = monthWindow(currentDate);
+    params.set('start', window_.start);
+    params.set('end', window_.end);
+    params.set('zoom', map.getZoom());
+    params.set('bbox', [
+        Math.max(bounds.getSouth(), -90), Math.max(bounds.getWest(), -180),
+        Math.min(bounds.getNorth(), 90), Math.min(bounds.getEast(), 180),
+    ].map(v => v.toFixed(6)).join(','));
+    return `${mapApiUrl}?${params.toString()}`;
+}
+
+// The server only returns what is inside the viewport, and clusters it when
+// zoomed out, so the number of markers stays bounded whatever the catalogue size.
+async function loadMapLayer() {
+    if (!map) {
+        return;
+    }
+    const requestId = ++mapRequestId;
+    let data;
+    try {
+        const response = await fetch(buildMapApiUrl(), {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin',
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
         }
+        data = await response.json();
+    } catch (e) {
+        console.error("Error loading map events from the API.", e);
+        return;
+    }
+    if (requestId !== mapRequestId) {
+        return;
+    }
+
+    mapLayer.clearLayers();
+    markers = {};
+
+    if (data.type === 'clusters') {
+        data.results.forEach(cluster => {
+            const size = 24 + Math.min(String(cluster.count).length * 8, 32);
+            const icon = L.divIcon({
+                className: 'map-cluster',
+                html: `<div style="width:${size}px;height:${size}px;line-height:${size}px;border-radius:50%;background:rgba(0, 217, 255, 0.8);color:#1a1a1a;text-align:center;font-weight:600;">${cluster.count}</div>`,
+                iconSize: [size, size],
+            });
+            L.marker([cluster.lat, cluster.lng], { icon })
+                .addTo(mapLayer)
+                .on('click', () => map.setView([cluster.lat, cluster.lng], map.getZoom() + 2));
+        });
+        return;
+    }
+
+    data.results.forEach(point => {
+        const budgetSymbol = getBudgetSymbol(point.budget);
+        const marker = L.marker([point.lat, point.lng])
+            .addTo(mapLayer)
+            .bindPopup(`
+                <div style="color: #1a1a1a; min-width: 200px;">
+                    <h3 style="margin: 0 0 8px 0; font-size: 1rem; font-weight: 600;">${point.name}</h3>
+                    <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Location:</strong> ${point.address}</p>
+                    <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Category:</strong> ${point.category}</p>
+                    <p style="margin: 4px 0; font-size: 0.85rem;"><strong>Budget:</strong> ${budgetSymbol}</p>
+                </div>
+            `);
+
+        marker.on('click', () => {
+            const event = events.find(e => e.slug === point.slug);
+            if (event) {
+                selectEvent(event.id);
+            }
+        });
+
+        markers[point.slug] = marker;
     });
+
+    // Re-open the selected event's popup, which the refresh above removed.
+    const selected = events.find(e => e.id === selectedEventId);
+    if (selected && markers[selected.slug]) {
+        markers[selected.slug].openPopup();
+    }
 }
 
+// The distance filter needs a point: the browser's location, or else the map centre.
+document.getElementById('filterForm').addEventListener('submit', function(e) {
+    const form = this;
+    const latInput = document.getElementById('near_lat');
+    const lngInput = document.getElementById('near_lng');
+    if (!document.getElementById('radius_km').value) {
+        latInput.disabled = true;
+        lngInput.disabled = true;
+        return;
+    }
+    if (latInput.value && lngInput.value) {
+        return;
+    }
+    e.preventDefault();
+    const useMapCentre = () => {
+        const centre = map ? map.getCenter() : { lat: 55.8642, lng: -4.2518 };
+        latInput.value = centre.lat.toFixed(5);
+        lngInput.value = centre.lng.toFixed(5);
+        form.submit();
+    };
+    if (!navigator.geolocation) {
+        useMapCentre();
+        return;
+    }
+    navigator.geolocation.getCurrentPosition(position => {
+        latInput.value = position.coords.latitude.toFixed(5);
+        lngInput.value = position.coords.longitude.toFixed(5);
+        form.submit();
+    }, useMapCentre, { timeout: 5000 });
+});
+
+// The feed URL carries its own token, so it has to be fetched rather than linked.
+document.getElementById('subscribeLink').addEventListener('click', async function(e) {
+    e.preventDefault();
+    try {
+        const response = await fetch(this.href, { credentials: 'same-origin' });
+        if (!response.ok) throw new Error(response.statusText);
+        const feed = await response.json();
+        window.prompt('Add this URL to your calendar app as a subscription:', feed.url);
+    } catch (error) {
+        console.error('Could not create the calendar feed:', error);
+    }
+});
+
 renderEventList();
 renderCalendar();
+loadCalendarSummary();
+loadEvents();
+loadFacets();
+loadAttendance();
 
-window.addEventListener('load', initMap);
\ No newline at end of file
+window.addEventListener('load', initMap);
@@ -2,6 +2,11 @@ let currentDate = new Date();
     let selectedDate = null;
     let map = null;
     let marker = null;
+    let searchTimer = null;
+    let searchController = null;
+    const placeResults = new Map();
+    const SEARCH_DEBOUNCE_MS = 350;
+    const MIN_SEARCH_LENGTH = 3;
     
     function renderCalendar() {
       const calendar = document.getElementById('calendar');
@@ -106,36 +111,36 @@ let currentDate = new Date();
         document.getElementById('locationNameInput').value = ''; 
       });
       
-      document.getElementById('mapSearch').addEventListener('keypress', function(e) {
+      const searchInput = document.getElementById('mapSearch');
+
+      searchInput.addEventListener('input', function() {
+          // Only search once typing pauses; the server caches the results too.
+          clearTimeout(searchTimer);
+          const query = this.value;
+          searchTimer = setTimeout(() => {
+              searchPlaces(query)
+                  .then(showSuggestions)
+                  .catch(error => console.error('Geocoding error:', error));
+          }, SEARCH_DEBOUNCE_MS);
+      });
+
+      searchInput.addEventListener('blur', () => showSuggestions([]));
+
+      searchInput.addEventListener('keypress', function(e) {
           if (e.key === 'Enter') {
               e.preventDefault();
+              clearTimeout(searchTimer);
               const query = this.value;
               if (query.trim() === '') return;
 
-              const nominatimUrl = `https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(query)}, Glasgow, UK&limit=1`;
-
               document.getElementById('mapInfo').textContent = `Searching for "${query}"...`;
 
-              fetch(nominatimUrl)
-                  .then(response => response.json())
-                  .then(data => {
-                      if (data.length > 0) {
-                          const lat = parseFloat(data[0].lat).toFixed(6);
-                          const lng = parseFloat(data[0].lon).toFixed(6);
-                          const displayName = data[0].display_name;
-
-                          map.setView([lat, lng], 15);
-                          document.getElementById('mapInfo').textContent = `Location found: ${displayName}`;
-
-                          if (marker) map.removeLayer(marker);
-                          marker = L.marker([lat, lng]).addTo(map);
-                          marker.bindPopup(displayName).openPopup();
-
-                          document.getElementById('selectedLatInput').value = lat;
-                          document.getElementById('selectedLngInput').value = lng;
-                          document.getElementById('locationNameInput').value = displayName;
-                          document.getElementById('selectedLocation').textContent = displayName;
-                          
+              searchPlaces(query)
+                  .then(results => {
+                      if (results === null) return; // superseded by a newer search
+                      showSuggestions([]);
+                      if (results.length > 0) {
+                          useLocation(results[0]);
                       } else {
                           document.getElementById('mapInfo').textContent = `Could not find location for "${query}". Try a different address or postcode.`;
                       }
@@ -148,6 +153,69 @@ let currentDate = new Date();
       });
     }
 
+    function normalizeQuery(query) {
+      // Mirrors planner.places.normalize_query so equivalent searches share a cache entry.
+      return (query.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || []).join(' ');
+    }
+
+    function searchPlaces(query) {
+      const key = normalizeQuery(query);
+      if (key.length < MIN_SEARCH_LENGTH) return Promise.resolve([]);
+      if (placeResults.has(key)) return Promise.resolve(placeResults.get(key));
+
+      if (searchController) searchController.abort();
+      searchController = new AbortController();
+      const url = `${document.getElementById('mapSearch').dataset.geocodeUrl}?q=${encodeURIComponent(query)}`;
+
+      return fetch(url, { signal: searchController.signal })
+          .then(response => {
+              if (!response.ok) throw new Error(`Location search failed (${response.status})`);
+              return response.json();
+          })
+          .then(data => {
+              placeResults.set(key, data.results);
+              return data.results;
+          })
+          .catch(error => {
+              if (error.name === 'AbortError') return null;
+              throw error;
+          });
+    }
+
+    function showSuggestions(results) {
+      if (results === null) return;
+      const list = document.getElementById('mapSuggestions');
+      list.innerHTML = '';
+      results.forEach(place => {
+          const item = document.createElement('li');
+          item.textContent = place.name;
+          // mousedown fires before the input's blur clears the list.
+          item.addEventListener('mousedown', e => {
+              e.preventDefault();
+              showSuggestions([]);
+              useLocation(place);
+          });
+          list.appendChild(item);
+      });
+    }
+
+    function useLocation(place) {
+      const lat = place.lat.toFixed(6);
+      const lng = place.lng.toFixed(6);
+
+      map.setView([lat, lng], 15);
+      document.getElementById('mapInfo').textContent = `Location found: ${place.name}`;
+
+      if (marker) map.removeLayer(marker);
+      marker = L.marker([lat, lng]).addTo(map);
+      marker.bindPopup(place.name).openPopup();
+
+      document.getElementById('selectedLatInput').value = lat;
+      document.getElementById('selectedLngInput').value = lng;
+      document.getElementById('locationNameInput').value = place.name;
+      document.getElementById('selectedLocation').textContent = place.name;
+    }
+
     document.getElementById('eventForm').addEventListener('submit', function(e) {
         if (!document.getElementById('selectedDateInput').value) {
             e.preventDefault();